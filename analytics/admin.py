@@ -2,18 +2,20 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
 from datetime import timedelta
+from utils.admin import AutocompleteFilter, ScalableAdminMixin
 from .models import ClickStats
 
 
 @admin.register(ClickStats)
-class ClickStatsAdmin(admin.ModelAdmin):
+class ClickStatsAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ['get_link', 'clicked_at', 'time_ago']
-    list_filter = ['clicked_at', 'link']
+    list_filter = ['clicked_at', ('link', AutocompleteFilter)]
+    list_select_related = ['link']
     search_fields = ['link__short_code', 'link__custom_alias']
     readonly_fields = ['link', 'clicked_at']
-    date_hierarchy = 'clicked_at'
     list_per_page = 50
-    ordering = ['-clicked_at']
+    # Newest first through the pk index; clicks are inserted in time order
+    ordering = ['-id']
 
     def get_link(self, obj):
         """Display link with short code"""
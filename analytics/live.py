@@ -0,0 +1,96 @@
+"""
+In-process pub/sub for live click counts (ClickStreamView).
+
+The click path only bumps a counter under a lock. Once per
+CLICK_STREAM_TICK_SECONDS a ticker on the ASGI event loop swaps the counters
+out and merges them into every subscriber, so the work per tick depends on the
+number of subscribers and distinct links clicked, not on the click rate. A slow
+client keeps accumulating deltas until it reads them instead of queueing events.
+
+Counts are per process: a stream sees only the clicks tracked by the server
+process that serves it, so with several workers each stream gets about its
+worker's share. Events carry "scope": "process" to say so.
+"""
+import asyncio
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+from django.conf import settings
+
+
+class Subscription:
+    def __init__(self, owner_id=None, link_ids=None):
+        # owner_id None sees every link (admins); link_ids narrows to those links
+        self.owner_id = owner_id
+        self.link_ids = link_ids
+        self.pending = Counter()
+        self.ready = asyncio.Event()
+
+    def accepts(self, link_id, owner_id):
+        if self.owner_id is not None and owner_id != self.owner_id:
+            return False
+        return not self.link_ids or link_id in self.link_ids
+
+    def merge(self, deltas, owners):
+        for link_id, count in deltas.items():
+            if self.accepts(link_id, owners[link_id]):
+                self.pending[link_id] += count
+        if self.pending:
+            self.ready.set()
+
+    async def next(self, timeout):
+        """Deltas accumulated since the last call, or None after `timeout` seconds without clicks."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.ready.clear()
+        deltas, self.pending = self.pending, Counter()
+        return deltas
+
+
+class ClickBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._owners = {}
+        self._subscriptions = set()
+        self._ticker = None
+
+    def publish(self, link_id, owner_id):
+        """Record one click. Called from the click path, from any thread."""
+        if not self._subscriptions:
+            return
+        with self._lock:
+            self._pending[link_id] += 1
+            self._owners[link_id] = owner_id
+
+    def drain(self):
+        with self._lock:
+            deltas, owners = self._pending, self._owners
+            self._pending, self._owners = Counter(), {}
+        return deltas, owners
+
+    @asynccontextmanager
+    async def subscribe(self, owner_id=None, link_ids=None):
+        subscription = Subscription(owner_id, link_ids)
+        self._subscriptions.add(subscription)
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.get_running_loop().create_task(self._tick())
+        try:
+            yield subscription
+        finally:
+            self._subscriptions.discard(subscription)
+
+    async def _tick(self):
+        while self._subscriptions:
+            await asyncio.sleep(settings.CLICK_STREAM_TICK_SECONDS)
+            deltas, owners = self.drain()
+            if deltas:
+                for subscription in list(self._subscriptions):
+                    subscription.merge(deltas, owners)
+        # Nobody listens any more: drop what was counted meanwhile
+        self.drain()
+
+
+click_broker = ClickBroker()
@@ -0,0 +1,42 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from analytics.models import SpoolCheckpoint
+from analytics.services import AnalyticsService
+from analytics.spool import closed_segments
+from links.sharding import get_shards
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load closed click spool segments into click_stats (CLICK_INGEST_MODE=spool)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Spool directory (default: CLICK_SPOOL_DIR)')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when no segment is closed')
+        parser.add_argument('--once', action='store_true', help='Load the closed segments, then exit')
+
+    def handle(self, *args, **options):
+        segments = loaded = dropped = 0
+        started = time.monotonic()
+        while True:
+            paths = closed_segments(options['dir'])
+            for path in paths:
+                segment_loaded, segment_dropped = AnalyticsService.load_spool_segment(path)
+                os.remove(path)
+                # The file is gone, so the segment can no longer be loaded twice
+                name = os.path.basename(path)
+                for alias in get_shards():
+                    SpoolCheckpoint.objects.using(alias).filter(segment=name).delete()
+                segments += 1
+                loaded += segment_loaded
+                dropped += segment_dropped
+            if options['once']:
+                break
+            if not paths:
+                time.sleep(options['interval'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {loaded} click(s) from {segments} segment(s), dropped {dropped} for deleted links; '
+            f'{loaded / elapsed if elapsed else 0:.0f} clicks/s'
+        ))
@@ -16,3 +16,16 @@ class ClickStats(models.Model):
             models.Index(fields=['link', '-clicked_at']),
         ]
         verbose_name_plural = 'Click Stats'
+
+
+class SpoolCheckpoint(models.Model):
+    """A click spool segment already loaded into this database (see analytics.spool)."""
+    segment = models.CharField(max_length=100, unique=True)
+    clicks = models.PositiveIntegerField()
+    loaded_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.segment
+
+    class Meta:
+        db_table = 'click_spool_checkpoints'
@@ -0,0 +1,6 @@
+from utils.projection import Projection
+from .serializers import ClickStatsSerializer
+
+
+class ClickStatsProjection(Projection):
+    serializer_class = ClickStatsSerializer
@@ -1,5 +1,12 @@
+from datetime import datetime, time, timedelta
+from itertools import islice
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import serializers
 from .models import ClickStats
+from .services import bucket_starts
 
 
 class ClickStatsSerializer(serializers.ModelSerializer):
@@ -9,3 +16,60 @@ class ClickStatsSerializer(serializers.ModelSerializer):
         model = ClickStats
         fields = ['id', 'link', 'link_short_code', 'clicked_at']
         read_only_fields = ['id', 'clicked_at']
+
+
+# Query parameters of the per-link stats endpoint
+class LinkStatsQuerySerializer(serializers.Serializer):
+    GRANULARITIES = ['hour', 'day', 'week', 'month']
+    # Range used when `start` is omitted
+    DEFAULT_SPANS = {
+        'hour': timedelta(hours=48),
+        'day': timedelta(days=30),
+        'week': timedelta(weeks=12),
+        'month': timedelta(days=365),
+    }
+
+    start = serializers.CharField(required=False, help_text='ISO date or datetime, inclusive (default: depends on granularity)')
+    end = serializers.CharField(required=False, help_text='ISO date or datetime, exclusive (default: now)')
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default='day')
+    tz = serializers.CharField(default='UTC', help_text='IANA timezone, e.g. Europe/Berlin')
+
+    def validate_tz(self, value):
+        try:
+            return ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise serializers.ValidationError(f"Unknown timezone '{value}'")
+
+    def parse_moment(self, value, zone, field):
+        # Naive dates and datetimes are read in the requested timezone
+        try:
+            moment = parse_datetime(value)
+            day = parse_date(value) if moment is None else None
+        except ValueError:
+            moment = day = None
+        if moment is None and day is None:
+            raise serializers.ValidationError({field: 'Expected an ISO 8601 date or datetime'})
+        if moment is None:
+            moment = datetime.combine(day, time.min)
+        if timezone.is_naive(moment):
+            moment = moment.replace(tzinfo=zone)
+        return moment
+
+    def validate(self, attrs):
+        zone = attrs['tz']
+        end = self.parse_moment(attrs['end'], zone, 'end') if 'end' in attrs else timezone.now()
+        if 'start' in attrs:
+            start = self.parse_moment(attrs['start'], zone, 'start')
+        else:
+            start = end - self.DEFAULT_SPANS[attrs['granularity']]
+        if start >= end:
+            raise serializers.ValidationError({'start': 'Must be before end'})
+
+        # Bounded before anything is queried so a request cannot ask for an unbounded series
+        limit = settings.STATS_MAX_BUCKETS
+        buckets = list(islice(bucket_starts(start, end, attrs['granularity'], zone), limit + 1))
+        if len(buckets) > limit:
+            raise serializers.ValidationError(
+                f'Range too large: more than {limit} {attrs["granularity"]} buckets, use a coarser granularity'
+            )
+        return {**attrs, 'start': start, 'end': end, 'buckets': buckets}
@@ -1,15 +1,172 @@
-from django.db.models import Count
-from django.db.models.functions import TruncDate, TruncWeek
+import os
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce, Greatest, Trunc, TruncDate, TruncWeek
 from django.utils import timezone
-from datetime import timedelta
-from .models import ClickStats
+from datetime import timedelta, timezone as dt_timezone
+from links.models import Link
+from links.sharding import get_shards, shard_querysets, using
+from webhooks.models import OutboxEvent
+from webhooks.services import OutboxService, link_payload
+from .live import click_broker
+from .models import ClickStats, SpoolCheckpoint
+from .spool import click_spool, copy_clicks, read_segment
+
+
+def _sum_by(rows, key, value):
+    # Merge per-shard grouped rows that share the same key
+    totals = {}
+    for row in rows:
+        totals[row[key]] = totals.get(row[key], 0) + row[value]
+    return [{key: k, value: totals[k]} for k in sorted(totals)]
+
+
+def _count_loaded_click(link):
+    # Links loaded with only() may leave click_count deferred: reading it here would cost a query per click
+    if 'click_count' not in link.get_deferred_fields():
+        link.click_count += 1
+
+
+def _floor_bucket(value, granularity):
+    # Start of the bucket holding `value`, in value's own timezone
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(value, granularity):
+    if granularity == 'hour':
+        # Step in UTC so DST changes neither skip nor repeat an hour
+        return (value.astimezone(dt_timezone.utc) + timedelta(hours=1)).astimezone(value.tzinfo)
+    local = value.replace(tzinfo=None)
+    if granularity == 'month':
+        local = local.replace(year=local.year + local.month // 12, month=local.month % 12 + 1)
+    else:
+        local += timedelta(days=7 if granularity == 'week' else 1)
+    return local.replace(tzinfo=value.tzinfo)
+
+
+def bucket_starts(start, end, granularity, zone):
+    """Start of every `granularity` bucket overlapping [start, end), as local times in `zone`."""
+    current = _floor_bucket(start.astimezone(zone), granularity)
+    while current < end:
+        yield current
+        current = _next_bucket(current, granularity)
+
+
+class ClickLimitReached(Exception):
+    """The link reached its max_clicks before this click could be counted."""
 
 
 class AnalyticsService:
 
     @staticmethod
     def track_click(link):
-        return ClickStats.objects.create(link=link)
+        """
+        Record a click. In CLICK_INGEST_MODE 'spool' it is only appended to the
+        local click spool (no database write, returns None); load_click_spool
+        inserts it and bumps the counter later. Clicks of links with max_clicks
+        are always written directly, so the limit holds in spool mode too.
+        """
+        if link.max_clicks is not None:
+            # The counter update enforces the limit, so concurrent clicks cannot pass it; a click
+            # that finds the link at its limit is rolled back with its click_stats row
+            alias = router.db_for_write(type(link), instance=link)
+            with transaction.atomic(using=alias):
+                click = link.clicks.create()
+                if not AnalyticsService.count_clicks(link, 1, alias, click.clicked_at, limited=True):
+                    raise ClickLimitReached(link.pk)
+            click_broker.publish(link.pk, link.user_id)
+            return click
+        if settings.CLICK_INGEST_MODE == 'spool':
+            click_spool.append(link.pk)
+            _count_loaded_click(link)
+            click_broker.publish(link.pk, link.user_id)
+            return None
+        # Created through the link so the click lands on the link's shard
+        click = link.clicks.create()
+        if settings.CLICK_MILESTONES:
+            AnalyticsService.count_clicks(link, 1, router.db_for_write(type(link), instance=link), click.clicked_at)
+        else:
+            using(type(link), link._state.db).filter(pk=link.pk).update(
+                click_count=F('click_count') + 1, last_clicked_at=click.clicked_at
+            )
+            _count_loaded_click(link)
+        click_broker.publish(link.pk, link.user_id)
+        return click
+
+    @staticmethod
+    def count_clicks(link, count, alias, clicked_at, limited=False):
+        """
+        Add `count` clicks, the latest at `clicked_at`, to the link's click
+        counter on `alias` and emit a link.click_milestone event for every
+        CLICK_MILESTONES value it reaches. With `limited`, nothing is counted
+        when that would take the counter past max_clicks; returns whether the
+        clicks were counted.
+        """
+        links = type(link).objects.using(alias).filter(pk=link.pk)
+        target = links.filter(click_count__lte=F('max_clicks') - count) if limited else links
+        values = {
+            'click_count': F('click_count') + count,
+            # Spool segments may load out of order: last_clicked_at never moves back
+            'last_clicked_at': Greatest(Coalesce(F('last_clicked_at'), Value(clicked_at)), Value(clicked_at)),
+        }
+        if not settings.CLICK_MILESTONES:
+            # The common case: one UPDATE per click, no transaction and no re-read
+            return target.update(**values) == 1
+
+        # Re-read the counter in the same transaction so concurrent clicks can neither
+        # skip a milestone nor emit it twice: exactly one increment lands on it
+        with transaction.atomic(using=alias):
+            if not target.update(**values):
+                return False
+            link.click_count = links.values_list('click_count', flat=True).get()
+            for milestone in sorted(settings.CLICK_MILESTONES):
+                if link.click_count - count < milestone <= link.click_count:
+                    payload = {**link_payload(link), 'milestone': milestone}
+                    OutboxService.emit(OutboxEvent.LINK_CLICK_MILESTONE, payload, alias)
+        return True
+
+    @staticmethod
+    def load_spool_segment(path):
+        """
+        Insert the clicks of a closed spool segment into click_stats on each
+        link's shard and add them to the click counters. Each shard commits its
+        part with a SpoolCheckpoint, so a segment reloaded after a crash is not
+        counted twice. Returns (loaded, dropped); clicks on deleted links are dropped.
+        """
+        name = os.path.basename(path)
+        # Only per-link totals stay in memory; the rows are streamed from the file again per shard
+        totals = {}
+        records = 0
+        for link_id, clicked_at in read_segment(path):
+            records += 1
+            count, latest = totals.get(link_id, (0, clicked_at))
+            totals[link_id] = (count + 1, max(latest, clicked_at))
+
+        loaded = 0
+        for alias in get_shards():
+            with transaction.atomic(using=alias):
+                checkpoint = SpoolCheckpoint.objects.using(alias).filter(segment=name).first()
+                if checkpoint:
+                    loaded += checkpoint.clicks
+                    continue
+                links = list(Link.objects.using(alias).filter(pk__in=list(totals)))
+                present = {link.pk for link in links}
+                copy_clicks(alias, (record for record in read_segment(path) if record[0] in present))
+                for link in links:
+                    count, latest = totals[link.pk]
+                    AnalyticsService.count_clicks(link, count, alias, latest)
+                clicks = sum(totals[pk][0] for pk in present)
+                SpoolCheckpoint.objects.using(alias).create(segment=name, clicks=clicks)
+                loaded += clicks
+        return loaded, records - loaded
 
     @staticmethod
     def get_link_stats(link):
@@ -48,19 +205,64 @@ class AnalyticsService:
             'weekly_clicks': list(weekly_clicks),
         }
 
+    @staticmethod
+    def get_link_series(link, start, end, granularity, zone, buckets=None):
+        """
+        Gap-filled click counts per `granularity` bucket of [start, end) in
+        timezone `zone`, from one grouped query. `buckets` may pass the
+        precomputed bucket_starts() (the view uses it to enforce its cap).
+        """
+        buckets = list(buckets if buckets is not None else bucket_starts(start, end, granularity, zone))
+        counts = AnalyticsService.get_series_counts([link], start, end, granularity, zone, buckets)[link.pk]
+        return [{'start': bucket.isoformat(), 'clicks': count} for bucket, count in zip(buckets, counts)]
+
+    @staticmethod
+    def get_series_counts(links, start, end, granularity, zone, buckets):
+        """
+        {link id: [clicks per bucket]} for many links, aligned to `buckets`.
+        One grouped query per shard, however many links are asked for.
+        """
+        position = {bucket.astimezone(dt_timezone.utc): i for i, bucket in enumerate(buckets)}
+        counts = {link.pk: [0] * len(buckets) for link in links}
+        by_shard = {}
+        for link in links:
+            by_shard.setdefault(link._state.db, []).append(link.pk)
+
+        for alias, link_ids in by_shard.items():
+            rows = (
+                using(ClickStats, alias)
+                .filter(link_id__in=link_ids, clicked_at__gte=start, clicked_at__lt=end)
+                .annotate(bucket=Trunc('clicked_at', granularity, tzinfo=zone))
+                .values('link_id', 'bucket')
+                .annotate(clicks=Count('id'))
+                .order_by()
+            )
+            for row in rows:
+                i = position.get(row['bucket'].astimezone(dt_timezone.utc))
+                if i is not None:
+                    counts[row['link_id']][i] = row['clicks']
+        return counts
+
     @staticmethod
     def get_global_stats():
         from links.models import Link
         from users.models import User
 
-        total_links = Link.objects.count()
-        active_links = Link.objects.filter(is_active=True).count()
-        total_clicks = ClickStats.objects.count()
+        links = shard_querysets(Link.objects.all())
+        total_links = sum(qs.count() for qs in links)
+        active_links = sum(qs.filter(is_active=True).count() for qs in links)
+        total_clicks = sum(qs.count() for qs in shard_querysets(ClickStats.objects.all()))
         total_users = User.objects.count()
 
-        top_links = Link.objects.annotate(
-            click_count=Count('clicks')
-        ).order_by('-click_count')[:10]
+        top_links = sorted(
+            (
+                link
+                for qs in links
+                for link in qs.order_by('-click_count')[:10]
+            ),
+            key=lambda link: link.click_count,
+            reverse=True,
+        )[:10]
 
         return {
             'total_links': total_links,
@@ -79,22 +281,34 @@ class AnalyticsService:
 
     @staticmethod
     def get_chart_data():
+        clicks = shard_querysets(ClickStats.objects.all())
+
         thirty_days_ago = timezone.now() - timedelta(days=30)
-        daily_data = (
-            ClickStats.objects.filter(clicked_at__gte=thirty_days_ago)
-            .annotate(date=TruncDate('clicked_at'))
-            .values('date')
-            .annotate(clicks=Count('id'))
-            .order_by('date')
+        daily_data = _sum_by(
+            (
+                row
+                for qs in clicks
+                for row in qs.filter(clicked_at__gte=thirty_days_ago)
+                .annotate(date=TruncDate('clicked_at'))
+                .values('date')
+                .annotate(clicks=Count('id'))
+                .order_by('date')
+            ),
+            'date', 'clicks',
         )
 
         twelve_weeks_ago = timezone.now() - timedelta(weeks=12)
-        weekly_data = (
-            ClickStats.objects.filter(clicked_at__gte=twelve_weeks_ago)
-            .annotate(week=TruncWeek('clicked_at'))
-            .values('week')
-            .annotate(clicks=Count('id'))
-            .order_by('week')
+        weekly_data = _sum_by(
+            (
+                row
+                for qs in clicks
+                for row in qs.filter(clicked_at__gte=twelve_weeks_ago)
+                .annotate(week=TruncWeek('clicked_at'))
+                .values('week')
+                .annotate(clicks=Count('id'))
+                .order_by('week')
+            ),
+            'week', 'clicks',
         )
 
         return {
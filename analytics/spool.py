@@ -0,0 +1,167 @@
+"""
+Append-only click spool (CLICK_INGEST_MODE = 'spool').
+
+track_click appends one fixed-width record (link id, click time in epoch
+microseconds) to the open segment of its process with a single O_APPEND
+write, so redirects never wait on the database. A process that crashes loses
+at most the record it was writing; a torn trailing record is ignored.
+
+Segments are named `<created µs>-<pid>.open` while written and renamed to
+`.seg` once CLICK_SPOOL_SEGMENT_BYTES or CLICK_SPOOL_SEGMENT_SECONDS is
+reached. load_click_spool inserts closed segments into click_stats (COPY on
+PostgreSQL), records a SpoolCheckpoint in the same transaction and deletes the
+file afterwards, so a segment is counted exactly once even if loading crashes.
+"""
+import os
+import struct
+import threading
+import time
+from itertools import islice
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connections
+
+RECORD = struct.Struct('<qq')
+OPEN_SUFFIX = '.open'
+CLOSED_SUFFIX = '.seg'
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Records read from a segment, and rows sent to the database, per chunk
+READ_RECORDS = 64 * 1024
+COPY_BATCH = 10_000
+
+
+def now_us():
+    return time.time_ns() // 1000
+
+
+def segment_created_us(name):
+    return int(name.split('-', 1)[0])
+
+
+def read_segment(path):
+    """Iterate the (link_id, clicked_at) records of a segment, read in chunks; a torn trailing record is skipped."""
+    chunk = RECORD.size * READ_RECORDS
+    with open(path, 'rb') as segment:
+        while data := segment.read(chunk):
+            usable = len(data) - len(data) % RECORD.size
+            for link_id, micros in RECORD.iter_unpack(data[:usable]):
+                yield link_id, EPOCH + timedelta(microseconds=micros)
+            if len(data) < chunk:
+                return
+
+
+class CsvRows:
+    """
+    Read-only file over (link_id, clicked_at) rows as CSV lines, for
+    copy_expert: rows are formatted as COPY asks for more, never all at once.
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            batch = list(islice(self.rows, COPY_BATCH))
+            if not batch:
+                break
+            self.buffer += ''.join(f'{link_id},{clicked_at.isoformat()}\n' for link_id, clicked_at in batch)
+        size = len(self.buffer) if size < 0 else size
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def copy_clicks(alias, rows):
+    """
+    Insert an iterable of (link_id, clicked_at) rows into click_stats on
+    `alias`: one streamed COPY on PostgreSQL, batched executemany elsewhere.
+    """
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.copy_expert('COPY click_stats (link_id, clicked_at) FROM STDIN WITH (FORMAT csv)',
+                               CsvRows(rows), size=64 * 1024)
+            return
+        rows = iter(rows)
+        while batch := list(islice(rows, COPY_BATCH)):
+            cursor.executemany(
+                'INSERT INTO click_stats (link_id, clicked_at) VALUES (%s, %s)',
+                [(link_id, connection.ops.adapt_datetimefield_value(clicked_at)) for link_id, clicked_at in batch],
+            )
+
+
+def closed_segments(directory=None, now=None):
+    """
+    Paths of the segments ready to load, oldest first. Open segments left by a
+    process that stopped writing are closed once they are twice as old as a
+    segment may get; a live writer rotates well before that.
+    """
+    directory = directory or settings.CLICK_SPOOL_DIR
+    if not os.path.isdir(directory):
+        return []
+    now = now or now_us()
+    stale_us = 2 * settings.CLICK_SPOOL_SEGMENT_SECONDS * 1_000_000
+    for name in os.listdir(directory):
+        if name.endswith(OPEN_SUFFIX) and now - segment_created_us(name) >= stale_us:
+            path = os.path.join(directory, name)
+            try:
+                os.rename(path, path[:-len(OPEN_SUFFIX)] + CLOSED_SUFFIX)
+            except FileNotFoundError:
+                pass
+    names = sorted(name for name in os.listdir(directory) if name.endswith(CLOSED_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+class ClickSpool:
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._fd = None
+        self._path = None
+        self._pid = None
+        self._created_us = 0
+        self._size = 0
+
+    def append(self, link_id, clicked_at_us=None):
+        record = RECORD.pack(link_id, clicked_at_us or now_us())
+        with self._lock:
+            if self._fd is None or self._pid != os.getpid() or self._due():
+                self._rotate()
+            os.write(self._fd, record)
+            self._size += len(record)
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+    def _due(self):
+        return (self._size >= settings.CLICK_SPOOL_SEGMENT_BYTES
+                or now_us() - self._created_us >= settings.CLICK_SPOOL_SEGMENT_SECONDS * 1_000_000)
+
+    def _rotate(self):
+        if self._pid == os.getpid():
+            self._close_segment()
+        elif self._fd is not None:
+            # A forked worker inherits the parent's segment; it leaves it to the parent and starts its own
+            os.close(self._fd)
+        directory = self.directory or settings.CLICK_SPOOL_DIR
+        os.makedirs(directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._created_us = now_us()
+        self._path = os.path.join(directory, f'{self._created_us:020d}-{self._pid}{OPEN_SUFFIX}')
+        self._fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_EXCL, 0o644)
+        self._size = 0
+
+    def _close_segment(self):
+        if self._fd is None:
+            return
+        os.close(self._fd)
+        self._fd = None
+        try:
+            os.rename(self._path, self._path[:-len(OPEN_SUFFIX)] + CLOSED_SUFFIX)
+        except FileNotFoundError:
+            # Already closed by the loader as stale
+            pass
+
+
+click_spool = ClickSpool()
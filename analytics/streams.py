@@ -0,0 +1,97 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from links.models import Link
+from links.sharding import shard_querysets
+from .live import click_broker
+
+
+def authenticate_stream(request):
+    """
+    The JWT user of a stream request, or None. EventSource cannot send headers,
+    so the access token may also come as the `access_token` query parameter.
+    """
+    authentication = JWTAuthentication()
+    try:
+        result = authentication.authenticate(request)
+        if result is not None:
+            return result[0]
+        raw_token = request.GET.get('access_token')
+        if raw_token:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        pass
+    return None
+
+
+def get_link_owners(link_ids):
+    """{link id: owner id} for the given ids that exist, one query per shard."""
+    return {
+        pk: user_id
+        for queryset in shard_querysets(Link.objects.filter(pk__in=link_ids))
+        for pk, user_id in queryset.values_list('pk', 'user_id')
+    }
+
+
+# Live click-count deltas as Server-Sent Events (Owner or Admin)
+class ClickStreamView(View):
+    """
+    Streams `clicks` events with the click-count deltas of the last tick:
+
+        event: clicks
+        data: {"links": {"12": 3, "15": 1}, "total": 4, "scope": "process"}
+
+    Admins get every link, users their own links; `?links=1,2` narrows the
+    stream to those links (owner or admin, like LinkStatsView). The deltas are
+    the clicks tracked by this server process only (see analytics.live).
+
+    ASGI only: under WSGI Django would drain the endless async iterator into a
+    list and never respond, so the view answers 501 there instead.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'error': 'The click stream needs the ASGI server (config.asgi:application).'},
+                                status=501)
+
+        user = await sync_to_async(authenticate_stream)(request)
+        if user is None or not user.is_active:
+            return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+
+        try:
+            link_ids = {int(pk) for pk in request.GET.get('links', '').split(',') if pk}
+        except ValueError:
+            return JsonResponse({'error': 'links must be a comma-separated list of ids'}, status=400)
+
+        if link_ids:
+            owners = await sync_to_async(get_link_owners)(link_ids)
+            if len(owners) < len(link_ids):
+                return JsonResponse({'error': 'Link not found'}, status=404)
+            if not user.is_admin and any(owner != user.pk for owner in owners.values()):
+                return JsonResponse({'error': 'Permission denied'}, status=403)
+
+        owner_id = None if user.is_admin else user.pk
+        response = StreamingHttpResponse(self.events(owner_id, link_ids), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, owner_id, link_ids):
+        async with click_broker.subscribe(owner_id=owner_id, link_ids=link_ids) as subscription:
+            yield 'retry: 3000\n\n'
+            while True:
+                deltas = await subscription.next(timeout=settings.CLICK_STREAM_HEARTBEAT_SECONDS)
+                if deltas is None:
+                    # Comment line: keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                data = {'links': {str(pk): count for pk, count in deltas.items()}, 'total': sum(deltas.values()),
+                        'scope': 'process'}
+                yield f'event: clicks\ndata: {json.dumps(data)}\n\n'
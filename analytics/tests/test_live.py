@@ -0,0 +1,97 @@
+import asyncio
+import json
+import pytest
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, Client
+from rest_framework_simplejwt.tokens import AccessToken
+from analytics.live import ClickBroker, click_broker
+from analytics.services import AnalyticsService
+from links.services import LinkService
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def fast_ticks(settings):
+    settings.CLICK_STREAM_TICK_SECONDS = 0.01
+    settings.CLICK_STREAM_HEARTBEAT_SECONDS = 0.05
+
+
+class TestClickBroker:
+    def test_clicks_are_coalesced_per_tick(self):
+        broker = ClickBroker()
+
+        async def scenario():
+            async with broker.subscribe() as everything, broker.subscribe(owner_id=7) as own:
+                for _ in range(100):
+                    broker.publish(1, 7)
+                broker.publish(2, 8)
+                return await everything.next(timeout=1), await own.next(timeout=1)
+
+        everything, own = asyncio.run(scenario())
+        assert everything == {1: 100, 2: 1}
+        assert own == {1: 100}
+
+    def test_link_filter_and_idle_timeout(self):
+        broker = ClickBroker()
+
+        async def scenario():
+            async with broker.subscribe(link_ids={2}) as subscription:
+                broker.publish(1, None)
+                assert await subscription.next(timeout=0.05) is None
+                broker.publish(2, None)
+                return await subscription.next(timeout=1)
+
+        assert asyncio.run(scenario()) == {2: 1}
+
+    def test_clicks_without_subscribers_are_dropped(self):
+        broker = ClickBroker()
+        broker.publish(1, None)
+        assert broker.drain() == ({}, {})
+
+
+@pytest.mark.django_db(transaction=True)
+class TestClickStreamView:
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.link = LinkService.create_link('https://example.com', user=self.user)
+        self.foreign = LinkService.create_link('https://example.com/other', user=self.other)
+
+    def stream(self, user, query=''):
+        token = str(AccessToken.for_user(user))
+        return AsyncClient().get(f'/api/analytics/stream/?access_token={token}{query}')
+
+    def test_requires_authentication(self):
+        response = asyncio.run(AsyncClient().get('/api/analytics/stream/'))
+        assert response.status_code == 401
+
+    def test_refused_under_wsgi(self):
+        token = str(AccessToken.for_user(self.user))
+        response = Client().get(f'/api/analytics/stream/?access_token={token}')
+        assert response.status_code == 501
+
+    def test_user_receives_own_click_deltas(self):
+        async def scenario():
+            response = await self.stream(self.user)
+            assert response['Content-Type'] == 'text/event-stream'
+            events = aiter(response.streaming_content)
+            assert await anext(events) == b'retry: 3000\n\n'
+            track = sync_to_async(AnalyticsService.track_click)
+            await track(self.link)
+            await track(self.link)
+            await track(self.foreign)
+            while True:
+                event = (await anext(events)).decode()
+                if event.startswith('event: clicks'):
+                    await events.aclose()
+                    return json.loads(event.split('data: ', 1)[1])
+
+        assert asyncio.run(scenario()) == {'links': {str(self.link.pk): 2}, 'total': 2, 'scope': 'process'}
+        assert not click_broker._subscriptions
+
+    def test_link_scope_matches_stats_permissions(self):
+        assert asyncio.run(self.stream(self.user, f'&links={self.foreign.pk}')).status_code == 403
+        assert asyncio.run(self.stream(self.user, '&links=999999')).status_code == 404
+        assert asyncio.run(self.stream(self.user, '&links=abc')).status_code == 400
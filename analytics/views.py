@@ -1,21 +1,26 @@
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.response import Response
-from drf_spectacular.utils import extend_schema, OpenApiResponse
 from .models import ClickStats
+from .projections import ClickStatsProjection
 from .serializers import ClickStatsSerializer
 from .services import AnalyticsService
 from users.permissions import IsAdmin
-from .schemas import clickstats_list_schema, clickstats_detail_schema, global_stats_schema, chart_stats_schema
+from links.sharding import ShardedListMixin, is_sharded, shard_for_id
+from utils.projection import ProjectionListMixin
+from utils.schema import LazySchemas
+
+schemas = LazySchemas('analytics.schemas')
 
 
 # List all click statistics (Admin only)
-class ClickStatsListView(ListAPIView):
+class ClickStatsListView(ProjectionListMixin, ShardedListMixin, ListAPIView):
     queryset = ClickStats.objects.all()
     serializer_class = ClickStatsSerializer
+    projection_class = ClickStatsProjection
     permission_classes = [IsAdmin]
 
-    @clickstats_list_schema
+    @schemas.clickstats_list_schema
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
@@ -25,7 +30,13 @@ class ClickStatsDetailView(RetrieveAPIView):
     serializer_class = ClickStatsSerializer
     permission_classes = [IsAdmin]
 
-    @clickstats_detail_schema
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if is_sharded():
+            return queryset.using(shard_for_id(self.kwargs['pk']))
+        return queryset
+
+    @schemas.clickstats_detail_schema
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
@@ -34,7 +45,7 @@ class ClickStatsDetailView(RetrieveAPIView):
 class GlobalStatsView(APIView):
     permission_classes = [IsAdmin]
 
-    @global_stats_schema
+    @schemas.global_stats_schema
     def get(self, request):
         stats = AnalyticsService.get_global_stats()
         return Response(stats)
@@ -44,7 +55,7 @@ class GlobalStatsView(APIView):
 class ClickChartDataView(APIView):
     permission_classes = [IsAdmin]
 
-    @chart_stats_schema
+    @schemas.chart_stats_schema
     def get(self, request):
         chart_data = AnalyticsService.get_chart_data()
         return Response(chart_data)
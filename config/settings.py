@@ -53,12 +53,16 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'links.apps.LinksConfig',
     'analytics.apps.AnalyticsConfig',
+    'utils.apps.UtilsConfig',
+    'webhooks.apps.WebhooksConfig',
+    'scheduler.apps.SchedulerConfig',
 
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'utils.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -109,11 +113,140 @@ DATABASES = {
     }
 }
 
-# DATABASES = {
-#     'default': dj_database_url.config(
-#         default=os.environ.get("DATABASE_URL")
-#     )
-# }
+# DATABASE_URL overrides the primary, e.g. sqlite:///primary.sqlite3 for local testing
+if os.getenv('DATABASE_URL'):
+    DATABASES['default'] = dj_database_url.parse(os.environ['DATABASE_URL'])
+
+# Read replicas: comma separated database URLs, registered as replica_1, replica_2, ...
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(url.strip())
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+# Link shards: 'default' plus comma separated database URLs registered as shard_1, shard_2, ...
+# Links and their clicks are partitioned across them by a hash of the short code (links.sharding).
+LINK_SHARDS = ['default']
+for index, url in enumerate(filter(None, os.getenv('LINK_SHARD_URLS', '').split(',')), start=1):
+    alias = f'shard_{index}'
+    DATABASES[alias] = dj_database_url.parse(url.strip())
+    LINK_SHARDS.append(alias)
+
+DATABASE_ROUTERS = ['utils.db_router.PrimaryReplicaRouter']
+
+# Seconds a client stays pinned to the primary after a write (read-your-writes)
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '15'))
+# Seconds a failed replica is skipped before it is tried again
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+
+# Admin changelists count exactly up to this many rows, then use an estimate (utils.admin)
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('ADMIN_EXACT_COUNT_LIMIT', '10000'))
+
+# Most buckets a per-link stats series may have (LinkStatsView)
+STATS_MAX_BUCKETS = int(os.getenv('STATS_MAX_BUCKETS', '1000'))
+# Most links per batch stats request (LinkBatchStatsView)
+STATS_BATCH_MAX_LINKS = int(os.getenv('STATS_BATCH_MAX_LINKS', '100'))
+
+# Live click stream (analytics.live): seconds between pushed deltas, and between keepalives
+CLICK_STREAM_TICK_SECONDS = float(os.getenv('CLICK_STREAM_TICK_SECONDS', '1'))
+CLICK_STREAM_HEARTBEAT_SECONDS = float(os.getenv('CLICK_STREAM_HEARTBEAT_SECONDS', '15'))
+
+# Links per UPDATE/DELETE statement in bulk link operations
+LINK_BULK_CHUNK_SIZE = int(os.getenv('LINK_BULK_CHUNK_SIZE', '1000'))
+
+# Negative-lookup filter over short codes (links.code_filter): unknown codes get a 404 without a query.
+# Sized for the current links times the headroom at the target false-positive rate; refreshed with the
+# links created by other workers at most every REFRESH seconds, rebuilt in the background every REBUILD
+# seconds. A link created by another worker gets a 404 from this one for up to REFRESH seconds, and until
+# the next rebuild if its id committed more than ID_OVERLAP ids below the highest id already seen
+LINK_CODE_FILTER = os.getenv('LINK_CODE_FILTER', 'False') == 'True'
+LINK_CODE_FILTER_FALSE_POSITIVE_RATE = float(os.getenv('LINK_CODE_FILTER_FALSE_POSITIVE_RATE', '0.001'))
+LINK_CODE_FILTER_HEADROOM = float(os.getenv('LINK_CODE_FILTER_HEADROOM', '1.5'))
+LINK_CODE_FILTER_REFRESH_SECONDS = float(os.getenv('LINK_CODE_FILTER_REFRESH_SECONDS', '1'))
+LINK_CODE_FILTER_REBUILD_SECONDS = float(os.getenv('LINK_CODE_FILTER_REBUILD_SECONDS', '3600'))
+LINK_CODE_FILTER_ID_OVERLAP = int(os.getenv('LINK_CODE_FILTER_ID_OVERLAP', '1000'))
+
+# Resolved links (links.resolver_cache): seconds an entry is served (0: off), entries per process, and the
+# boot-time pre-warm of the links most clicked in the last PREWARM_HOURS, bounded by count, time and bytes.
+# Off by default: the 'links' cache is per process, so an update only invalidates the worker making it;
+# point CACHES['links'] at a shared backend before turning it on
+LINK_CACHE_SECONDS = int(os.getenv('LINK_CACHE_SECONDS', '0'))
+LINK_CACHE_MAX_ENTRIES = int(os.getenv('LINK_CACHE_MAX_ENTRIES', '100000'))
+LINK_CACHE_PREWARM_LINKS = int(os.getenv('LINK_CACHE_PREWARM_LINKS', '10000'))
+LINK_CACHE_PREWARM_HOURS = int(os.getenv('LINK_CACHE_PREWARM_HOURS', '24'))
+LINK_CACHE_PREWARM_SECONDS = float(os.getenv('LINK_CACHE_PREWARM_SECONDS', '5'))
+LINK_CACHE_PREWARM_MAX_BYTES = int(os.getenv('LINK_CACHE_PREWARM_MAX_BYTES', str(64 * 1024 * 1024)))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'links': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'links',
+        'TIMEOUT': LINK_CACHE_SECONDS,
+        'OPTIONS': {'MAX_ENTRIES': LINK_CACHE_MAX_ENTRIES},
+    },
+}
+
+# Most links a user may own, per role (empty for no limit); User.link_quota overrides it per user.
+# Enforced from the User.link_count counter, never by counting links
+LINK_QUOTAS = {
+    role: int(value) if value else None
+    for role, value in [
+        ('GUEST', os.getenv('LINK_QUOTA_GUEST', '100')),
+        ('USER', os.getenv('LINK_QUOTA_USER', '10000')),
+        ('ADMIN', os.getenv('LINK_QUOTA_ADMIN', '')),
+    ]
+}
+
+# Minutes between refreshes of the per-user link metrics (active links, clicks, last click) that the
+# user list sorts and filters on; 0 leaves them to refresh_user_link_metrics
+USER_METRICS_REFRESH_MINUTES = float(os.getenv('USER_METRICS_REFRESH_MINUTES', '15'))
+
+# Destination health checks (check_link_health): probes in flight, per host, and seconds before one gives up.
+# With MAX_AGE_HOURS above 0 the scheduler re-probes every link whose last result is older than that
+LINK_HEALTH_CONCURRENCY = int(os.getenv('LINK_HEALTH_CONCURRENCY', '200'))
+LINK_HEALTH_PER_HOST = int(os.getenv('LINK_HEALTH_PER_HOST', '4'))
+LINK_HEALTH_TIMEOUT_SECONDS = float(os.getenv('LINK_HEALTH_TIMEOUT_SECONDS', '10'))
+LINK_HEALTH_MAX_AGE_HOURS = float(os.getenv('LINK_HEALTH_MAX_AGE_HOURS', '0'))
+# Host names and networks (CIDR) probed even though they resolve to non-public addresses; everything else
+# internal (loopback, private, link-local/metadata) is refused, since link destinations are user input
+LINK_HEALTH_ALLOWED_HOSTS = [host for host in os.getenv('LINK_HEALTH_ALLOWED_HOSTS', '').split(',') if host]
+
+# Click ingestion: 'database' writes each click in the request, 'spool' appends it to a local segment
+# file under CLICK_SPOOL_DIR that load_click_spool bulk-loads; segments close at the size or age limit
+CLICK_INGEST_MODE = os.getenv('CLICK_INGEST_MODE', 'database')
+CLICK_SPOOL_DIR = os.getenv('CLICK_SPOOL_DIR', str(BASE_DIR / 'var' / 'click_spool'))
+CLICK_SPOOL_SEGMENT_BYTES = int(os.getenv('CLICK_SPOOL_SEGMENT_BYTES', str(16 * 1024 * 1024)))
+CLICK_SPOOL_SEGMENT_SECONDS = float(os.getenv('CLICK_SPOOL_SEGMENT_SECONDS', '10'))
+
+# Click counts that emit a link.click_milestone webhook event (empty: none). Setting any makes each counted
+# click a transaction with an UPDATE and a re-read of the counter instead of a single UPDATE
+CLICK_MILESTONES = [int(n) for n in os.getenv('CLICK_MILESTONES', '').split(',') if n]
+
+# Webhook delivery (deliver_webhooks): events per request, request timeout, and retries with
+# exponential backoff (WEBHOOK_BACKOFF_SECONDS doubled per attempt, capped at WEBHOOK_MAX_BACKOFF_SECONDS)
+WEBHOOK_BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', '100'))
+WEBHOOK_CONCURRENCY = int(os.getenv('WEBHOOK_CONCURRENCY', '8'))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv('WEBHOOK_TIMEOUT_SECONDS', '10'))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '10'))
+WEBHOOK_BACKOFF_SECONDS = float(os.getenv('WEBHOOK_BACKOFF_SECONDS', '5'))
+WEBHOOK_MAX_BACKOFF_SECONDS = float(os.getenv('WEBHOOK_MAX_BACKOFF_SECONDS', '3600'))
+# Seconds the running sender's lease lasts without renewal; it is renewed before every round, so it must
+# outlast one round of requests (a standby instance takes over this long after the sender dies)
+WEBHOOK_LEASE_SECONDS = int(os.getenv('WEBHOOK_LEASE_SECONDS', '120'))
+# Days delivered webhook deliveries are kept before the webhooks.prune_delivered_webhooks job deletes them
+# (0: kept forever); pending and failed ones are never pruned
+WEBHOOK_DELIVERED_RETENTION_DAYS = int(os.getenv('WEBHOOK_DELIVERED_RETENTION_DAYS', '7'))
+
+# Periodic jobs (run_scheduler): seconds between checks for due jobs, how long a node holds a running
+# job's lease before another node may take it over, days of run history kept, and jobs not to run
+SCHEDULER_TICK_SECONDS = float(os.getenv('SCHEDULER_TICK_SECONDS', '5'))
+SCHEDULER_LEASE_SECONDS = int(os.getenv('SCHEDULER_LEASE_SECONDS', '600'))
+SCHEDULER_HISTORY_DAYS = int(os.getenv('SCHEDULER_HISTORY_DAYS', '30'))
+SCHEDULER_DISABLED_JOBS = [name for name in os.getenv('SCHEDULER_DISABLED_JOBS', '').split(',') if name]
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -206,6 +339,8 @@ SPECTACULAR_SETTINGS = {
     ''',
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
+    # Applies the views' lazily declared schemas (utils.schema.LazySchemas) before generating
+    'DEFAULT_GENERATOR_CLASS': 'utils.schema_generator.SchemaGenerator',
     'COMPONENT_SPLIT_REQUEST': True,
     'TAGS': [
         {'name': 'Authentication', 'description': 'User registration and login endpoints'},
@@ -213,4 +348,9 @@ SPECTACULAR_SETTINGS = {
         {'name': 'Links', 'description': 'Link shortening and management endpoints'},
         {'name': 'Analytics', 'description': 'Click statistics and analytics endpoints'},
     ],
-}
\ No newline at end of file
+}
+
+# Precomputed OpenAPI schema (utils.openapi): rebuilt whenever the code version changes
+APP_VERSION = os.getenv('APP_VERSION', '')
+OPENAPI_SCHEMA_DIR = Path(os.getenv('OPENAPI_SCHEMA_DIR', BASE_DIR / 'build' / 'openapi'))
+OPENAPI_SCHEMA_MAX_AGE = int(os.getenv('OPENAPI_SCHEMA_MAX_AGE', str(60 * 60 * 24)))
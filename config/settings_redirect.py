@@ -0,0 +1,38 @@
+"""
+Settings for redirect-only nodes.
+
+Loads just what short code resolution and click tracking need: no admin,
+sessions, messages, static files, API docs or browsable API. Run workers with
+DJANGO_SETTINGS_MODULE=config.settings_redirect and route only
+/api/links/<code>/ to them; see README ("Redirect Nodes").
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+
+    'users.apps.UsersConfig',
+    'links.apps.LinksConfig',
+    'analytics.apps.AnalyticsConfig',
+    'webhooks.apps.WebhooksConfig',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'utils.middleware.ReplicaPinningMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'config.urls_redirect'
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    # The redirect endpoint is public, so requests are never authenticated
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+    'UNAUTHENTICATED_USER': None,
+}
@@ -16,7 +16,8 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
+from utils.openapi import CachedSpectacularAPIView
 
 
 urlpatterns = [
@@ -29,6 +30,6 @@ urlpatterns = [
     path('api/analytics/', include('analytics.urls')),
 
     # API Documentation
-    path('api/doc/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/doc/', CachedSpectacularAPIView.as_view(), name='schema'),
     path('api/schema/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
 ]
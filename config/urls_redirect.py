@@ -0,0 +1,13 @@
+"""
+URL configuration for redirect-only nodes (config.settings_redirect).
+
+Only the short code resolution endpoint is routed; it keeps the same path as in
+config.urls so a load balancer can send /api/links/<code>/ to either profile.
+"""
+from django.urls import path
+from links.redirect_views import RedirectLinkView
+
+
+urlpatterns = [
+    path('api/links/<str:code>/', RedirectLinkView.as_view(), name='redirect'),
+]
@@ -0,0 +1,20 @@
+import pytest
+from django.conf import settings
+
+
+def pytest_collection_modifyitems(items):
+    # With LINK_SHARD_URLS set, links and clicks may be stored on any shard
+    if len(settings.LINK_SHARDS) < 2:
+        return
+    for item in items:
+        marker = item.get_closest_marker('django_db')
+        if marker is not None and 'databases' not in marker.kwargs:
+            item.add_marker(pytest.mark.django_db(*marker.args, **marker.kwargs, databases='__all__'))
+
+
+@pytest.fixture(autouse=True)
+def clear_link_cache():
+    # Cached links would outlive the test database rows they were read from
+    from django.core.cache import caches
+
+    caches['links'].clear()
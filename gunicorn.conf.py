@@ -0,0 +1,29 @@
+# Loaded by gunicorn from the working directory; command-line options still apply.
+
+
+def post_worker_init(worker):
+    # Build per-worker caches before the first request instead of during it. Both are optional speed-ups:
+    # a failure (e.g. the database not reachable yet) is logged and the worker serves traffic anyway,
+    # rather than exiting and sending gunicorn into a restart loop
+    from django.conf import settings
+    from links import resolver_cache
+
+    if settings.LINK_CODE_FILTER:
+        from links.code_filter import code_filter
+
+        try:
+            elapsed = code_filter.build()
+        except Exception:
+            worker.log.exception('Short code filter not built; the first lookup will build it')
+        else:
+            worker.log.info('Short code filter built in %.2fs: %s', elapsed, code_filter.stats())
+
+    if resolver_cache.enabled():
+        try:
+            result = resolver_cache.prewarm()
+        except Exception:
+            worker.log.exception('Link cache not pre-warmed')
+        else:
+            worker.log.info('Link cache pre-warmed with %d link(s), %d bytes in %.2fs%s', result['links'],
+                            result['bytes'], result['seconds'],
+                            f" (stopped by {result['stopped']} budget)" if result['stopped'] else '')
@@ -1,13 +1,16 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from utils.admin import AutocompleteFilter, ScalableAdminMixin
 from .models import Link
+from .services import LinkService
 
 
 @admin.register(Link)
-class LinkAdmin(admin.ModelAdmin):
+class LinkAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ['short_code', 'custom_alias', 'original_url_truncated', 'user', 'is_active', 'total_clicks',
                     'created_at']
-    list_filter = ['is_active', 'created_at', 'user']
+    list_filter = ['is_active', 'created_at', ('user', AutocompleteFilter)]
+    list_select_related = ['user']
     search_fields = ['short_code', 'custom_alias', 'original_url', 'user__username', 'note']
     readonly_fields = ['short_code', 'total_clicks', 'created_at', 'updated_at']
     fieldsets = (
@@ -15,7 +18,7 @@ class LinkAdmin(admin.ModelAdmin):
             'fields': ('short_code', 'custom_alias', 'original_url', 'user')
         }),
         ('Status & Analytics', {
-            'fields': ('is_active', 'total_clicks')
+            'fields': ('is_active', 'active_from', 'expires_at', 'max_clicks', 'total_clicks')
         }),
         ('Additional Information', {
             'fields': ('note', 'created_at', 'updated_at'),
@@ -23,7 +26,8 @@ class LinkAdmin(admin.ModelAdmin):
         }),
     )
     list_per_page = 25
-    date_hierarchy = 'created_at'
+    # Primary key order matches creation order and is served by the pk index
+    ordering = ['-id']
     actions = ['activate_links', 'deactivate_links']
 
     def original_url_truncated(self, obj):
@@ -36,21 +40,24 @@ class LinkAdmin(admin.ModelAdmin):
     original_url_truncated.short_description = 'Original URL'
 
     def total_clicks(self, obj):
-        """Display total clicks"""
-        return obj.total_clicks
+        """Display total clicks (denormalized counter, no query per row)"""
+        return obj.click_count
 
     total_clicks.short_description = 'Clicks'
+    total_clicks.admin_order_field = 'click_count'
 
     def activate_links(self, request, queryset):
-        """Bulk activate links"""
-        updated = queryset.update(is_active=True)
+        """Bulk activate links (through LinkService so webhook events are emitted)"""
+        *_, progress = LinkService.bulk_update_links(queryset, 'activate')
+        updated = progress['affected']
         self.message_user(request, f'{updated} link(s) activated successfully.')
 
     activate_links.short_description = 'Activate selected links'
 
     def deactivate_links(self, request, queryset):
-        """Bulk deactivate links"""
-        updated = queryset.update(is_active=False)
+        """Bulk deactivate links (through LinkService so webhook events are emitted)"""
+        *_, progress = LinkService.bulk_update_links(queryset, 'deactivate')
+        updated = progress['affected']
         self.message_user(request, f'{updated} link(s) deactivated successfully.')
 
     deactivate_links.short_description = 'Deactivate selected links'
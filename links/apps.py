@@ -1,6 +1,49 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_delete, pre_save
+
+
+def ensure_shard_id_offsets(using, **kwargs):
+    from django.apps import apps
+    from .sharding import SHARDED_MODELS, ensure_id_offset, get_shards
+
+    if using not in get_shards():
+        return
+    for label in SHARDED_MODELS:
+        ensure_id_offset(using, apps.get_model(label))
+
+
+def allocate_link_id(sender, instance, raw, using, **kwargs):
+    # Link ids route to their shard (shard_for_id): on SQLite, keep new ids in the shard's own range
+    # even when links moved in by rebalance_link_shards carry larger ids from another range
+    from django.db import connections
+    from .sharding import is_sharded, next_sqlite_id
+
+    if raw or instance.pk is not None or not is_sharded() or connections[using].vendor != 'sqlite':
+        return
+    instance.pk = next_sqlite_id(using, sender)
+
+
+def delete_links_on_other_shards(sender, instance, using, **kwargs):
+    # The delete collector only cascades to links on the user's own database
+    from .models import Link
+    from .sharding import get_shards, is_sharded
+
+    if not is_sharded():
+        return
+    for alias in get_shards():
+        if alias != using:
+            Link.objects.using(alias).filter(user_id=instance.pk).delete()
 
 
 class LinksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'links'
+
+    def ready(self):
+        from django.conf import settings
+        post_migrate.connect(ensure_shard_id_offsets, sender=self, dispatch_uid='links.ensure_shard_id_offsets')
+        pre_save.connect(allocate_link_id, sender='links.Link', dispatch_uid='links.allocate_link_id')
+        pre_delete.connect(
+            delete_links_on_other_shards, sender=settings.AUTH_USER_MODEL,
+            dispatch_uid='links.delete_links_on_other_shards'
+        )
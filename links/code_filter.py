@@ -0,0 +1,196 @@
+"""
+Negative-lookup filter for short codes (LINK_CODE_FILTER).
+
+A Bloom filter over every short code and custom alias lets
+LinkService.get_link_by_code answer "no such link" for probing traffic without
+a query. It may answer "maybe" for a code that does not exist (at most
+LINK_CODE_FILTER_FALSE_POSITIVE_RATE of misses then reach the database), but
+never "no" for a code it has seen.
+
+Each worker builds its own filter (gunicorn.conf.py does it at worker start,
+otherwise the first lookup does) with one streaming scan per shard. Links this
+worker creates are added directly. Links created elsewhere are picked up by an
+incremental scan of the ids above the last one seen, at most every
+LINK_CODE_FILTER_REFRESH_SECONDS and only when a lookup misses. Deleted codes
+stay in the filter, costing a query, until the full rebuild every
+LINK_CODE_FILTER_REBUILD_SECONDS (or once the filter is over capacity), which
+runs on a background thread while lookups keep using the old filter.
+
+False negatives are possible for links created by other workers: such a link
+gets a 404 from this worker until its next refresh, up to
+LINK_CODE_FILTER_REFRESH_SECONDS after it was created. A link whose id
+committed more than LINK_CODE_FILTER_ID_OVERLAP ids below the highest id
+already seen is missed until the next rebuild. Clients that just created a
+link read through the primary and skip the filter.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+from .models import Link
+from .sharding import get_shards
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity, false_positive_rate):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.size = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        """
+        Set the key's bits. `count` only grows when a bit was unset, so adding a
+        key again (rescans, links added here and scanned later) does not count.
+        """
+        new = False
+        for position in self._positions(key):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def estimated_false_positive_rate(self):
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class CodeFilter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held for the whole of a build, so only one build scans the shards at a time
+        self._build_lock = threading.Lock()
+        self._bloom = None
+        self._watermarks = {}
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        self.rejected = 0
+
+    @property
+    def enabled(self):
+        return settings.LINK_CODE_FILTER
+
+    def build(self):
+        """Scan every shard into a new filter sized for the current links plus headroom."""
+        with self._build_lock:
+            return self._build()
+
+    def rebuild_in_background(self):
+        """Start a build on a thread unless one is running; lookups keep using the current filter meanwhile."""
+        if not self._build_lock.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._background_build, name='code-filter-build', daemon=True).start()
+        return True
+
+    def _background_build(self):
+        try:
+            self._build()
+        except Exception:
+            logger.exception('Short code filter rebuild failed')
+            # Retry at the next interval rather than on every lookup
+            self._built_at = time.monotonic()
+        finally:
+            self._build_lock.release()
+            connections.close_all()
+
+    def _build(self):
+        started = time.monotonic()
+        watermarks = {alias: 0 for alias in get_shards()}
+        total = sum(Link.objects.using(alias).count() for alias in watermarks)
+        bloom = BloomFilter(max(int(total * settings.LINK_CODE_FILTER_HEADROOM), 1000),
+                            settings.LINK_CODE_FILTER_FALSE_POSITIVE_RATE)
+        for alias in watermarks:
+            watermarks[alias] = self._scan(bloom, alias, 0)
+        with self._lock:
+            self._bloom, self._watermarks = bloom, watermarks
+            self._built_at = self._refreshed_at = time.monotonic()
+        return time.monotonic() - started
+
+    def refresh(self):
+        """Add the links created since the last scan (by any worker)."""
+        with self._lock:
+            for alias, watermark in self._watermarks.items():
+                # Ids are allocated before commit, so rescan a window below the watermark
+                # for rows that committed after a higher id was seen
+                since = max(watermark - settings.LINK_CODE_FILTER_ID_OVERLAP, 0)
+                self._watermarks[alias] = max(watermark, self._scan(self._bloom, alias, since))
+            self._refreshed_at = time.monotonic()
+
+    def _scan(self, bloom, alias, after_pk):
+        last_pk = after_pk
+        # Primary, not a replica: a lagging replica would hide new codes
+        rows = Link.objects.using(alias).filter(pk__gt=after_pk).values_list('pk', 'short_code', 'custom_alias')
+        for pk, short_code, custom_alias in rows.order_by().iterator(chunk_size=10000):
+            bloom.add(short_code)
+            if custom_alias:
+                bloom.add(custom_alias)
+            last_pk = max(last_pk, pk)
+        return last_pk
+
+    def add(self, link):
+        if self._bloom is None:
+            return
+        with self._lock:
+            self._bloom.add(link.short_code)
+            if link.custom_alias:
+                self._bloom.add(link.custom_alias)
+
+    def might_exist(self, code):
+        """False only for codes that certainly have no link."""
+        if not self.enabled:
+            return True
+        now = time.monotonic()
+        bloom = self._bloom
+        if bloom is None:
+            with self._build_lock:
+                if self._bloom is None:
+                    self._build()
+        elif now - self._built_at >= settings.LINK_CODE_FILTER_REBUILD_SECONDS or bloom.count > bloom.capacity:
+            self.rebuild_in_background()
+        if code in self._bloom:
+            return True
+        elif now - self._refreshed_at >= settings.LINK_CODE_FILTER_REFRESH_SECONDS:
+            # A miss may be a link created by another worker: catch up, at most once per interval
+            self.refresh()
+            if code in self._bloom:
+                return True
+        self.rejected += 1
+        return False
+
+    def stats(self):
+        bloom = self._bloom
+        if bloom is None:
+            return {'built': False}
+        return {
+            'built': True,
+            'codes': bloom.count,
+            'capacity': bloom.capacity,
+            'bits': bloom.size,
+            'hashes': bloom.hashes,
+            'memory_bytes': len(bloom.bits),
+            'target_false_positive_rate': bloom.false_positive_rate,
+            'estimated_false_positive_rate': bloom.estimated_false_positive_rate(),
+            'age_seconds': round(time.monotonic() - self._built_at, 1),
+            'rejected': self.rejected,
+        }
+
+
+code_filter = CodeFilter()
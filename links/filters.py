@@ -8,6 +8,11 @@ class LinkFilter(django_filters.FilterSet):
     created_before = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
     has_custom_alias = django_filters.BooleanFilter(method='filter_has_custom_alias')
     search = django_filters.CharFilter(method='filter_search')
+    # Result of the last check_link_health probe of the destination
+    health = django_filters.ChoiceFilter(
+        choices=[('healthy', 'Healthy'), ('broken', 'Broken'), ('unchecked', 'Not checked yet')],
+        method='filter_health',
+    )
 
     class Meta:
         model = Link
@@ -18,6 +23,11 @@ class LinkFilter(django_filters.FilterSet):
             return queryset.exclude(Q(custom_alias__isnull=True) | Q(custom_alias=''))
         return queryset.filter(Q(custom_alias__isnull=True) | Q(custom_alias=''))
 
+    def filter_health(self, queryset, name, value):
+        if value == 'unchecked':
+            return queryset.filter(health__isnull=True)
+        return queryset.filter(health__is_healthy=value == 'healthy')
+
     def filter_search(self, queryset, name, value):
         return queryset.filter(
             Q(short_code__icontains=value) |
@@ -0,0 +1,321 @@
+"""
+Destination health checks for active links (check_link_health).
+
+Active links are read from each shard in primary-key batches and their
+original_url probed by an asyncio HTTP/1.1 client running on its own event
+loop thread, while this thread keeps the database work: at most
+`concurrency` probes run at once, at most `per_host` per scheme, host and
+port, and each probe gives up after `timeout` seconds. Connections are kept
+alive and reused for the next probe of the same host.
+
+A probe is a HEAD request (a GET, closed after the headers, where HEAD is
+refused). Redirects are not followed: any answer below 400 is healthy. The
+last result of each link is kept in LinkHealth on the link's shard.
+
+Link destinations are user input, so a probe only connects to public
+addresses: a host that resolves to a loopback, private, link-local (cloud
+metadata), shared or reserved address is refused and recorded as an error,
+unless LINK_HEALTH_ALLOWED_HOSTS lists it. The probe then connects to the
+address that was checked, so the name cannot be re-resolved elsewhere.
+"""
+import asyncio
+import ipaddress
+import socket
+import ssl
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, wait
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import Link, LinkHealth
+from .sharding import get_shards, using
+
+USER_AGENT = 'link-shortener-health'
+
+# Answers to HEAD from servers that only implement GET
+HEAD_REFUSED = {405, 501}
+
+
+class ProbeError(Exception):
+    pass
+
+
+def is_healthy(result):
+    return result['status_code'] is not None and result['status_code'] < 400
+
+
+class AllowedHosts:
+    """Host names and networks (LINK_HEALTH_ALLOWED_HOSTS entries) probed even when not public."""
+
+    def __init__(self, entries):
+        self.names, self.networks = set(), []
+        for entry in entries:
+            try:
+                self.networks.append(ipaddress.ip_network(entry, strict=False))
+            except ValueError:
+                self.names.add(entry.lower())
+
+    def allows(self, host, address):
+        return host in self.names or any(address in network for network in self.networks)
+
+
+def is_public(address):
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+class HostPool:
+    """Idle keep-alive connections to one (scheme, host, port) and the limit on requests to it."""
+
+    def __init__(self, limit):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle = []
+        # Probes holding or waiting for the pool, and when the last one finished
+        self.users = 0
+        self.last_used = time.monotonic()
+
+
+class HealthChecker:
+    """
+    Probes URLs on an event loop. Create and use it inside the loop; call
+    close() there when done to drop the kept-alive connections.
+    """
+
+    # A host pool nobody used for this long is dropped with its connections
+    pool_idle_seconds = 30
+
+    def __init__(self, concurrency, per_host, timeout, allowed_hosts=()):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.per_host = per_host
+        self.timeout = timeout
+        self.allowed_hosts = AllowedHosts(allowed_hosts)
+        self.pools = {}
+        self.swept_at = time.monotonic()
+        self.ssl_context = ssl.create_default_context()
+
+    async def probe(self, url):
+        """{'status_code', 'latency_ms', 'error'} of one request to `url`."""
+        try:
+            parts = urlsplit(url)
+            if parts.scheme not in ('http', 'https') or not parts.hostname:
+                raise ProbeError('unsupported URL')
+            key = (parts.scheme, parts.hostname.lower(), parts.port or (443 if parts.scheme == 'https' else 80))
+        except ValueError:
+            return {'status_code': None, 'latency_ms': None, 'error': 'invalid URL'}
+        except ProbeError as error:
+            return {'status_code': None, 'latency_ms': None, 'error': str(error)}
+
+        pool = self.pools.setdefault(key, HostPool(self.per_host))
+        pool.users += 1
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        try:
+            async with self.semaphore, pool.semaphore:
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(self.request(pool, key, target, 'HEAD'), self.timeout)
+                    if status in HEAD_REFUSED:
+                        status = await asyncio.wait_for(self.request(pool, key, target, 'GET'), self.timeout)
+                except asyncio.TimeoutError:
+                    return {'status_code': None, 'latency_ms': None, 'error': f'timed out after {self.timeout}s'}
+                except ssl.SSLError as error:
+                    return {'status_code': None, 'latency_ms': None, 'error': f'TLS: {error.reason or error}'[:255]}
+                except (OSError, ProbeError, asyncio.IncompleteReadError) as error:
+                    error = str(error) or type(error).__name__
+                    return {'status_code': None, 'latency_ms': None, 'error': error[:255]}
+        finally:
+            pool.users -= 1
+            pool.last_used = time.monotonic()
+            self.sweep_pools()
+        return {'status_code': status, 'latency_ms': round((time.perf_counter() - started) * 1000, 1), 'error': ''}
+
+    def sweep_pools(self):
+        """Drop the host pools unused for pool_idle_seconds, so a long run does not keep one per host seen."""
+        now = time.monotonic()
+        if now - self.swept_at < self.pool_idle_seconds:
+            return
+        self.swept_at = now
+        for key, pool in list(self.pools.items()):
+            if not pool.users and now - pool.last_used >= self.pool_idle_seconds:
+                for _, writer in pool.idle:
+                    writer.close()
+                del self.pools[key]
+
+    async def resolve(self, host, port):
+        """The address to connect to for `host`; ProbeError unless every address it resolves to may be probed."""
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as error:
+            raise ProbeError(f'cannot resolve {host}: {error.strerror}') from None
+        addresses = [ipaddress.ip_address(info[4][0].split('%', 1)[0]) for info in infos]
+        for address in addresses:
+            if not is_public(address) and not self.allowed_hosts.allows(host, address):
+                raise ProbeError(f'refused: {host} resolves to non-public address {address}')
+        return str(addresses[0])
+
+    async def request(self, pool, key, target, method):
+        # A kept-alive connection may have been closed by the server meanwhile: try the next one, then a new one
+        while pool.idle:
+            reader, writer = pool.idle.pop()
+            try:
+                return await self.exchange(pool, reader, writer, key, target, method)
+            except (ConnectionError, asyncio.IncompleteReadError, ProbeError):
+                writer.close()
+        scheme, host, port = key
+        # Connect to the checked address: resolving the name again could yield another one
+        address = await self.resolve(host, port)
+        if scheme == 'https':
+            reader, writer = await asyncio.open_connection(address, port, ssl=self.ssl_context, server_hostname=host)
+        else:
+            reader, writer = await asyncio.open_connection(address, port)
+        return await self.exchange(pool, reader, writer, key, target, method)
+
+    async def exchange(self, pool, reader, writer, key, target, method):
+        scheme, host, port = key
+        host_header = host.encode('idna').decode()
+        if port != (443 if scheme == 'https' else 80):
+            host_header = f'{host_header}:{port}'
+        writer.write(
+            f'{method} {target} HTTP/1.1\r\nHost: {host_header}\r\nUser-Agent: {USER_AGENT}\r\n'
+            f'Accept: */*\r\n\r\n'.encode()
+        )
+        try:
+            await writer.drain()
+            status_line = await reader.readline()
+            if not status_line:
+                raise ProbeError('connection closed')
+            version, status = self.parse_status(status_line)
+            headers = await self.read_headers(reader)
+            reusable = (
+                method == 'HEAD' and version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            )
+        except BaseException:
+            writer.close()
+            raise
+        if reusable:
+            pool.idle.append((reader, writer))
+        else:
+            # The body of a GET is never read: the connection cannot serve another request
+            writer.close()
+        return status
+
+    @staticmethod
+    def parse_status(line):
+        try:
+            version, status = line.decode('latin-1').split(None, 2)[:2]
+            return version, int(status)
+        except ValueError:
+            raise ProbeError('not an HTTP answer') from None
+
+    @staticmethod
+    async def read_headers(reader):
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n'):
+                return headers
+            if not line:
+                raise ProbeError('connection closed')
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    async def close(self):
+        for pool in self.pools.values():
+            for _, writer in pool.idle:
+                writer.close()
+            pool.idle.clear()
+
+
+def due_links(alias, batch_size, checked_before=None):
+    """(pk, original_url) of the active links on `alias`, in primary-key batches, read from the primary."""
+    links = Link.objects.using(alias).filter(is_active=True)
+    if checked_before is not None:
+        links = links.filter(Q(health__isnull=True) | Q(health__checked_at__lt=checked_before))
+    last = 0
+    while True:
+        batch = list(links.filter(pk__gt=last).order_by('pk').values_list('pk', 'original_url')[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        last = batch[-1][0]
+
+
+def record(alias, results, now):
+    """Store {pk: probe result} as the links' LinkHealth, skipping links deleted since they were read."""
+    pks = set(Link.objects.using(alias).filter(pk__in=results).values_list('pk', flat=True))
+    using(LinkHealth, alias).bulk_create(
+        [
+            LinkHealth(link_id=pk, status_code=result['status_code'], latency_ms=result['latency_ms'],
+                       error=result['error'], is_healthy=is_healthy(result), checked_at=now)
+            for pk, result in results.items() if pk in pks
+        ],
+        update_conflicts=True, unique_fields=['link'],
+        update_fields=['status_code', 'is_healthy', 'latency_ms', 'error', 'checked_at'],
+    )
+
+
+def check_links(concurrency, per_host, timeout, batch_size=500, max_age=None, limit=None, allowed_hosts=None):
+    """
+    Probe the active links of every shard, skipping those checked less than
+    `max_age` (a timedelta) ago, at most `limit` links. Non-public hosts are
+    refused unless in `allowed_hosts` (default LINK_HEALTH_ALLOWED_HOSTS).
+    Returns {'links', 'healthy', 'broken', 'seconds', 'errors'}; `errors`
+    counts the failed probes by error message.
+    """
+    if allowed_hosts is None:
+        allowed_hosts = settings.LINK_HEALTH_ALLOWED_HOSTS
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name='link-health', daemon=True)
+    thread.start()
+
+    async def create_checker():
+        return HealthChecker(concurrency, per_host, timeout, allowed_hosts)
+
+    checker = asyncio.run_coroutine_threadsafe(create_checker(), loop).result()
+    checked_before = timezone.now() - max_age if max_age is not None else None
+    summary = {'links': 0, 'healthy': 0, 'broken': 0, 'seconds': 0.0, 'errors': defaultdict(int)}
+    started = time.monotonic()
+    try:
+        submitted = 0
+        for alias in get_shards():
+            pending, results = {}, {}
+            for pk, url in due_links(alias, batch_size, checked_before):
+                if limit is not None and submitted >= limit:
+                    break
+                # Keep twice the concurrency queued on the loop: links are streamed, never all loaded
+                if len(pending) >= concurrency * 2:
+                    collect(pending, results, FIRST_COMPLETED, summary)
+                    if len(results) >= batch_size:
+                        record(alias, results, timezone.now())
+                        results = {}
+                pending[asyncio.run_coroutine_threadsafe(checker.probe(url), loop)] = pk
+                submitted += 1
+            collect(pending, results, ALL_COMPLETED, summary)
+            if results:
+                record(alias, results, timezone.now())
+    finally:
+        asyncio.run_coroutine_threadsafe(checker.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    summary['seconds'] = round(time.monotonic() - started, 3)
+    summary['errors'] = dict(summary['errors'])
+    return summary
+
+
+def collect(pending, results, return_when, summary):
+    """Move finished probes from `pending` (future -> pk) into `results` (pk -> result)."""
+    done, _ = wait(pending, return_when=return_when)
+    for future in done:
+        result = future.result()
+        results[pending.pop(future)] = result
+        summary['links'] += 1
+        if is_healthy(result):
+            summary['healthy'] += 1
+        else:
+            summary['broken'] += 1
+            if result['error']:
+                summary['errors'][result['error']] += 1
@@ -0,0 +1,38 @@
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from scheduler.registry import job
+
+
+@job(every=timedelta(minutes=5))
+def sweep_expired_links():
+    # Redirects already refuse due links; the sweep makes is_active (and the webhooks) catch up
+    output = StringIO()
+    call_command('sweep_expired_links', stdout=output)
+    return output.getvalue().strip()
+
+
+@job(every=timedelta(days=1))
+def reconcile_link_counts():
+    # Links deleted from the admin or copied between databases bypass the counters
+    output = StringIO()
+    call_command('reconcile_link_counts', stdout=output)
+    return output.getvalue().strip()
+
+
+@job(every=timedelta(hours=1), timeout=6 * 3600, enabled=lambda: settings.LINK_HEALTH_MAX_AGE_HOURS > 0)
+def check_link_health():
+    # Each hourly run only probes the links whose last result is older than LINK_HEALTH_MAX_AGE_HOURS
+    output = StringIO()
+    call_command('check_link_health', '--max-age', str(settings.LINK_HEALTH_MAX_AGE_HOURS), stdout=output)
+    return output.getvalue().strip()
+
+
+@job(every=timedelta(minutes=settings.USER_METRICS_REFRESH_MINUTES or 15),
+     enabled=lambda: settings.USER_METRICS_REFRESH_MINUTES > 0)
+def refresh_user_link_metrics():
+    # The user list sorts and filters on these columns; clicks are too frequent to roll up per click
+    output = StringIO()
+    call_command('refresh_user_link_metrics', stdout=output)
+    return output.getvalue().strip()
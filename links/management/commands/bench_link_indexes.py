@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import F
+from links.models import Link
+from links.services import LinkService
+from links.sharding import get_shards, using
+from utils.db_router import pin_to_primary, unpin
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure the cost of the links indexes: inserts and click counter updates per second, code lookup latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Links inserted (and rolled back)')
+        parser.add_argument('--lookups', type=int, default=2000, help='get_link_by_code calls on existing codes')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the best one is reported')
+
+    def handle(self, *args, **options):
+        alias = get_shards()[0]
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            indexes = [
+                name for name, info in connection.introspection.get_constraints(cursor, Link._meta.db_table).items()
+                if info['index'] or info['unique']
+            ]
+        self.stdout.write(f'indexes on links ({connection.vendor}): {len(indexes)}')
+        for name in sorted(indexes):
+            self.stdout.write(f'  {name}')
+
+        repeat = range(options['repeat'])
+        inserts = min(self.inserts(alias, options['rows']) for _ in repeat)
+        self.stdout.write(f"inserts: {options['rows'] / inserts:.0f} rows/s")
+        updates, hot = min((self.click_updates(alias, options['rows']) for _ in repeat), key=lambda run: run[0])
+        self.stdout.write(f"click counter updates: {options['rows'] / updates:.0f} rows/s")
+        # Write amplification: an insert adds an entry to every (matching) index, so does a non-HOT update
+        if hot is not None:
+            self.stdout.write(f'HOT click updates: {hot:.0%} (the rest write to every index)')
+
+        codes = list(using(Link, alias).values_list('short_code', flat=True)[:50000])
+        if not codes:
+            self.stdout.write('lookups: no links (generate some with generate_synthetic_data)')
+            return
+        rng = random.Random(options['seed'])
+        sample = rng.choices(codes, k=options['lookups'])
+        timings = min((self.lookups(sample) for _ in repeat), key=statistics.median)
+        self.stdout.write(
+            f'lookups: mean {statistics.fmean(timings):.0f} µs, p50 {timings[len(timings) // 2]:.0f} µs, '
+            f'p99 {timings[int(len(timings) * 0.99)]:.0f} µs'
+        )
+
+    def lookups(self, codes):
+        timings = []
+        # Pinned: no code filter and no cache, every lookup reaches the database
+        token = pin_to_primary()
+        try:
+            for code in codes:
+                started = time.perf_counter()
+                LinkService.get_link_by_code(code)
+                timings.append((time.perf_counter() - started) * 1e6)
+        finally:
+            unpin(token)
+        return sorted(timings)
+
+    def inserts(self, alias, rows):
+        # One INSERT per row, like create_link, inside a transaction that is rolled back
+        links = [
+            Link(short_code=f'b{number:08d}', original_url=f'https://example.com/bench/{number}',
+                 custom_alias=f'bench-{number}' if number % 10 == 0 else None)
+            for number in range(rows)
+        ]
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(using=alias):
+                for link in links:
+                    link.save(using=alias)
+                elapsed = time.perf_counter() - started
+                raise Rollback
+        except Rollback:
+            pass
+        return elapsed
+
+    def click_updates(self, alias, rows):
+        """(seconds, share of HOT updates on PostgreSQL or None) for `rows` counter updates, rolled back."""
+        pks = list(using(Link, alias).values_list('pk', flat=True)[:rows])
+        if not pks:
+            return float('inf'), None
+        hot = None
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(using=alias):
+                for index in range(rows):
+                    using(Link, alias).filter(pk=pks[index % len(pks)]).update(click_count=F('click_count') + 1)
+                elapsed = time.perf_counter() - started
+                if connections[alias].vendor == 'postgresql':
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute('SELECT n_tup_upd, n_tup_hot_upd FROM pg_stat_xact_user_tables '
+                                       'WHERE relid = %s::regclass', [Link._meta.db_table])
+                        updated, hot_updated = cursor.fetchone()
+                    hot = hot_updated / updated if updated else None
+                raise Rollback
+        except Rollback:
+            pass
+        return elapsed, hot
@@ -0,0 +1,31 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from links.health import check_links
+
+
+class Command(BaseCommand):
+    help = 'Probe the destinations of the active links concurrently and record their status in LinkHealth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.LINK_HEALTH_CONCURRENCY,
+                            help='Probes in flight at once')
+        parser.add_argument('--per-host', type=int, default=settings.LINK_HEALTH_PER_HOST,
+                            help='Probes in flight (and kept-alive connections) per host')
+        parser.add_argument('--timeout', type=float, default=settings.LINK_HEALTH_TIMEOUT_SECONDS,
+                            help='Seconds before a probe gives up')
+        parser.add_argument('--batch-size', type=int, default=500, help='Links read and results written at a time')
+        parser.add_argument('--max-age', type=float, help='Skip links checked less than this many hours ago')
+        parser.add_argument('--limit', type=int, help='Most links to probe')
+
+    def handle(self, *args, **options):
+        max_age = timedelta(hours=options['max_age']) if options['max_age'] is not None else None
+        summary = check_links(options['concurrency'], options['per_host'], options['timeout'],
+                              batch_size=options['batch_size'], max_age=max_age, limit=options['limit'])
+        for error, count in sorted(summary['errors'].items(), key=lambda item: -item[1])[:10]:
+            self.stdout.write(f'  {count} x {error}')
+        seconds = summary['seconds']
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {summary['links']} link(s): {summary['healthy']} healthy, {summary['broken']} broken "
+            f"in {seconds:.2f}s; {summary['links'] / seconds if seconds else 0:.1f} links/s"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from links.code_filter import code_filter
+
+
+class Command(BaseCommand):
+    help = 'Build the short code filter the way a worker does and report its size and false-positive rate'
+
+    def handle(self, *args, **options):
+        elapsed = code_filter.build()
+        stats = code_filter.stats()
+        self.stdout.write(f'Built in {elapsed:.2f}s')
+        for key in ['codes', 'capacity', 'bits', 'hashes', 'memory_bytes', 'target_false_positive_rate',
+                    'estimated_false_positive_rate']:
+            self.stdout.write(f'{key}: {stats[key]}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from links import resolver_cache
+
+
+class Command(BaseCommand):
+    help = 'Load the most clicked links into the link cache (useful after a deploy with a shared cache)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--links', type=int, help='Most links to load (default: LINK_CACHE_PREWARM_LINKS)')
+        parser.add_argument('--max-seconds', type=float, help='Time budget (default: LINK_CACHE_PREWARM_SECONDS)')
+        parser.add_argument('--max-bytes', type=int, help='Memory budget (default: LINK_CACHE_PREWARM_MAX_BYTES)')
+
+    def handle(self, *args, **options):
+        result = resolver_cache.prewarm(options['links'], options['max_seconds'], options['max_bytes'])
+        stopped = f" (stopped by the {result['stopped']} budget)" if result['stopped'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {result['links']} link(s), {result['bytes']} bytes in {result['seconds']:.2f}s{stopped}"
+        ))
@@ -0,0 +1,53 @@
+from collections import Counter
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from analytics.models import ClickStats
+from links.models import Link, LinkHealth
+from links.sharding import copy_rows, get_shards, is_sharded, shard_for_link
+
+
+class Command(BaseCommand):
+    help = 'Move links and their clicks to the shard their code hashes to (run after changing LINK_SHARDS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Links scanned per query')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many links would move')
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            self.stdout.write('Sharding is not enabled (LINK_SHARDS has a single database), nothing to do.')
+            return
+
+        moves = Counter()
+        for source in get_shards():
+            last_pk = 0
+            while True:
+                batch = list(
+                    Link.objects.using(source).filter(pk__gt=last_pk).order_by('pk')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+
+                for link in batch:
+                    target = shard_for_link(link)
+                    if target == source:
+                        continue
+                    moves[(source, target)] += 1
+                    if not options['dry_run']:
+                        self.move_link(link, source, target)
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        for (source, target), count in sorted(moves.items()):
+            self.stdout.write(f'{verb} {count} link(s) from {source} to {target}')
+        self.stdout.write(self.style.SUCCESS(f'{verb} {sum(moves.values())} link(s) in total'))
+
+    def move_link(self, link, source, target):
+        # Copy first, then delete: a crash in between leaves a copy that the next run skips
+        with transaction.atomic(using=target):
+            if not Link.objects.using(target).filter(pk=link.pk).exists():
+                copy_rows([link], target)
+                copy_rows(list(ClickStats.objects.using(source).filter(link_id=link.pk)), target)
+                copy_rows(list(LinkHealth.objects.using(source).filter(link_id=link.pk)), target)
+        with transaction.atomic(using=source):
+            Link.objects.using(source).filter(pk=link.pk).delete()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from links.services import LinkQuotaService
+
+
+class Command(BaseCommand):
+    help = 'Recount the links of every user and repair the link_count counters that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users recounted per query on each shard')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many counters are wrong')
+
+    def handle(self, *args, **options):
+        summary = LinkQuotaService.reconcile(options['batch_size'], options['dry_run'])
+        verb = 'would fix' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {summary['users']} user(s), {verb} {summary['fixed']} link count(s)"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from links.services import UserLinkMetricsService
+
+
+class Command(BaseCommand):
+    help = 'Roll the active link count, clicks and last click of every user up from the links'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users rolled up per query on each shard')
+
+    def handle(self, *args, **options):
+        summary = UserLinkMetricsService.refresh(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {summary['users']} user(s), {summary['updated']} changed"
+        ))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+from links.models import Link
+from links.services import LinkService
+from links.sharding import get_shards
+
+
+class Command(BaseCommand):
+    help = 'Deactivate links that are past expires_at or have used up max_clicks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Links deactivated per UPDATE')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many links would be deactivated')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        total = 0
+        for alias in get_shards():
+            # Read from the primary: a lagging replica would keep returning swept rows
+            links = Link.objects.using(alias)
+            # Both filters match a partial index that only covers active links with an expiry / limit
+            for due in (
+                links.filter(is_active=True, expires_at__isnull=False, expires_at__lte=now),
+                links.filter(is_active=True, max_clicks__isnull=False, click_count__gte=F('max_clicks')),
+            ):
+                total += self.sweep(links, due, options['batch_size'], options['dry_run'])
+
+        verb = 'Would deactivate' if options['dry_run'] else 'Deactivated'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {total} link(s)'))
+
+    def sweep(self, links, due, batch_size, dry_run):
+        if dry_run:
+            return due.count()
+        swept = 0
+        while True:
+            # Small batches keep each UPDATE's row locks short
+            pks = list(due.order_by().values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return swept
+            # Deactivating through LinkService emits a link.updated webhook event per link
+            swept += LinkService.set_links_active(links.db, pks, False)
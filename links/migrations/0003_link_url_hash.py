@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_url_hash(apps, schema_editor):
+    from links.models import hash_url
+
+    Link = apps.get_model('links', 'Link')
+    links = Link.objects.using(schema_editor.connection.alias)
+    batch = []
+    for link in links.only('id', 'original_url').iterator(chunk_size=2000):
+        link.url_hash = hash_url(link.original_url)
+        batch.append(link)
+        if len(batch) >= 2000:
+            links.bulk_update(batch, ['url_hash'])
+            batch = []
+    if batch:
+        links.bulk_update(batch, ['url_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0002_link_user_without_db_constraint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='url_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_url_hash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['url_hash', 'user'], name='links_url_has_262f36_idx'),
+        ),
+    ]
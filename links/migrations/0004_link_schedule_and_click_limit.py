@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_click_count(apps, schema_editor):
+    Link = apps.get_model('links', 'Link')
+    ClickStats = apps.get_model('analytics', 'ClickStats')
+    alias = schema_editor.connection.alias
+    clicks = (
+        ClickStats.objects.using(alias).filter(link=models.OuterRef('pk'))
+        .order_by().values('link').annotate(count=models.Count('id')).values('count')
+    )
+    Link.objects.using(alias).filter(models.Exists(clicks)).update(
+        click_count=models.Subquery(clicks, output_field=models.PositiveIntegerField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0003_link_url_hash'),
+        ('analytics', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='active_from',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='click_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_click_count, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='link',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='max_clicks',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False), ('is_active', True)), fields=['expires_at'], name='links_active_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(condition=models.Q(('is_active', True), ('max_clicks__isnull', False)), fields=['max_clicks'], name='links_active_click_limit_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class AddUniqueConstraintConcurrently(migrations.AddConstraint):
+    """
+    AddConstraint that builds the unique index with CREATE UNIQUE INDEX
+    CONCURRENTLY on PostgreSQL, so inserts and click updates on links go on
+    while it is built (a plain AddConstraint blocks writes for the whole build).
+    A constraint without a condition is then attached to the index, which only
+    takes a brief lock. Elsewhere it is a plain AddConstraint.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        constraint, quote = self.constraint, schema_editor.quote_name
+        table, name = quote(model._meta.db_table), quote(constraint.name)
+        columns = ', '.join(quote(model._meta.get_field(field).column) for field in constraint.fields)
+        condition = f' WHERE {constraint._get_condition_sql(model, schema_editor)}' if constraint.condition else ''
+        schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns}){condition}')
+        if not constraint.condition:
+            schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('links', '0004_link_schedule_and_click_limit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # The new unique indexes exist before the old ones go: no moment without a uniqueness check
+    operations = [
+        AddUniqueConstraintConcurrently(
+            model_name='link',
+            constraint=models.UniqueConstraint(fields=('short_code',), name='links_short_code_uniq'),
+        ),
+        AddUniqueConstraintConcurrently(
+            model_name='link',
+            constraint=models.UniqueConstraint(condition=models.Q(('custom_alias__isnull', False)), fields=('custom_alias',), name='links_custom_alias_uniq'),
+        ),
+        migrations.AlterField(
+            model_name='link',
+            name='custom_alias',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='link',
+            name='short_code',
+            field=models.CharField(max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='link',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='links', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RemoveIndex(
+            model_name='link',
+            name='links_short_c_95d67d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='link',
+            name='links_custom__1666b1_idx',
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0005_redirect_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkHealth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('is_healthy', models.BooleanField()),
+                ('latency_ms', models.FloatField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('checked_at', models.DateTimeField()),
+                ('link', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='health', to='links.link')),
+            ],
+            options={
+                'verbose_name_plural': 'Link health',
+                'db_table': 'link_health',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0006_link_health'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='last_clicked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,26 +1,102 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """
+    Canonical form used for deduplication: scheme and host lowercased, default
+    port and empty path dropped. Path, query and fragment are kept verbatim.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    netloc = f'[{host}]' if ':' in host else host
+    userinfo, _, _ = parts.netloc.rpartition('@')
+    if userinfo:
+        netloc = f'{userinfo}@{netloc}'
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f'{netloc}:{port}'
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, parts.fragment))
+
+
+def hash_url(url):
+    return hashlib.sha256(normalize_url(url).encode()).hexdigest()
+
+
+# Columns LinkService.get_link_by_code loads for a redirect: everything get_unavailable_reason()
+# and track_click read, click_count included, so a redirect never loads a deferred field.
+REDIRECT_FIELDS = (
+    'id', 'short_code', 'custom_alias', 'original_url', 'user', 'is_active', 'active_from', 'expires_at', 'max_clicks',
+    'click_count',
+)
 
 
 # Create your models here.
 class Link(models.Model):
-    short_code = models.CharField(max_length=10, unique=True, db_index=True)
-    custom_alias = models.CharField(max_length=50, unique=True, null=True, blank=True, db_index=True)
+    # Unique through Meta.constraints: one index per code column (a unique field also gets a
+    # varchar_pattern_ops index on PostgreSQL, and db_index/Meta.indexes would add more)
+    short_code = models.CharField(max_length=10)
+    custom_alias = models.CharField(max_length=50, null=True, blank=True)
     original_url = models.URLField(max_length=2048)
+    # sha256 of normalize_url(original_url), kept in sync by save()
+    url_hash = models.CharField(max_length=64, editable=False)
+    # No database constraint: links may live on a shard without the users table
+    # No index of its own: the (user, -created_at) index serves lookups by user
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
-                             related_name='links')
+                             related_name='links', db_constraint=False, db_index=False)
     note = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    # Availability window and click limit, checked on redirect against the loaded row
+    active_from = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    max_clicks = models.PositiveIntegerField(null=True, blank=True)
+    # Denormalized number of clicks, incremented by AnalyticsService.track_click
+    click_count = models.PositiveIntegerField(default=0, editable=False)
+    # Time of the latest counted click, written by the same update as click_count (not indexed, see above)
+    last_clicked_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.short_code} -> {self.original_url}"
 
+    def save(self, *args, **kwargs):
+        self.url_hash = hash_url(self.original_url)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            # The click columns only change through F() updates; never write back a stale copy
+            update_fields = [field.name for field in self._meta.concrete_fields
+                             if not field.primary_key and field.name not in ('click_count', 'last_clicked_at')]
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'url_hash'} if 'original_url' in update_fields else update_fields
+        super().save(*args, **kwargs)
+
     @property
     def short_url(self):
         return self.custom_alias if self.custom_alias else self.short_code
 
+    def get_unavailable_reason(self, now=None):
+        """Why the link must not redirect right now, or None when it may."""
+        now = now or timezone.now()
+        if not self.is_active:
+            return 'Link is inactive'
+        if self.active_from and now < self.active_from:
+            return 'Link is not active yet'
+        if self.expires_at and now >= self.expires_at:
+            return 'Link has expired'
+        if self.max_clicks is not None and self.click_count >= self.max_clicks:
+            return 'Link has reached its click limit'
+        return None
+
     @property
     def total_clicks(self):
         return self.clicks.count()
@@ -28,9 +104,44 @@ class Link(models.Model):
     class Meta:
         db_table = 'links'
         ordering = ['-created_at']
+        # No covering (INCLUDE) columns. On PostgreSQL every click would clear the visibility-map bit of its
+        # link's page, so hot links would visit the heap anyway, and a copied original_url could exceed the
+        # btree tuple limit (reasoning only: bench_link_indexes has just been run on SQLite)
+        constraints = [
+            models.UniqueConstraint(fields=['short_code'], name='links_short_code_uniq'),
+            # Most links have no alias: only the aliased ones are indexed
+            models.UniqueConstraint(fields=['custom_alias'], name='links_custom_alias_uniq',
+                                    condition=models.Q(custom_alias__isnull=False)),
+        ]
         indexes = [
-            models.Index(fields=['short_code']),
-            models.Index(fields=['custom_alias']),
             models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['url_hash', 'user']),
+            # Only the links sweep_expired_links still has to look at
+            models.Index(fields=['expires_at'], name='links_active_expiry_idx',
+                         condition=models.Q(is_active=True, expires_at__isnull=False)),
+            models.Index(fields=['max_clicks'], name='links_active_click_limit_idx',
+                         condition=models.Q(is_active=True, max_clicks__isnull=False)),
         ]
 
+
+
+class LinkHealth(models.Model):
+    """
+    Result of the last probe of a link's destination (check_link_health).
+    Lives on the link's shard so LinkFilter can join it.
+    """
+    link = models.OneToOneField(Link, on_delete=models.CASCADE, related_name='health')
+    # HTTP status of the answer; None when there was none (timeout, refused, DNS, TLS)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    # An answer below 400; redirects are not followed
+    is_healthy = models.BooleanField()
+    latency_ms = models.FloatField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    checked_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.link_id}: {self.status_code or self.error}"
+
+    class Meta:
+        db_table = 'link_health'
+        verbose_name_plural = 'Link health'
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from analytics.models import ClickStats
+from utils.projection import SKIP, Projection
+from .serializers import LinkSerializer
+from .sharding import shard_querysets
+
+
+class LinkProjection(Projection):
+    serializer_class = LinkSerializer
+    # user_username is read separately: users are not stored on the link shards
+    computed = {
+        'short_url': ('short_code', 'custom_alias'),
+        'user_username': ('user',),
+        'total_clicks': ('id',),
+        'click_timestamps': ('id',),
+    }
+
+    def compute(self, rows):
+        # Two queries per shard for the whole page instead of two per link, and only for the requested fields
+        fields = self.fields
+        ids = [row['id'] for row in rows] if 'total_clicks' in fields or 'click_timestamps' in fields else []
+        counts, timestamps = {}, {pk: [] for pk in ids}
+        if ids:
+            for clicks in shard_querysets(ClickStats.objects.filter(link_id__in=ids)):
+                if 'total_clicks' in fields:
+                    counts.update(
+                        clicks.order_by().values('link_id').annotate(total=Count('id'))
+                        .values_list('link_id', 'total')
+                    )
+                if 'click_timestamps' in fields:
+                    # Same as LinkSerializer.get_click_timestamps: the 10 latest clicks, newest first
+                    recent = clicks.annotate(
+                        rank=Window(RowNumber(), partition_by=F('link_id'), order_by=F('clicked_at').desc())
+                    ).filter(rank__lte=10).order_by('link_id', '-clicked_at').values_list('link_id', 'clicked_at')
+                    for link_id, clicked_at in recent:
+                        timestamps[link_id].append(clicked_at)
+        usernames = {}
+        if 'user_username' in fields:
+            user_ids = {row['user'] for row in rows if row['user'] is not None}
+            if user_ids:
+                usernames = dict(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', 'username'))
+        computed = {
+            'short_url': lambda row: row['custom_alias'] or row['short_code'],
+            # Left out for guest links, like LinkSerializer does
+            'user_username': lambda row: usernames[row['user']] if row['user'] is not None else SKIP,
+            'total_clicks': lambda row: counts.get(row['id'], 0),
+            'click_timestamps': lambda row: timestamps[row['id']],
+        }
+        return {name: [computed[name](row) for row in rows] for name in fields if name in computed}
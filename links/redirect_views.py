@@ -0,0 +1,35 @@
+# Kept apart from views.py so redirect-only nodes (config.settings_redirect)
+# import nothing but what resolution and click tracking need.
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from .services import LinkService
+from analytics.services import AnalyticsService, ClickLimitReached
+from utils.schema import LazySchemas
+
+schemas = LazySchemas('links.schemas')
+
+
+# Redirect / get original URL for short code
+class RedirectLinkView(APIView):
+    permission_classes = [AllowAny]
+
+    @schemas.redirect_schema
+    def get(self, request, code):
+        link = LinkService.get_link_by_code(code)
+
+        if not link:
+            return Response({'error': 'Link not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Expiry, activation window and click limit are read from the row just loaded
+        reason = link.get_unavailable_reason()
+        if reason:
+            return Response({'error': reason}, status=status.HTTP_410_GONE)
+
+        try:
+            AnalyticsService.track_click(link=link)
+        except ClickLimitReached:
+            # Other clicks took the last ones since the link was loaded
+            return Response({'error': 'Link has reached its click limit'}, status=status.HTTP_410_GONE)
+        return Response({'short_code': link.short_url, 'original_url': link.original_url, 'is_active': link.is_active})
@@ -0,0 +1,107 @@
+"""
+Cache of resolved links for LinkService.get_link_by_code (the 'links' cache).
+
+Off unless LINK_CACHE_SECONDS is set. Entries are keyed by short code and by
+custom alias and expire after LINK_CACHE_SECONDS. LinkService drops them when a
+link is updated or deleted; with the default per-process cache that only
+reaches the worker making the change, so other workers may serve a changed
+link for up to LINK_CACHE_SECONDS. Point CACHES['links'] at a shared backend
+(Redis, Memcached) before turning it on. Links with a click limit are never
+cached: their counter must be current.
+
+prewarm() loads the most clicked links of the last LINK_CACHE_PREWARM_HOURS
+before a worker serves traffic (gunicorn.conf.py), within a time and a memory
+budget.
+"""
+import heapq
+import pickle
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+from django.utils import timezone
+from .models import REDIRECT_FIELDS, Link
+from .sharding import get_shards
+
+
+def get_cache():
+    return caches['links']
+
+
+def cache_key(code):
+    return f'link:{code}'
+
+
+def enabled():
+    return settings.LINK_CACHE_SECONDS > 0
+
+
+def is_cacheable(link):
+    return link.max_clicks is None
+
+
+def get(code):
+    return get_cache().get(cache_key(code)) if enabled() else None
+
+
+def store(link):
+    if enabled() and is_cacheable(link):
+        get_cache().set_many({cache_key(code): link for code in filter(None, [link.short_code, link.custom_alias])},
+                             timeout=settings.LINK_CACHE_SECONDS)
+
+
+def invalidate(links):
+    get_cache().delete_many([cache_key(code) for link in links for code in (link.short_code, link.custom_alias) if code])
+
+
+def top_link_ids(limit, since):
+    """Ids of the `limit` links with the most clicks since `since`, across shards."""
+    from analytics.models import ClickStats
+
+    counts = []
+    for alias in get_shards():
+        counts.extend(
+            ClickStats.objects.using(alias).filter(clicked_at__gte=since).order_by()
+            .values('link_id').annotate(clicks=Count('id')).order_by('-clicks')
+            .values_list('link_id', 'clicks')[:limit]
+        )
+    return [link_id for link_id, _ in heapq.nlargest(limit, counts, key=lambda row: row[1])]
+
+
+def prewarm(limit=None, max_seconds=None, max_bytes=None):
+    """
+    Cache the hottest links, most clicked first, until `limit` links are
+    loaded, `max_seconds` have passed or the pickled entries reach `max_bytes`.
+    Returns {'links', 'bytes', 'seconds', 'stopped'}; `stopped` names the budget that ran out.
+    """
+    limit = settings.LINK_CACHE_PREWARM_LINKS if limit is None else limit
+    max_seconds = settings.LINK_CACHE_PREWARM_SECONDS if max_seconds is None else max_seconds
+    max_bytes = settings.LINK_CACHE_PREWARM_MAX_BYTES if max_bytes is None else max_bytes
+    started = time.monotonic()
+    result = {'links': 0, 'bytes': 0, 'seconds': 0.0, 'stopped': None}
+    if limit <= 0 or not enabled():
+        return result
+
+    ids = top_link_ids(limit, timezone.now() - timedelta(hours=settings.LINK_CACHE_PREWARM_HOURS))
+    rank = {pk: index for index, pk in enumerate(ids)}
+    links = [
+        link
+        for alias in get_shards()
+        # The columns get_link_by_code loads, so prewarmed entries are the same size as resolved ones
+        for link in Link.objects.using(alias).only(*REDIRECT_FIELDS).filter(pk__in=ids, max_clicks__isnull=True)
+    ]
+    for link in sorted(links, key=lambda link: rank[link.pk]):
+        if time.monotonic() - started >= max_seconds:
+            result['stopped'] = 'time'
+            break
+        # Aliased links are stored under both codes
+        size = len(pickle.dumps(link)) * (2 if link.custom_alias else 1)
+        if result['bytes'] + size > max_bytes:
+            result['stopped'] = 'memory'
+            break
+        store(link)
+        result['links'] += 1
+        result['bytes'] += size
+    result['seconds'] = round(time.monotonic() - started, 3)
+    return result
@@ -1,14 +1,26 @@
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
-from .serializers import LinkSerializer, LinkCreateSerializer, LinkUpdateSerializer
+from analytics.serializers import LinkStatsQuerySerializer
+from .serializers import (
+    LinkSerializer, LinkCreateSerializer, LinkUpdateSerializer, LinkBulkSerializer, LinkBatchStatsSerializer
+)
+
+# ?fields= / ?omit= on the link read endpoints
+FIELDSET_PARAMETERS = [
+    OpenApiParameter('fields', OpenApiTypes.STR, OpenApiParameter.QUERY,
+                     description='Comma-separated fields to return (default: all)'),
+    OpenApiParameter('omit', OpenApiTypes.STR, OpenApiParameter.QUERY,
+                     description='Comma-separated fields to leave out'),
+]
 
 # Create link
 link_create_schema = extend_schema(
     tags=['Links'],
     summary='Create a short link',
-    description='Create a new shortened link. Guests can create links with random or custom aliases. Users can also add notes.',
+    description='Create a new shortened link. Guests can create links with random or custom aliases. Users can also add notes. With reuse_existing (or the user\'s reuse_existing_links setting) an authenticated user\'s existing link to the same URL is returned instead, unless a note, alias, window or click limit is given.',
     request=LinkCreateSerializer,
     responses={
+        200: OpenApiResponse(response=LinkSerializer, description='Existing link to the same URL reused'),
         201: OpenApiResponse(
             response=LinkSerializer,
             description='Link created successfully',
@@ -31,12 +43,13 @@ link_create_schema = extend_schema(
                 )
             ]
         ),
-        403: OpenApiResponse(description='Permission denied')
+        403: OpenApiResponse(description='Permission denied, or the owner has reached their link quota')
     },
     examples=[
         OpenApiExample('Random Short Code', value={'original_url': 'https://example.com'}, request_only=True),
         OpenApiExample('Custom Alias', value={'original_url': 'https://example.com', 'custom_alias': 'my-link'}, request_only=True),
-        OpenApiExample('With Note (User only)', value={'original_url': 'https://example.com', 'note': 'My important link'}, request_only=True)
+        OpenApiExample('With Note (User only)', value={'original_url': 'https://example.com', 'note': 'My important link'}, request_only=True),
+        OpenApiExample('Reuse Existing Link', value={'original_url': 'https://example.com', 'reuse_existing': True}, request_only=True)
     ]
 )
 
@@ -45,6 +58,7 @@ link_list_schema = extend_schema(
     tags=['Links'],
     summary='List links',
     description='List all links. Users see their own links, Admins see all links.',
+    parameters=FIELDSET_PARAMETERS,
     responses={
         200: OpenApiResponse(
             response=LinkSerializer(many=True),
@@ -54,13 +68,64 @@ link_list_schema = extend_schema(
     }
 )
 
+# Reverse lookup by destination URL
+link_lookup_schema = extend_schema(
+    tags=['Links'],
+    summary='Find links to a URL',
+    description='List the short links pointing to a destination URL (compared after normalization). '
+                'Users see their own links, Admins see all links.',
+    parameters=[
+        OpenApiParameter('url', OpenApiTypes.URI, OpenApiParameter.QUERY, required=True, description='Destination URL'),
+        *FIELDSET_PARAMETERS
+    ],
+    responses={
+        200: OpenApiResponse(response=LinkSerializer(many=True), description='Links pointing to the URL'),
+        400: OpenApiResponse(description='Missing url parameter'),
+        401: OpenApiResponse(description='Authentication required')
+    }
+)
+
+# Bulk operations
+link_bulk_schema = extend_schema(
+    tags=['Links'],
+    summary='Bulk link operations',
+    description='Activate, deactivate, delete or reassign every link selected by an id list, LinkFilter '
+                'parameters (unknown or empty ones are rejected) or "all": true, in chunked UPDATE/DELETE '
+                'statements. Admin permission required. '
+                'Send Accept: application/x-ndjson to receive one progress line per chunk.',
+    request=LinkBulkSerializer,
+    responses={
+        200: OpenApiResponse(
+            description='Affected counts',
+            examples=[
+                OpenApiExample(
+                    'Deactivate Result',
+                    value={'action': 'deactivate', 'dry_run': False, 'matched': 1200, 'processed': 1200,
+                           'affected': 1150, 'done': True}
+                )
+            ]
+        ),
+        400: OpenApiResponse(description='Invalid action, selection or filter'),
+        403: OpenApiResponse(description='Permission denied')
+    },
+    examples=[
+        OpenApiExample('Deactivate By Ids', value={'action': 'deactivate', 'ids': [1, 2, 3]}, request_only=True),
+        OpenApiExample('Delete By Filter (Dry Run)',
+                       value={'action': 'delete', 'filter': {'created_before': '2024-01-01T00:00:00Z'}, 'dry_run': True},
+                       request_only=True),
+        OpenApiExample('Reassign', value={'action': 'reassign', 'ids': [1, 2], 'user_id': 5}, request_only=True)
+    ]
+)
+
 # Link details
 link_detail_schema = extend_schema(
     tags=['Links'],
     summary='Get link details',
     description='Retrieve detailed information about a specific link. Must be owner or admin.',
+    parameters=FIELDSET_PARAMETERS,
     responses={
         200: OpenApiResponse(response=LinkSerializer, description='Link details'),
+        400: OpenApiResponse(description='Unknown field in fields or omit'),
         403: OpenApiResponse(description='Permission denied'),
         404: OpenApiResponse(description='Link not found')
     }
@@ -100,7 +165,10 @@ link_delete_schema = extend_schema(
 link_stats_schema = extend_schema(
     tags=['Links'],
     summary='Get link statistics',
-    description='Retrieve click statistics for a specific link. Must be owner or admin.',
+    description='Retrieve click statistics for a specific link. Must be owner or admin. '
+                '`series` holds gap-filled click counts for [start, end) per hour, day, week or month, '
+                'with buckets aligned to the requested timezone.',
+    parameters=[LinkStatsQuerySerializer],
     responses={
         200: OpenApiResponse(
             description='Link statistics',
@@ -112,16 +180,69 @@ link_stats_schema = extend_schema(
                         'daily_clicks': [
                             {'date': '2024-01-01', 'clicks': 10},
                             {'date': '2024-01-02', 'clicks': 15}
+                        ],
+                        'range': {
+                            'start': '2024-01-01T00:00:00+01:00',
+                            'end': '2024-01-03T00:00:00+01:00',
+                            'granularity': 'day',
+                            'tz': 'Europe/Berlin'
+                        },
+                        'series': [
+                            {'start': '2024-01-01T00:00:00+01:00', 'clicks': 10},
+                            {'start': '2024-01-02T00:00:00+01:00', 'clicks': 0}
                         ]
                     }
                 )
             ]
         ),
+        400: OpenApiResponse(description='Invalid range, granularity or timezone, or too many buckets'),
         403: OpenApiResponse(description='Permission denied'),
         404: OpenApiResponse(description='Link not found')
     }
 )
 
+# Batch statistics
+link_batch_stats_schema = extend_schema(
+    tags=['Links'],
+    summary='Get statistics for many links',
+    description='Totals and click series for up to STATS_BATCH_MAX_LINKS links, selected by id list or LinkFilter '
+                'parameters, in one request. Users only get their own links; other ids are listed as missing. '
+                'Series share the `buckets` list and accept the same query parameters as link statistics.',
+    request=LinkBatchStatsSerializer,
+    parameters=[LinkStatsQuerySerializer],
+    responses={
+        200: OpenApiResponse(
+            description='Statistics keyed by link id',
+            examples=[
+                OpenApiExample(
+                    'Batch Statistics Response',
+                    value={
+                        'range': {
+                            'start': '2024-01-01T00:00:00+00:00',
+                            'end': '2024-01-03T00:00:00+00:00',
+                            'granularity': 'day',
+                            'tz': 'UTC'
+                        },
+                        'buckets': ['2024-01-01T00:00:00+00:00', '2024-01-02T00:00:00+00:00'],
+                        'links': {
+                            '1': {'short_code': 'abc123', 'total_clicks': 40, 'series': [3, 0]},
+                            '2': {'short_code': 'def456', 'total_clicks': 7, 'series': [0, 1]}
+                        },
+                        'missing': [3],
+                        'truncated': False
+                    }
+                )
+            ]
+        ),
+        400: OpenApiResponse(description='Invalid selection, range or filter'),
+        401: OpenApiResponse(description='Authentication required')
+    },
+    examples=[
+        OpenApiExample('By Ids', value={'ids': [1, 2, 3]}, request_only=True),
+        OpenApiExample('By Filter', value={'filter': {'is_active': True}}, request_only=True)
+    ]
+)
+
 # Toggle active status
 link_toggle_active_schema = extend_schema(
     tags=['Links'],
@@ -156,7 +277,8 @@ user_links_schema = extend_schema(
     parameters=[
         OpenApiParameter('user_id', OpenApiTypes.INT, OpenApiParameter.PATH, description='User ID'),
         OpenApiParameter('page', OpenApiTypes.INT, OpenApiParameter.QUERY, description='Page number for pagination'),
-        OpenApiParameter('page_size', OpenApiTypes.INT, OpenApiParameter.QUERY, description='Number of items per page')
+        OpenApiParameter('page_size', OpenApiTypes.INT, OpenApiParameter.QUERY, description='Number of items per page'),
+        *FIELDSET_PARAMETERS
     ],
     responses={
         200: OpenApiResponse(response=LinkSerializer(many=True), description='List of user links'),
@@ -185,6 +307,6 @@ redirect_schema = extend_schema(
             examples=[OpenApiExample('Success', value={'short_code': 'abc123', 'original_url': 'https://example.com', 'is_active': True})]
         ),
         404: OpenApiResponse(description='Link not found'),
-        410: OpenApiResponse(description='Link is inactive')
+        410: OpenApiResponse(description='Link is inactive, expired, not active yet or out of clicks')
     }
 )
@@ -1,5 +1,20 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from .filters import LinkFilter
 from .models import Link
+from .services import LinkService
+
+SCHEDULE_FIELDS = ['active_from', 'expires_at', 'max_clicks']
+
+
+def validate_schedule(attrs):
+    active_from, expires_at = attrs.get('active_from'), attrs.get('expires_at')
+    if active_from and expires_at and expires_at <= active_from:
+        raise serializers.ValidationError({'expires_at': 'Must be later than active_from'})
+    if attrs.get('max_clicks') == 0:
+        raise serializers.ValidationError({'max_clicks': 'Must be at least 1'})
+    return attrs
 
 # Serializer for viewing Link details
 class LinkSerializer(serializers.ModelSerializer):
@@ -12,11 +27,18 @@ class LinkSerializer(serializers.ModelSerializer):
         model = Link
         fields = [
             'id', 'short_code', 'custom_alias', 'short_url', 'original_url',
-            'user', 'user_username', 'note', 'is_active', 'total_clicks',
-            'click_timestamps', 'created_at', 'updated_at'
+            'user', 'user_username', 'note', 'is_active', 'active_from', 'expires_at', 'max_clicks',
+            'total_clicks', 'click_timestamps', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'short_code', 'user', 'created_at', 'updated_at', 'short_url', 'total_clicks', 'click_timestamps']
 
+    def __init__(self, *args, fields=None, **kwargs):
+        # `fields` keeps only those fields (?fields= / ?omit=), so the others are never computed
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def get_click_timestamps(self, obj):
         return [click.clicked_at for click in obj.clicks.order_by('-clicked_at')[:10]]
 
@@ -26,10 +48,16 @@ class LinkCreateSerializer(serializers.ModelSerializer):
     short_url = serializers.CharField(read_only=True)
     total_clicks = serializers.IntegerField(read_only=True)
     click_timestamps = serializers.SerializerMethodField()
+    # Unset (None) falls back to the user's reuse_existing_links setting
+    reuse_existing = serializers.BooleanField(write_only=True, required=False, allow_null=True)
 
     class Meta:
         model = Link
-        fields = ['original_url', 'custom_alias', 'note', 'short_url', 'total_clicks', 'click_timestamps']
+        fields = ['original_url', 'custom_alias', 'note', 'reuse_existing', *SCHEDULE_FIELDS,
+                  'short_url', 'total_clicks', 'click_timestamps']
+
+    def validate(self, attrs):
+        return validate_schedule(attrs)
 
     def validate_original_url(self, value):
         if not value.startswith(('http://', 'https://')):
@@ -37,7 +65,7 @@ class LinkCreateSerializer(serializers.ModelSerializer):
         return value
 
     def validate_custom_alias(self, value):
-        if value and Link.objects.filter(custom_alias=value).exists():
+        if value and LinkService.is_alias_taken(value):
             raise serializers.ValidationError("This custom alias is already taken")
         return value
 
@@ -60,7 +88,10 @@ class LinkUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Link
-        fields = ['original_url', 'note', 'is_active', 'short_url', 'total_clicks', 'click_timestamps']
+        fields = ['original_url', 'note', 'is_active', *SCHEDULE_FIELDS, 'short_url', 'total_clicks', 'click_timestamps']
+
+    def validate(self, attrs):
+        return validate_schedule(attrs)
 
     def get_click_timestamps(self, obj):
         return [click.clicked_at for click in obj.clicks.order_by('-clicked_at')[:10]]
@@ -70,3 +101,56 @@ class LinkUpdateSerializer(serializers.ModelSerializer):
         instance.short_url = instance.short_url
         instance.total_clicks = instance.total_clicks
         return instance
+
+
+# Serializer for admin bulk operations on links
+class LinkBulkSerializer(serializers.Serializer):
+    ACTIONS = ['activate', 'deactivate', 'delete', 'reassign']
+
+    action = serializers.ChoiceField(choices=ACTIONS)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False,
+                                max_length=10000)
+    filter = serializers.DictField(required=False, help_text='LinkFilter parameters, e.g. {"is_active": false}')
+    all = serializers.BooleanField(default=False, help_text='Select every link (instead of ids or filter)')
+    user_id = serializers.IntegerField(required=False, help_text='New owner (reassign only)')
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_filter(self, value):
+        # LinkFilter ignores unknown keys and empty values, so a typo would select every link
+        if not value:
+            raise serializers.ValidationError('An empty filter selects every link; send "all": true for that')
+        unknown = sorted(set(value) - set(LinkFilter.base_filters))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown filter parameter(s): {', '.join(unknown)}")
+        empty = sorted(key for key, item in value.items() if item in (None, ''))
+        if empty:
+            raise serializers.ValidationError(f"Filter parameter(s) without a value: {', '.join(empty)}")
+        return value
+
+    def validate(self, attrs):
+        if [('ids' in attrs), ('filter' in attrs), attrs['all']].count(True) != 1:
+            raise serializers.ValidationError('Provide exactly one of ids, filter or "all": true')
+        if attrs['action'] == 'reassign':
+            User = get_user_model()
+            try:
+                attrs['owner'] = User.objects.get(pk=attrs.get('user_id'))
+            except User.DoesNotExist:
+                raise serializers.ValidationError({'user_id': 'A valid user_id is required to reassign links'})
+        return attrs
+
+
+# Serializer for batch link statistics
+class LinkBatchStatsSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filter = serializers.DictField(required=False, help_text='LinkFilter parameters, e.g. {"is_active": true}')
+
+    def validate_ids(self, value):
+        limit = settings.STATS_BATCH_MAX_LINKS
+        if len(value) > limit:
+            raise serializers.ValidationError(f'At most {limit} links per request')
+        return list(dict.fromkeys(value))
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError('Provide either ids or filter')
+        return attrs
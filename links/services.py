@@ -1,45 +1,393 @@
 import string
 import random
-from .models import Link
+from collections import Counter
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from webhooks.models import OutboxEvent
+from webhooks.services import OutboxService, link_payload
+from utils.db_router import is_pinned
+from . import resolver_cache
+from .code_filter import code_filter
+from .models import REDIRECT_FIELDS, Link, hash_url
+from .sharding import ShardedQuerySet, get_shards, is_sharded, shard_for_code, shard_for_id, using
+
+
+class LinkQuotaExceeded(Exception):
+    """The owner already has as many links as their quota allows."""
+
+    def __init__(self, user):
+        self.quota = user.get_link_quota()
+        super().__init__(f'{user} has reached the quota of {self.quota} link(s)')
+
+
+class LinkQuotaService:
+    """
+    User.link_count, kept in step with the links a user owns. Every change
+    is an F() update of the users row in the transaction that changes the
+    links, so it is never a read-modify-write. reconcile() repairs counts
+    that drifted (links changed outside LinkService, or a shard transaction
+    that committed while the users one did not).
+    """
+
+    @staticmethod
+    def reserve(user):
+        """
+        Count one more link for `user`, or raise LinkQuotaExceeded. The check
+        and the increment are one conditional UPDATE, and its row lock holds
+        off concurrent creates for the same user until the transaction ends.
+        """
+        quota = user.get_link_quota()
+        users = get_user_model().objects.filter(pk=user.pk)
+        if quota is not None:
+            users = users.filter(link_count__lt=quota)
+        if users.update(link_count=F('link_count') + 1) != 1:
+            raise LinkQuotaExceeded(user)
+
+    @staticmethod
+    def add(counts):
+        """Add {user_id: links} to the counters (negative values remove links; counts never go below 0)."""
+        users = get_user_model().objects
+        for user_id, count in counts.items():
+            if user_id is not None and count:
+                users.filter(pk=user_id).update(link_count=Greatest(F('link_count') + count, 0))
+
+    @staticmethod
+    def reconcile(batch_size=1000, dry_run=False):
+        """
+        Recount the links of every user, `batch_size` users at a time, and fix
+        the counters that differ. A counter that changed while its links were
+        counted is left for the next run. Returns {'users', 'fixed'}.
+        """
+        users = get_user_model().objects.using(DEFAULT_DB_ALIAS)
+        summary = {'users': 0, 'fixed': 0}
+        last = 0
+        while True:
+            batch = list(users.filter(pk__gt=last).order_by('pk').values_list('pk', 'link_count')[:batch_size])
+            if not batch:
+                return summary
+            first, last = batch[0][0], batch[-1][0]
+            actual = Counter()
+            for alias in get_shards():
+                # Served by the (user, -created_at) index
+                actual.update(dict(
+                    Link.objects.using(alias).filter(user_id__gte=first, user_id__lte=last)
+                    .order_by().values_list('user_id').annotate(count=Count('id'))
+                ))
+            for pk, stored in batch:
+                if actual[pk] == stored:
+                    continue
+                summary['fixed'] += 1
+                if not dry_run:
+                    users.filter(pk=pk, link_count=stored).update(link_count=actual[pk])
+            summary['users'] += len(batch)
+
+
+class UserLinkMetricsService:
+    """
+    The link metrics of the user list (User.active_link_count, click_count
+    and last_clicked_at), rolled up from the links. Users and links live on
+    different databases, so a request cannot join them: refresh() runs one
+    grouped query per shard for each batch of users and writes back only the
+    users whose metrics changed. link_count is LinkQuotaService's live
+    counter and is left alone.
+    """
+
+    FIELDS = ['active_link_count', 'click_count', 'last_clicked_at']
+
+    @staticmethod
+    def totals(first, last):
+        """{user_id: [active links, clicks, last click]} of the users with ids in [first, last], over every shard."""
+        totals = {}
+        for alias in get_shards():
+            rows = (
+                Link.objects.using(alias).filter(user_id__gte=first, user_id__lte=last)
+                .order_by().values_list('user_id')
+                .annotate(active=Count('id', filter=Q(is_active=True)), clicks=Sum('click_count'),
+                          last_clicked_at=Max('last_clicked_at'))
+            )
+            for user_id, active, clicks, last_clicked_at in rows:
+                total = totals.setdefault(user_id, [0, 0, None])
+                total[0] += active
+                total[1] += clicks
+                if last_clicked_at is not None and (total[2] is None or last_clicked_at > total[2]):
+                    total[2] = last_clicked_at
+        return totals
+
+    @staticmethod
+    def refresh(batch_size=1000):
+        """Recompute the metrics of every user, `batch_size` users at a time. Returns {'users', 'updated'}."""
+        users = get_user_model().objects.using(DEFAULT_DB_ALIAS)
+        fields = UserLinkMetricsService.FIELDS
+        summary = {'users': 0, 'updated': 0}
+        last = 0
+        while True:
+            batch = list(users.filter(pk__gt=last).order_by('pk').only('pk', *fields)[:batch_size])
+            if not batch:
+                return summary
+            last = batch[-1].pk
+            totals = UserLinkMetricsService.totals(batch[0].pk, last)
+            changed = []
+            for user in batch:
+                values = totals.get(user.pk, [0, 0, None])
+                if [getattr(user, field) for field in fields] != values:
+                    for field, value in zip(fields, values):
+                        setattr(user, field, value)
+                    changed.append(user)
+            # Only these columns: a link_count update that lands meanwhile is kept
+            users.bulk_update(changed, fields)
+            summary['users'] += len(batch)
+            summary['updated'] += len(changed)
+
 
 class LinkService:
     @staticmethod
-    def generate_short_code(length=6):
+    def generate_short_code(length=6, shard=None):
+        # With `shard` set, only codes that hash to that shard are accepted
         characters = string.ascii_letters + string.digits
         while True:
             short_code = ''.join(random.choices(characters, k=length))
-            if not Link.objects.filter(short_code=short_code).exists():
+            code_shard = shard_for_code(short_code)
+            if shard is not None and code_shard != shard:
+                continue
+            if not using(Link, code_shard).filter(short_code=short_code).exists():
                 return short_code
 
     @staticmethod
-    def create_link(original_url, user=None, custom_alias=None, note=''):
-        short_code = LinkService.generate_short_code()
-        link = Link.objects.create(
-            short_code=short_code,
-            custom_alias=custom_alias,
-            original_url=original_url,
-            user=user,
-            note=note
-        )
+    def create_link(original_url, user=None, custom_alias=None, note='', active_from=None, expires_at=None,
+                    max_clicks=None):
+        # An aliased link lives on its alias' shard, and its short code is drawn to hash there too
+        shard = shard_for_code(custom_alias) if custom_alias else None
+        short_code = LinkService.generate_short_code(shard=shard)
+        alias = shard or shard_for_code(short_code)
+        # The outbox event commits or rolls back together with the link, and so does the owner's link
+        # count (on a shard, the users transaction commits right after the link's)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), transaction.atomic(using=alias):
+            if user is not None:
+                LinkQuotaService.reserve(user)
+            link = using(Link, alias).create(
+                short_code=short_code,
+                custom_alias=custom_alias,
+                original_url=original_url,
+                user=user,
+                note=note,
+                active_from=active_from,
+                expires_at=expires_at,
+                max_clicks=max_clicks
+            )
+            OutboxService.emit(OutboxEvent.LINK_CREATED, link_payload(link), alias)
+        code_filter.add(link)
         return link
 
     @staticmethod
-    def update_link(link, original_url=None, note=None, is_active=None):
+    def get_or_create_link(original_url, user=None, custom_alias=None, note='', reuse_existing=False, **schedule):
+        # Returns (link, created). Only an owner's own links are reused: anonymous links belong to nobody.
+        # Links with a note, custom alias, window or click limit are always created.
+        if reuse_existing and user is not None and not note and not custom_alias and not any(schedule.values()):
+            link = LinkService.find_existing_link(original_url, user)
+            if link:
+                return link, False
+        link = LinkService.create_link(original_url, user=user, custom_alias=custom_alias, note=note, **schedule)
+        return link, True
+
+    @staticmethod
+    def find_existing_link(original_url, user):
+        # An active, alias-free, unlimited link of `user` to the same normalized URL, if any
+        if user is None:
+            return None
+        url_hash = hash_url(original_url)
+        for alias in get_shards():
+            link = using(Link, alias).filter(
+                url_hash=url_hash, user=user, is_active=True, custom_alias__isnull=True,
+                active_from__isnull=True, expires_at__isnull=True, max_clicks__isnull=True
+            ).order_by('id').first()
+            if link:
+                return link
+        return None
+
+    @staticmethod
+    def links_to_url(original_url):
+        # Served by the (url_hash, user) index; fan out with shard_querysets()
+        return Link.objects.filter(url_hash=hash_url(original_url))
+
+    @staticmethod
+    def get_watermark(queryset):
+        """
+        (count, latest updated_at, total clicks, highest id) of the links in
+        `queryset` (or ShardedQuerySet): changes whenever one of them is created,
+        deleted, updated or clicked. One aggregate query per shard.
+        """
+        parts = queryset.querysets if isinstance(queryset, ShardedQuerySet) else [queryset]
+        count, updated_at, clicks, last_pk = 0, None, 0, None
+        for part in parts:
+            row = part.order_by().aggregate(
+                count=Count('id'), updated_at=Max('updated_at'), clicks=Sum('click_count'), last_pk=Max('id')
+            )
+            count += row['count']
+            clicks += row['clicks'] or 0
+            updated_at = max(filter(None, [updated_at, row['updated_at']]), default=None)
+            last_pk = max(filter(None, [last_pk, row['last_pk']]), default=None)
+        return count, updated_at, clicks, last_pk
+
+    @staticmethod
+    def update_link(link, original_url=None, note=None, is_active=None, **schedule):
+        # `schedule` sets active_from / expires_at / max_clicks as given, None clears them
+        for field, value in schedule.items():
+            setattr(link, field, value)
         if original_url is not None:
             link.original_url = original_url
         if note is not None:
             link.note = note
         if is_active is not None:
             link.is_active = is_active
-        link.save()
+        alias = router.db_for_write(Link, instance=link)
+        with transaction.atomic(using=alias):
+            link.save()
+            OutboxService.emit(OutboxEvent.LINK_UPDATED, link_payload(link), alias)
+        resolver_cache.invalidate([link])
         return link
 
+    @staticmethod
+    def delete_link(link):
+        alias = router.db_for_write(Link, instance=link)
+        payload = link_payload(link)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), transaction.atomic(using=alias):
+            link.delete()
+            OutboxService.emit(OutboxEvent.LINK_DELETED, payload, alias)
+            LinkQuotaService.add({link.user_id: -1})
+        resolver_cache.invalidate([link])
+
+    @staticmethod
+    def set_links_active(alias, pks, is_active):
+        """
+        Activate or deactivate the links `pks` on `alias` that are not in that
+        state yet, emitting a link.updated event for each. Returns the count.
+        """
+        links = Link.objects.using(alias)
+        now = timezone.now()
+        with transaction.atomic(using=alias):
+            changed = list(links.filter(pk__in=pks).exclude(is_active=is_active).select_for_update())
+            links.filter(pk__in=[link.pk for link in changed]).update(is_active=is_active, updated_at=now)
+            for link in changed:
+                link.is_active, link.updated_at = is_active, now
+            OutboxService.emit_many(OutboxEvent.LINK_UPDATED, [link_payload(link) for link in changed], alias)
+        resolver_cache.invalidate(changed)
+        return len(changed)
+
+    @staticmethod
+    def bulk_update_links(queryset, action, owner=None, chunk_size=1000, dry_run=False):
+        """
+        Apply a bulk action ('activate', 'deactivate', 'delete' or 'reassign' to
+        `owner`) to every link in `queryset`, shard by shard, in chunks of
+        `chunk_size` primary keys. Yields a progress dict after each chunk; the
+        last one has done=True. A dry run only counts the matching links.
+        """
+        # Explicit aliases keep the scan on the primary (or each shard), never on a replica
+        querysets = [queryset.using(alias) for alias in get_shards()]
+        total = sum(qs.count() for qs in querysets)
+        progress = {'action': action, 'dry_run': dry_run, 'matched': total, 'processed': 0, 'affected': 0,
+                    'done': False}
+        if dry_run:
+            yield {**progress, 'done': True}
+            return
+
+        for qs in querysets:
+            last_pk = 0
+            while True:
+                # Keyset pagination: links the action stops matching are not skipped or revisited
+                pks = list(qs.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+                if not pks:
+                    break
+                last_pk = pks[-1]
+                if action in ('activate', 'deactivate'):
+                    affected = LinkService.set_links_active(qs.db, pks, action == 'activate')
+                else:
+                    affected = LinkService._delete_or_reassign(qs.db, pks, action, owner)
+                progress['processed'] += len(pks)
+                progress['affected'] += affected
+                yield dict(progress)
+
+        yield {**progress, 'done': True}
+
+    @staticmethod
+    def _delete_or_reassign(alias, pks, action, owner):
+        # One transaction per chunk: the changes and their outbox events commit together
+        links = Link.objects.using(alias)
+        now = timezone.now()
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), transaction.atomic(using=alias):
+            chunk = list(links.filter(pk__in=pks).select_for_update())
+            # Reassigned links count for their new owner, past their quota if need be
+            counts = Counter()
+            for link in chunk:
+                counts[link.user_id] -= 1
+            if action == 'reassign':
+                counts[owner.pk if owner else None] += len(chunk)
+            LinkQuotaService.add(counts)
+            if action == 'delete':
+                event_type = OutboxEvent.LINK_DELETED
+                payloads = [link_payload(link) for link in chunk]
+                affected = links.filter(pk__in=pks).delete()[1].get(Link._meta.label, 0)
+            else:
+                event_type = OutboxEvent.LINK_UPDATED
+                affected = links.filter(pk__in=pks).update(user=owner, updated_at=now)
+                for link in chunk:
+                    link.user, link.updated_at = owner, now
+                payloads = [link_payload(link) for link in chunk]
+            OutboxService.emit_many(event_type, payloads, alias)
+        resolver_cache.invalidate(chunk)
+        return affected
+
+    @staticmethod
+    def is_alias_taken(alias):
+        return using(Link, shard_for_code(alias)).filter(custom_alias=alias).exists()
+
     @staticmethod
     def get_link_by_code(code):
+        """
+        The link whose short code or custom alias is `code`, or None. Links
+        that must not redirect (inactive, outside their window, at their click
+        limit) are returned too: callers decide with get_unavailable_reason(),
+        and the code filter and the resolver cache hold them like any link.
+        The click limit is only final when AnalyticsService.track_click counts
+        the click (ClickLimitReached).
+        """
+        # A client that just wrote (pinned to the primary) skips the filter and the cache, which may
+        # not know its change yet
+        pinned = is_pinned()
+        if not pinned:
+            if not code_filter.might_exist(code):
+                return None
+            link = resolver_cache.get(code)
+            if link is not None:
+                return link
+        # Only the columns a redirect reads
+        links = using(Link, shard_for_code(code)).only(*REDIRECT_FIELDS)
         try:
-            return Link.objects.get(short_code=code, is_active=True)
+            link = links.get(short_code=code)
         except Link.DoesNotExist:
             try:
-                return Link.objects.get(custom_alias=code, is_active=True)
+                link = links.get(custom_alias=code)
             except Link.DoesNotExist:
                 return None
+        resolver_cache.store(link)
+        return link
+
+    @staticmethod
+    def get_link_by_id(pk, fields=None):
+        # Raises Link.DoesNotExist like Link.objects.get; `fields` limits the loaded columns (only())
+        links = Link.objects.only(*fields) if fields else Link.objects.all()
+        if not is_sharded():
+            return links.get(pk=pk)
+        shard = shard_for_id(pk)
+        try:
+            return links.using(shard).get(pk=pk)
+        except Link.DoesNotExist:
+            # Rebalanced links keep their id but may have moved to another shard
+            for alias in get_shards():
+                if alias != shard:
+                    link = links.using(alias).filter(pk=pk).first()
+                    if link:
+                        return link
+            raise
@@ -0,0 +1,219 @@
+import heapq
+import zlib
+from functools import cmp_to_key
+from itertools import islice
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Models partitioned across LINK_SHARDS. Everything else lives on 'default'.
+SHARDED_MODELS = {
+    'links.link', 'links.linkhealth', 'analytics.clickstats', 'analytics.spoolcheckpoint', 'webhooks.outboxevent',
+}
+
+# Primary keys on shard N start at N << SHARD_ID_BITS, so an id maps to its shard.
+SHARD_ID_BITS = 48
+
+
+def get_shards():
+    return list(getattr(settings, 'LINK_SHARDS', [DEFAULT_DB_ALIAS]))
+
+
+def is_sharded():
+    return len(get_shards()) > 1
+
+
+def is_sharded_model(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def shard_for_code(code):
+    """Shard holding the link whose short code or custom alias is `code`."""
+    shards = get_shards()
+    return shards[zlib.crc32(code.encode()) % len(shards)]
+
+
+def shard_for_link(link):
+    """Shard a link belongs on: its public code (custom alias or short code) decides."""
+    return shard_for_code(link.custom_alias or link.short_code)
+
+
+def shard_for_id(pk):
+    """Shard that allocated `pk`, or 'default' for ids outside every shard range."""
+    shards = get_shards()
+    index = int(pk) >> SHARD_ID_BITS
+    return shards[index] if index < len(shards) else DEFAULT_DB_ALIAS
+
+
+def id_base(alias):
+    return get_shards().index(alias) << SHARD_ID_BITS
+
+
+def using(model, alias):
+    """
+    Queryset of `model` on shard `alias`. Without sharding the plain queryset is
+    returned so the replica router still decides where reads go.
+    """
+    if not is_sharded():
+        return model.objects.all()
+    return model.objects.using(alias)
+
+
+def shard_querysets(queryset):
+    """The same queryset evaluated on every shard."""
+    if not is_sharded():
+        return [queryset]
+    return [queryset.using(alias) for alias in get_shards()]
+
+
+def ensure_id_offset(alias, model):
+    """Move the id sequence of `model` on shard `alias` to the start of its id range."""
+    base = id_base(alias)
+    if base == 0:
+        return
+    table = model._meta.db_table
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, model._meta.pk.column])
+            sequence = cursor.fetchone()[0]
+            cursor.execute(f'SELECT last_value FROM {sequence}')
+            if cursor.fetchone()[0] < base:
+                cursor.execute('SELECT setval(%s, %s, false)', [sequence, base])
+        elif connection.vendor == 'sqlite':
+            cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, base - 1])
+            elif row[0] < base - 1:
+                cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [base - 1, table])
+
+
+def in_id_range(pk, alias):
+    base = id_base(alias)
+    return base <= pk < base + (1 << SHARD_ID_BITS)
+
+
+def _sqlite_sequence(cursor, table):
+    cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def next_sqlite_id(alias, model):
+    """
+    Next id in the range of shard `alias`, for a SQLite table. AUTOINCREMENT
+    continues after the largest id in the table, which after a rebalance may
+    be a moved row keeping its id from another shard's range; sqlite_sequence
+    still holds this shard's own high-water mark (copy_rows restores it).
+    PostgreSQL sequences ignore explicitly inserted ids and need no help.
+    """
+    with connections[alias].cursor() as cursor:
+        sequence = _sqlite_sequence(cursor, model._meta.db_table)
+    return max(sequence or 0, id_base(alias) - 1) + 1
+
+
+def copy_rows(objs, alias):
+    """Insert model instances into `alias` verbatim, keeping ids and auto timestamps."""
+    if not objs:
+        return
+    model = type(objs[0])
+    table = model._meta.db_table
+    fields = model._meta.concrete_fields
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    rows = [[field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields] for obj in objs]
+    with connection.cursor() as cursor:
+        if connection.vendor != 'sqlite':
+            cursor.executemany(sql, rows)
+            return
+        # SQLite raises the sequence to the largest id inserted, possibly in another shard's range: keep it
+        # at this shard's own high-water mark so next_sqlite_id stays in range
+        sequence = _sqlite_sequence(cursor, table)
+        cursor.executemany(sql, rows)
+        own = [obj.pk for obj in objs if in_id_range(obj.pk, alias)]
+        cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s',
+                       [max(sequence or 0, id_base(alias) - 1, *own), table])
+
+
+def _ordering(queryset):
+    query = queryset.query
+    if query.order_by:
+        return list(query.order_by)
+    if query.default_ordering:
+        return list(queryset.model._meta.ordering)
+    return []
+
+
+class ShardedQuerySet:
+    """
+    Read-only merge of one queryset per shard, sorted by their common ordering.
+
+    Supports what list views and the paginator need: count(), slicing,
+    iteration and values(). A slice [start:stop] fetches at most `stop` rows from each shard.
+    """
+    ordered = True
+
+    def __init__(self, querysets):
+        self.querysets = querysets
+        self.model = querysets[0].model
+        self.ordering = _ordering(querysets[0])
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def values(self, *fields):
+        # The merge compares rows on the ordering fields, so they are always selected
+        names = [*fields, *(name for name in (field.lstrip('-') for field in self.ordering) if name not in fields)]
+        return ShardedQuerySet([queryset.values(*names) for queryset in self.querysets])
+
+    def __iter__(self):
+        return iter(self._merge([iter(queryset) for queryset in self.querysets]))
+
+    def __getitem__(self, item):
+        if isinstance(item, int):
+            return self[item:item + 1][0]
+        start, stop = item.start or 0, item.stop
+        if stop is None:
+            return list(islice(iter(self), start, None))
+        parts = [iter(queryset[:stop]) for queryset in self.querysets]
+        return list(islice(self._merge(parts), start, stop))
+
+    def _merge(self, iterables):
+        if not self.ordering:
+            return (obj for iterable in iterables for obj in iterable)
+        return heapq.merge(*iterables, key=cmp_to_key(self._compare))
+
+    def _compare(self, a, b):
+        for field in self.ordering:
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            if isinstance(a, dict):
+                left, right = a[name], b[name]
+            else:
+                name = 'pk' if name == 'id' else name
+                left, right = getattr(a, name), getattr(b, name)
+            if left == right:
+                continue
+            if left is None or right is None:
+                result = -1 if left is None else 1
+            else:
+                result = -1 if left < right else 1
+            return -result if descending else result
+        return 0
+
+
+class ShardedListMixin:
+    """List view mixin: run the filtered queryset on every shard and merge the results."""
+
+    def filter_queryset(self, queryset):
+        if not is_sharded():
+            return super().filter_queryset(queryset)
+        return ShardedQuerySet([super(ShardedListMixin, self).filter_queryset(qs) for qs in shard_querysets(queryset)])
@@ -112,3 +112,41 @@ class TestLinkAPI:
         response = self.client.get(f'/api/links/{link.id}/check_status/')
         assert response.status_code == 200
         assert response.data['is_active'] is True
+
+    def test_reuse_existing_link(self):
+        self.client.force_authenticate(user=self.user)
+        first = self.client.post('/api/links/', {'original_url': 'https://example.com'})
+        assert first.status_code == 201
+        second = self.client.post('/api/links/', {'original_url': 'https://example.com', 'reuse_existing': True})
+        assert second.status_code == 200
+        assert second.data['id'] == first.data['id']
+
+    def test_user_setting_enables_reuse(self):
+        self.user.reuse_existing_links = True
+        self.user.save()
+        self.client.force_authenticate(user=self.user)
+        first = self.client.post('/api/links/', {'original_url': 'https://example.com'})
+        second = self.client.post('/api/links/', {'original_url': 'https://example.com'})
+        assert second.status_code == 200
+        assert second.data['id'] == first.data['id']
+        third = self.client.post('/api/links/', {'original_url': 'https://example.com', 'reuse_existing': False})
+        assert third.status_code == 201
+
+    def test_lookup_links_by_url(self):
+        own = Link.objects.create(short_code='abc123', original_url='https://example.com/a', user=self.user)
+        Link.objects.create(short_code='def456', original_url='https://example.com/a', user=self.admin)
+        Link.objects.create(short_code='ghi789', original_url='https://example.com/b', user=self.user)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/links/lookup/', {'url': 'https://EXAMPLE.com/a'})
+        assert response.status_code == 200
+        assert [item['id'] for item in response.data['results']] == [own.id]
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/links/lookup/', {'url': 'https://example.com/a'})
+        assert response.data['count'] == 2
+
+    def test_lookup_requires_url(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/links/lookup/')
+        assert response.status_code == 400
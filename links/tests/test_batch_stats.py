@@ -0,0 +1,74 @@
+import pytest
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from analytics.models import ClickStats
+from analytics.services import AnalyticsService
+from links.services import LinkService
+from links.sharding import get_shards
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestLinkBatchStats:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.links = [LinkService.create_link(f'https://example.com/{i}', user=self.user) for i in range(3)]
+        self.foreign = LinkService.create_link('https://example.com/other', user=self.other)
+
+    def click_at(self, link, moment):
+        click = AnalyticsService.track_click(link)
+        ClickStats.objects.using(link._state.db).filter(pk=click.pk).update(clicked_at=moment)
+
+    def post(self, data, **params):
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(f'/api/links/stats/batch/?{query}', data, format='json')
+
+    def test_series_for_many_links(self):
+        self.click_at(self.links[0], datetime(2024, 1, 1, 8, tzinfo=timezone.utc))
+        self.click_at(self.links[0], datetime(2024, 1, 2, 8, tzinfo=timezone.utc))
+        self.click_at(self.links[1], datetime(2024, 1, 2, 9, tzinfo=timezone.utc))
+
+        ids = [link.pk for link in self.links] + [self.foreign.pk]
+        response = self.post({'ids': ids}, start='2024-01-01', end='2024-01-03')
+        assert response.status_code == 200
+        assert len(response.data['buckets']) == 2
+        stats = response.data['links']
+        assert stats[str(self.links[0].pk)] == {
+            'short_code': self.links[0].short_code, 'total_clicks': 2, 'series': [1, 1]
+        }
+        assert stats[str(self.links[1].pk)]['series'] == [0, 1]
+        assert stats[str(self.links[2].pk)]['series'] == [0, 0]
+        # Links of other users are not revealed
+        assert response.data['missing'] == [self.foreign.pk]
+
+    def count_queries(self, data):
+        # Summed over every database, so the check also holds with LINK_SHARDS
+        with ExitStack() as stack:
+            contexts = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+            assert self.post(data).status_code == 200
+        return sum(len(context.captured_queries) for context in contexts)
+
+    def test_query_count_does_not_grow_with_links(self):
+        few = self.count_queries({'ids': [self.links[0].pk]})
+        more = [LinkService.create_link(f'https://example.com/more/{i}', user=self.user) for i in range(10)]
+        # At most one more clicks query per extra shard the links are spread over
+        assert self.count_queries({'ids': [link.pk for link in self.links + more]}) <= few + len(get_shards()) - 1
+
+    def test_filter_selection_is_capped(self, settings):
+        settings.STATS_BATCH_MAX_LINKS = 2
+        response = self.post({'filter': {'is_active': True}})
+        assert response.status_code == 200
+        assert len(response.data['links']) == 2
+        assert response.data['truncated'] is True
+        assert self.post({'ids': [link.pk for link in self.links]}).status_code == 400
+
+    def test_requires_selection(self):
+        assert self.post({}).status_code == 400
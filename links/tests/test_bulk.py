@@ -0,0 +1,89 @@
+import json
+import pytest
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from analytics.services import AnalyticsService
+from links.models import Link
+from links.services import LinkService
+from links.sharding import shard_querysets
+
+User = get_user_model()
+
+
+def count_links(**filters):
+    return sum(qs.count() for qs in shard_querysets(Link.objects.filter(**filters)))
+
+
+@pytest.mark.django_db
+class TestLinkBulkAPI:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='adminpass123',
+                                              role=User.ADMIN)
+        self.links = [LinkService.create_link(f'https://example.com/{i}', user=self.user) for i in range(5)]
+        self.client.force_authenticate(user=self.admin)
+
+    def post(self, data, **extra):
+        return self.client.post('/api/links/bulk/', data, format='json', **extra)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=self.user)
+        assert self.post({'action': 'deactivate', 'ids': [self.links[0].pk]}).status_code == 403
+
+    def test_deactivate_by_ids(self, settings):
+        settings.LINK_BULK_CHUNK_SIZE = 2
+        ids = [link.pk for link in self.links[:3]]
+        response = self.post({'action': 'deactivate', 'ids': ids})
+        assert response.status_code == 200
+        assert response.data['matched'] == 3
+        assert response.data['affected'] == 3
+        assert count_links(is_active=False) == 3
+
+        # Already inactive links are matched but not rewritten
+        response = self.post({'action': 'deactivate', 'ids': ids})
+        assert response.data['affected'] == 0
+
+    def test_filter_and_dry_run(self):
+        LinkService.update_link(self.links[0], is_active=False)
+        response = self.post({'action': 'delete', 'filter': {'is_active': False}, 'dry_run': True})
+        assert response.data['matched'] == 1
+        assert response.data['affected'] == 0
+        assert count_links() == 5
+
+        AnalyticsService.track_click(self.links[0])
+        response = self.post({'action': 'delete', 'filter': {'is_active': False}})
+        assert response.data['affected'] == 1
+        assert count_links() == 4
+
+    def test_reassign(self):
+        response = self.post({'action': 'reassign', 'ids': [self.links[0].pk], 'user_id': self.admin.pk})
+        assert response.data['affected'] == 1
+        assert count_links(user=self.admin) == 1
+        assert self.post({'action': 'reassign', 'ids': [self.links[0].pk]}).status_code == 400
+
+    def test_invalid_selection(self):
+        assert self.post({'action': 'activate'}).status_code == 400
+        assert self.post({'action': 'activate', 'ids': [1], 'filter': {}}).status_code == 400
+        assert self.post({'action': 'activate', 'filter': {'created_after': 'yesterday'}}).status_code == 400
+        assert self.post({'action': 'activate', 'ids': [1], 'all': True}).status_code == 400
+
+    def test_filter_must_select_something(self):
+        # Ignored by LinkFilter, these would match every link
+        for selection in [{}, {'is_activ': False}, {'is_active': ''}]:
+            response = self.post({'action': 'delete', 'filter': selection})
+            assert response.status_code == 400
+            assert 'filter' in response.data
+        assert count_links() == 5
+
+        response = self.post({'action': 'delete', 'all': True, 'dry_run': True})
+        assert response.data['matched'] == 5
+
+    def test_streams_progress(self, settings):
+        settings.LINK_BULK_CHUNK_SIZE = 2
+        response = self.post({'action': 'deactivate', 'all': True}, HTTP_ACCEPT='application/x-ndjson')
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert lines[-1]['done'] and lines[-1]['affected'] == 5
+        assert len(lines) >= 4
+        assert all(not line['done'] for line in lines[:-1])
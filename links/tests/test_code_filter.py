@@ -0,0 +1,109 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from links.code_filter import BloomFilter, CodeFilter, code_filter
+from links.models import Link
+from links.services import LinkService
+from links.sharding import shard_for_code, using
+from utils.db_router import pin_to_primary, unpin
+
+User = get_user_model()
+
+
+class TestBloomFilter:
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(10000, 0.01)
+        for i in range(10000):
+            bloom.add(f'code{i}')
+        assert all(f'code{i}' in bloom for i in range(10000))
+        false_positives = sum(f'other{i}' in bloom for i in range(10000))
+        assert false_positives < 200
+        assert bloom.estimated_false_positive_rate() == pytest.approx(0.01, rel=0.3)
+
+    def test_adding_a_key_again_does_not_count(self):
+        bloom = BloomFilter(100, 0.01)
+        assert bloom.add('code')
+        assert not bloom.add('code')
+        assert bloom.count == 1
+
+
+@pytest.mark.django_db
+class TestCodeFilter:
+    @pytest.fixture(autouse=True)
+    def enabled(self, settings):
+        settings.LINK_CODE_FILTER = True
+        settings.LINK_CODE_FILTER_REFRESH_SECONDS = 3600
+        code_filter.build()
+        yield
+        code_filter._bloom = None
+
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+
+    def test_unknown_code_skips_the_database(self, django_assert_num_queries):
+        # Writes pin the context to the primary; a plain redirect request is not pinned
+        unpin()
+        with django_assert_num_queries(0):
+            assert LinkService.get_link_by_code('nosuch') is None
+
+    def test_links_created_by_this_worker_are_found(self):
+        link = LinkService.create_link('https://example.com', user=self.user, custom_alias='mine')
+        unpin()
+        assert LinkService.get_link_by_code(link.short_code) == link
+        assert LinkService.get_link_by_code('mine') == link
+
+    def test_links_created_elsewhere_are_found_after_refresh(self, settings):
+        # Another worker's filter: it did not see the create
+        using(Link, shard_for_code('abc123')).create(short_code='abc123', original_url='https://example.com')
+        unpin()
+        assert LinkService.get_link_by_code('abc123') is None
+        settings.LINK_CODE_FILTER_REFRESH_SECONDS = 0
+        assert LinkService.get_link_by_code('abc123').short_code == 'abc123'
+
+    def test_refresh_does_not_count_codes_again(self, settings):
+        LinkService.create_link('https://example.com', user=self.user)
+        settings.LINK_CODE_FILTER_REFRESH_SECONDS = 0
+        count = code_filter._bloom.count
+        for _ in range(3):
+            code_filter.refresh()
+        assert code_filter._bloom.count == count
+
+    def test_stale_filter_is_rebuilt_off_the_request(self, settings, monkeypatch):
+        link = LinkService.create_link('https://example.com', user=self.user)
+        started = []
+        monkeypatch.setattr(code_filter, 'rebuild_in_background', lambda: started.append(True))
+        settings.LINK_CODE_FILTER_REBUILD_SECONDS = 0
+        bloom = code_filter._bloom
+        assert code_filter.might_exist(link.short_code)
+        assert started and code_filter._bloom is bloom
+
+    def test_one_build_at_a_time(self):
+        with code_filter._build_lock:
+            assert not code_filter.rebuild_in_background()
+
+    def test_unknown_codes_are_rejected_after_a_refresh(self, settings):
+        unpin()
+        settings.LINK_CODE_FILTER_REFRESH_SECONDS = 0
+        refreshed_at = code_filter._refreshed_at
+        rejected = code_filter.rejected
+        assert not code_filter.might_exist('nosuch')
+        assert code_filter._refreshed_at > refreshed_at
+        assert code_filter.rejected == rejected + 1
+
+    def test_pinned_requests_bypass_the_filter(self):
+        using(Link, shard_for_code('abc123')).create(short_code='abc123', original_url='https://example.com')
+        token = pin_to_primary()
+        try:
+            assert LinkService.get_link_by_code('abc123') is not None
+        finally:
+            unpin(token)
+
+    def test_disabled_filter_accepts_everything(self, settings):
+        settings.LINK_CODE_FILTER = False
+        assert CodeFilter().might_exist('nosuch')
+
+    def test_command_reports_size(self, capsys):
+        call_command('link_code_filter')
+        out = capsys.readouterr().out
+        assert 'memory_bytes' in out
+        assert 'estimated_false_positive_rate' in out
@@ -0,0 +1,72 @@
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from analytics.services import AnalyticsService
+from links.services import LinkService
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestConditionalRequests:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.link = LinkService.create_link('https://example.com', user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def revalidate(self, url, response, **extra):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **extra)
+
+    def test_detail_is_not_modified_until_the_link_changes(self):
+        url = f'/api/links/{self.link.pk}/'
+        response = self.client.get(url)
+        assert response['ETag'].startswith('W/"')
+        assert response['Cache-Control'] == 'private, no-cache'
+
+        again = self.revalidate(url, response)
+        assert again.status_code == 304
+        assert again.content == b''
+
+        AnalyticsService.track_click(self.link)
+        assert self.revalidate(url, response).status_code == 200
+
+    def test_list_changes_with_updates_and_query(self):
+        url = '/api/links/list/'
+        response = self.client.get(url)
+        assert self.revalidate(url, response).status_code == 304
+        assert self.client.get(url + '?page=1', HTTP_IF_NONE_MATCH=response['ETag']).status_code == 200
+
+        LinkService.update_link(self.link, note='changed')
+        assert self.revalidate(url, response).status_code == 200
+
+    def test_list_changes_when_a_link_is_deleted(self):
+        other = LinkService.create_link('https://example.com/other', user=self.user)
+        url = '/api/links/list/'
+        response = self.client.get(url)
+        LinkService.delete_link(other)
+        assert self.revalidate(url, response).status_code == 200
+
+    def test_stats_change_with_clicks(self):
+        url = f'/api/links/{self.link.pk}/stats/?granularity=day'
+        response = self.client.get(url)
+        assert self.revalidate(url, response).status_code == 304
+        AnalyticsService.track_click(self.link)
+        assert self.revalidate(url, response).status_code == 200
+
+    def test_check_status_supports_last_modified(self):
+        url = f'/api/links/{self.link.pk}/check_status/'
+        client = APIClient()
+        response = client.get(url)
+        assert client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code == 304
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+        LinkService.update_link(self.link, is_active=False)
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 200
+
+    def test_errors_carry_no_validators(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f'/api/links/{self.link.pk}/')
+        assert response.status_code == 403
+        assert 'ETag' not in response
@@ -0,0 +1,97 @@
+import pytest
+from unittest import mock
+from django.db import OperationalError
+from django.test import override_settings
+from rest_framework.test import APIClient
+from links.models import Link
+from links.services import LinkService
+from utils import db_router
+from utils.db_router import PrimaryReplicaRouter, pin_to_primary, unpin
+from utils.middleware import PRIMARY_PIN_COOKIE
+
+
+class TestPrimaryReplicaRouter:
+    def setup_method(self):
+        self.router = PrimaryReplicaRouter()
+        db_router._replica_down_until.clear()
+        unpin()
+
+    def teardown_method(self):
+        db_router._replica_down_until.clear()
+        unpin()
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_use_primary_without_replicas(self):
+        assert self.router.db_for_read(Link) == 'default'
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_reads_use_replica(self):
+        with mock.patch.object(db_router, 'connections') as connections:
+            assert self.router.db_for_read(Link) == 'replica_1'
+            connections['replica_1'].ensure_connection.assert_called_once()
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_write_pins_reads_to_primary(self):
+        with mock.patch.object(db_router, 'connections'):
+            assert self.router.db_for_write(Link) == 'default'
+            assert self.router.db_for_read(Link) == 'default'
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_pinned_context_reads_primary(self):
+        token = pin_to_primary()
+        try:
+            assert self.router.db_for_read(Link) == 'default'
+        finally:
+            unpin(token)
+
+    @override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'], REPLICA_RETRY_SECONDS=30)
+    def test_failed_replica_falls_back(self):
+        with mock.patch.object(db_router, 'connections') as connections:
+            def connection(alias):
+                conn = mock.Mock()
+                if alias == 'replica_1':
+                    conn.ensure_connection.side_effect = OperationalError('down')
+                return conn
+            connections.__getitem__.side_effect = connection
+
+            for _ in range(5):
+                assert self.router.db_for_read(Link) == 'replica_2'
+            assert 'replica_1' in db_router._replica_down_until
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_RETRY_SECONDS=30)
+    def test_all_replicas_down_uses_primary(self):
+        with mock.patch.object(db_router, 'connections') as connections:
+            connections['replica_1'].ensure_connection.side_effect = OperationalError('down')
+            assert self.router.db_for_read(Link) == 'default'
+            # The failed replica is skipped without reconnecting
+            assert self.router.db_for_read(Link) == 'default'
+            assert connections['replica_1'].ensure_connection.call_count == 1
+
+    def test_replicas_are_not_migrated(self):
+        with override_settings(DATABASE_REPLICAS=['replica_1']):
+            assert self.router.allow_migrate('default', 'links')
+            assert not self.router.allow_migrate('replica_1', 'links')
+
+
+@pytest.mark.django_db
+class TestReplicaPinningMiddleware:
+    def setup_method(self):
+        self.client = APIClient()
+
+    def test_write_sets_pin_cookie(self):
+        response = self.client.post('/api/links/', {'original_url': 'https://example.com'})
+        assert response.status_code == 201
+        assert PRIMARY_PIN_COOKIE in response.cookies
+
+    def test_read_does_not_set_pin_cookie(self):
+        link = Link.objects.create(short_code='abc123', original_url='https://example.com')
+        response = self.client.get(f'/api/links/{link.id}/check_status/')
+        assert response.status_code == 200
+        assert PRIMARY_PIN_COOKIE not in response.cookies
+
+    def test_redirect_does_not_set_pin_cookie(self):
+        # Tracking the click is a write, but it must not pin every visitor to the primary
+        link = LinkService.create_link('https://example.com')
+        response = self.client.get(f'/api/links/{link.short_code}/')
+        assert response.status_code == 200
+        assert PRIMARY_PIN_COOKIE not in response.cookies
@@ -0,0 +1,104 @@
+import pytest
+from io import StringIO
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from analytics.services import AnalyticsService, ClickLimitReached
+from links.models import Link
+from links.services import LinkService
+from links.sharding import shard_querysets
+from utils.db_router import unpin
+
+
+@pytest.mark.django_db
+class TestLinkExpiry:
+    def setup_method(self):
+        self.client = APIClient()
+        self.now = timezone.now()
+
+    def test_redirect_respects_window(self):
+        expired = LinkService.create_link('https://example.com', expires_at=self.now - timedelta(minutes=1))
+        scheduled = LinkService.create_link('https://example.com', active_from=self.now + timedelta(hours=1))
+        live = LinkService.create_link('https://example.com', active_from=self.now - timedelta(hours=1),
+                                       expires_at=self.now + timedelta(hours=1))
+
+        response = self.client.get(f'/api/links/{expired.short_code}/')
+        assert response.status_code == 410
+        assert response.data['error'] == 'Link has expired'
+        assert self.client.get(f'/api/links/{scheduled.short_code}/').status_code == 410
+        assert self.client.get(f'/api/links/{live.short_code}/').status_code == 200
+
+    def test_inactive_link_is_gone(self):
+        link = LinkService.create_link('https://example.com')
+        LinkService.update_link(link, is_active=False)
+        response = self.client.get(f'/api/links/{link.short_code}/')
+        assert response.status_code == 410
+        assert response.data['error'] == 'Link is inactive'
+
+    def test_click_limit(self):
+        link = LinkService.create_link('https://example.com', max_clicks=2)
+        assert self.client.get(f'/api/links/{link.short_code}/').status_code == 200
+        assert self.client.get(f'/api/links/{link.short_code}/').status_code == 200
+        assert self.client.get(f'/api/links/{link.short_code}/').status_code == 410
+        link.refresh_from_db()
+        assert link.click_count == 2
+
+    def test_click_limited_redirect_loads_no_deferred_field(self, settings):
+        settings.CLICK_MILESTONES = []
+        link = LinkService.create_link('https://example.com', max_clicks=2)
+        unpin()
+        with CaptureQueriesContext(connections[link._state.db]) as queries:
+            assert self.client.get(f'/api/links/{link.short_code}/').status_code == 200
+        # The link, then the click and the guarded counter update in a savepoint
+        assert len(queries.captured_queries) == 5
+
+    def test_concurrent_clicks_cannot_pass_the_limit(self):
+        link = LinkService.create_link('https://example.com', max_clicks=1)
+        # Two redirects that both loaded the link before either counted its click
+        first, second = LinkService.get_link_by_code(link.short_code), LinkService.get_link_by_code(link.short_code)
+        assert first.get_unavailable_reason() is None and second.get_unavailable_reason() is None
+
+        AnalyticsService.track_click(first)
+        with pytest.raises(ClickLimitReached):
+            AnalyticsService.track_click(second)
+        link.refresh_from_db()
+        assert link.click_count == 1 and link.clicks.count() == 1
+
+    def test_save_does_not_overwrite_click_count(self):
+        link = LinkService.create_link('https://example.com')
+        stale = LinkService.get_link_by_id(link.pk)
+        AnalyticsService.track_click(link)
+        LinkService.update_link(stale, note='edited')
+        stale.refresh_from_db()
+        assert stale.click_count == 1
+        assert stale.note == 'edited'
+
+    def test_window_validation(self):
+        response = self.client.post('/api/links/', {
+            'original_url': 'https://example.com',
+            'active_from': self.now.isoformat(),
+            'expires_at': (self.now - timedelta(days=1)).isoformat(),
+        })
+        assert response.status_code == 400
+        assert 'expires_at' in response.data
+
+    def test_sweep_deactivates_due_links(self):
+        expired = LinkService.create_link('https://example.com', expires_at=self.now - timedelta(minutes=1))
+        used_up = LinkService.create_link('https://example.com', max_clicks=1)
+        AnalyticsService.track_click(used_up)
+        live = LinkService.create_link('https://example.com', expires_at=self.now + timedelta(days=1), max_clicks=5)
+
+        def inactive():
+            return {pk for qs in shard_querysets(Link.objects.filter(is_active=False))
+                    for pk in qs.values_list('pk', flat=True)}
+
+        call_command('sweep_expired_links', '--dry-run', stdout=StringIO())
+        assert inactive() == set()
+
+        call_command('sweep_expired_links', '--batch-size', '1', stdout=StringIO())
+        assert inactive() == {expired.pk, used_up.pk}
+        live.refresh_from_db()
+        assert live.is_active
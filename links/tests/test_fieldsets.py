@@ -0,0 +1,86 @@
+from contextlib import ExitStack
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from analytics.services import AnalyticsService
+from links.services import LinkService
+
+User = get_user_model()
+
+
+class capture_all_queries(ExitStack):
+    """The SQL run on every database (links and clicks may be on any shard)."""
+
+    def __enter__(self):
+        super().__enter__()
+        self.contexts = [self.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+        return self
+
+    @property
+    def sql(self):
+        return [query['sql'] for context in self.contexts for query in context.captured_queries]
+
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.link = LinkService.create_link('https://example.com', user=self.user, note='note')
+        AnalyticsService.track_click(self.link)
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_returns_only_the_requested_fields(self):
+        response = self.client.get('/api/links/list/?fields=short_url,id,total_clicks')
+        assert response.status_code == 200
+        assert response.data['results'] == [{'id': self.link.pk, 'short_url': self.link.short_code, 'total_clicks': 1}]
+
+    def test_omit_leaves_fields_out(self):
+        response = self.client.get('/api/links/list/?omit=click_timestamps,note')
+        item = response.data['results'][0]
+        assert 'click_timestamps' not in item and 'note' not in item
+        assert item['user_username'] == 'testuser'
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/links/list/?fields=id,password')
+        assert response.status_code == 400
+        assert 'password' in str(response.data['fields'])
+        assert self.client.get(f'/api/links/{self.link.pk}/?omit=nope').status_code == 400
+
+    def test_omitted_fields_are_not_queried(self):
+        with capture_all_queries() as everything:
+            self.client.get('/api/links/list/')
+        with capture_all_queries() as sparse:
+            response = self.client.get('/api/links/list/?fields=id,original_url')
+        assert response.data['results'] == [{'id': self.link.pk, 'original_url': 'https://example.com'}]
+        assert any('click_stats' in sql for sql in everything.sql)
+        assert not any('click_stats' in sql for sql in sparse.sql)
+        # Only the requested columns are selected
+        page = [sql for sql in sparse.sql if 'LIMIT' in sql and 'FROM "links"' in sql]
+        assert page and all('"note"' not in sql for sql in page)
+
+    def test_lookup_supports_fieldsets(self):
+        response = self.client.get('/api/links/lookup/', {'url': 'https://example.com', 'fields': 'id'})
+        assert response.status_code == 200
+        assert response.data['results'] == [{'id': self.link.pk}]
+
+    def test_detail_prunes_fields_and_click_queries(self):
+        url = f'/api/links/{self.link.pk}/'
+        with capture_all_queries() as queries:
+            response = self.client.get(url, {'omit': 'total_clicks,click_timestamps'})
+        assert response.status_code == 200
+        assert 'total_clicks' not in response.data and response.data['short_url'] == self.link.short_code
+        assert not any('click_stats' in sql for sql in queries.sql)
+        # Different fields, different representation
+        assert self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 200
+
+    def test_detail_loads_only_the_requested_columns(self):
+        with capture_all_queries() as queries:
+            response = self.client.get(f'/api/links/{self.link.pk}/', {'fields': 'original_url'})
+        assert response.data == {'original_url': 'https://example.com'}
+        [select] = [sql for sql in queries.sql if 'FROM "links"' in sql]
+        columns = select[:select.index(' FROM ')]
+        assert '"original_url"' in columns and '"id"' in columns
+        assert '"note"' not in columns and '"short_code"' not in columns
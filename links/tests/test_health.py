@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from links.health import HealthChecker, check_links
+from links.models import Link, LinkHealth
+from links.services import LinkService
+from links.sharding import get_shards
+
+User = get_user_model()
+
+
+def health_rows():
+    return {
+        health.link_id: health
+        for alias in get_shards() for health in LinkHealth.objects.using(alias).all()
+    }
+
+
+@pytest.fixture
+def destination():
+    """
+    A local stand-in for link destinations, with keep-alive: /ok answers 200,
+    /missing 404, /get-only 405 to HEAD, /slow waits `server.delay` seconds.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            with server.lock:
+                server.connections += 1
+
+        def answer(self):
+            with server.lock:
+                server.requests.append((self.command, self.path))
+                server.active += 1
+                server.peak = max(server.peak, server.active)
+            try:
+                if self.path.startswith('/slow'):
+                    time.sleep(server.delay)
+                status = {'/missing': 404, '/get-only': 405 if self.command == 'HEAD' else 200}.get(self.path, 200)
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            finally:
+                with server.lock:
+                    server.active -= 1
+
+        do_HEAD = do_GET = answer
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests, server.connections, server.active, server.peak, server.delay = [], 0, 0, 0, 2
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+class TestLinkHealth:
+    @pytest.fixture(autouse=True)
+    def allow_local_destinations(self, settings):
+        # The stand-in destinations listen on loopback, which is refused by default
+        settings.LINK_HEALTH_ALLOWED_HOSTS = ['127.0.0.1']
+
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+
+    def create(self, url, **kwargs):
+        return LinkService.create_link(url, user=self.user, **kwargs)
+
+    def test_statuses_and_latency_are_recorded(self, destination):
+        ok = self.create(f'{destination.url}/ok')
+        missing = self.create(f'{destination.url}/missing')
+        get_only = self.create(f'{destination.url}/get-only')
+        slow = self.create(f'{destination.url}/slow')
+        inactive = self.create(f'{destination.url}/ok?inactive')
+        LinkService.update_link(inactive, is_active=False)
+
+        summary = check_links(concurrency=10, per_host=4, timeout=0.5)
+        assert summary['links'] == 4 and summary['healthy'] == 2 and summary['broken'] == 2
+        assert summary['errors'] == {'timed out after 0.5s': 1}
+
+        rows = health_rows()
+        assert set(rows) == {ok.pk, missing.pk, get_only.pk, slow.pk}
+        assert rows[ok.pk].is_healthy and rows[ok.pk].status_code == 200 and rows[ok.pk].latency_ms >= 0
+        assert not rows[missing.pk].is_healthy and rows[missing.pk].status_code == 404
+        # HEAD refused, then answered to GET
+        assert rows[get_only.pk].is_healthy and rows[get_only.pk].status_code == 200
+        assert ('GET', '/get-only') in destination.requests
+        assert rows[slow.pk].status_code is None and rows[slow.pk].error == 'timed out after 0.5s'
+
+    def test_unreachable_destination_is_broken(self):
+        link = self.create('http://127.0.0.1:9/down')
+
+        check_links(concurrency=2, per_host=1, timeout=2)
+        health = health_rows()[link.pk]
+        assert not health.is_healthy and health.status_code is None and health.error
+
+    def test_internal_addresses_are_refused(self, destination, settings):
+        settings.LINK_HEALTH_ALLOWED_HOSTS = []
+        links = [self.create(url) for url in [
+            f'{destination.url}/ok', f'http://localhost:{destination.server_port}/ok',
+            'http://10.0.0.1/', 'http://169.254.169.254/latest/meta-data/', 'http://[::1]/',
+        ]]
+
+        summary = check_links(concurrency=4, per_host=2, timeout=5)
+        assert summary['links'] == 5 and summary['broken'] == 5
+        assert destination.requests == []
+        rows = health_rows()
+        assert all(rows[link.pk].error.startswith('refused:') for link in links)
+        assert 'non-public address 169.254.169.254' in rows[links[3].pk].error
+
+        # Allowed by network as well as by name
+        settings.LINK_HEALTH_ALLOWED_HOSTS = ['127.0.0.0/8']
+        check_links(concurrency=4, per_host=2, timeout=5)
+        assert health_rows()[links[0].pk].is_healthy
+
+    def test_idle_host_pools_are_dropped(self, destination):
+        async def scenario():
+            checker = HealthChecker(concurrency=4, per_host=2, timeout=5, allowed_hosts=['127.0.0.1'])
+            await checker.probe(f'{destination.url}/ok')
+            assert len(checker.pools) == 1
+            checker.pool_idle_seconds = 0
+            await checker.probe(f'{destination.url}/missing')
+            assert checker.pools == {}
+
+        asyncio.run(scenario())
+
+    def test_per_host_limit_and_connection_reuse(self, destination):
+        destination.delay = 0.05
+        for number in range(12):
+            self.create(f'{destination.url}/slow/{number}')
+
+        check_links(concurrency=10, per_host=3, timeout=5, batch_size=5)
+        assert len(health_rows()) == 12
+        assert destination.peak <= 3
+        # Each kept-alive connection served several probes
+        assert destination.connections <= 3
+
+    def test_recent_results_are_skipped_with_max_age(self, destination):
+        checked = self.create(f'{destination.url}/ok')
+        check_links(concurrency=2, per_host=2, timeout=5)
+        new = self.create(f'{destination.url}/missing')
+
+        summary = check_links(concurrency=2, per_host=2, timeout=5, max_age=timedelta(hours=1))
+        assert summary['links'] == 1 and summary['broken'] == 1
+        assert set(health_rows()) == {checked.pk, new.pk}
+
+        LinkHealth.objects.using(checked._state.db).filter(link_id=checked.pk).update(
+            checked_at=timezone.now() - timedelta(hours=2)
+        )
+        assert check_links(concurrency=2, per_host=2, timeout=5, max_age=timedelta(hours=1))['links'] == 1
+
+    def test_link_filter_by_health(self, destination):
+        ok = self.create(f'{destination.url}/ok')
+        missing = self.create(f'{destination.url}/missing')
+        check_links(concurrency=2, per_host=2, timeout=5)
+        unchecked = self.create(f'{destination.url}/ok')
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        for value, expected in [('healthy', ok), ('broken', missing), ('unchecked', unchecked)]:
+            response = client.get('/api/links/list/', {'health': value})
+            assert response.status_code == 200
+            assert [link['id'] for link in response.data['results']] == [expected.pk]
+        assert client.get('/api/links/list/', {'health': 'maybe'}).status_code == 400
+
+    def test_command_reports_throughput(self, destination):
+        self.create(f'{destination.url}/ok')
+        self.create(f'{destination.url}/missing')
+        out = StringIO()
+        call_command('check_link_health', '--concurrency', '4', '--timeout', '5', stdout=out)
+        assert 'Checked 2 link(s): 1 healthy, 1 broken' in out.getvalue()
+        assert 'links/s' in out.getvalue()
+        assert sum(Link.objects.using(alias).filter(health__is_healthy=False).count() for alias in get_shards()) == 1
@@ -1,5 +1,6 @@
 import pytest
-from links.models import Link
+from django.db import IntegrityError, transaction
+from links.models import Link, hash_url, normalize_url
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -29,3 +30,31 @@ class TestLinkModel:
             original_url='https://example.com'
         )
         assert link.short_url == 'abc123'
+
+    def test_codes_are_unique_and_many_links_have_no_alias(self):
+        Link.objects.create(short_code='abc123', custom_alias='mylink', original_url='https://example.com')
+        Link.objects.create(short_code='def456', original_url='https://example.com')
+        Link.objects.create(short_code='ghi789', original_url='https://example.com')
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Link.objects.create(short_code='abc123', original_url='https://example.com')
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Link.objects.create(short_code='xyz000', custom_alias='mylink', original_url='https://example.com')
+
+    def test_url_hash_follows_original_url(self):
+        link = Link.objects.create(short_code='abc123', original_url='https://example.com/a')
+        assert link.url_hash == hash_url('https://example.com/a')
+        link.original_url = 'https://example.com/b'
+        link.save(update_fields=['original_url'])
+        link.refresh_from_db()
+        assert link.url_hash == hash_url('https://example.com/b')
+
+
+class TestNormalizeUrl:
+    def test_scheme_host_and_default_port_are_normalized(self):
+        assert normalize_url('HTTPS://Example.COM') == 'https://example.com/'
+        assert normalize_url('https://example.com:443/a?b=1#c') == 'https://example.com/a?b=1#c'
+        assert normalize_url('http://u:p@Example.com:8080') == 'http://u:p@example.com:8080/'
+
+    def test_path_and_query_are_kept(self):
+        assert hash_url('https://example.com/A') != hash_url('https://example.com/a')
+        assert hash_url('https://example.com/?a=1') != hash_url('https://example.com/?a=2')
@@ -0,0 +1,122 @@
+from io import StringIO
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError
+from rest_framework.test import APIClient
+from links.models import Link
+from links.services import LinkQuotaExceeded, LinkService
+from links.sharding import get_shards, shard_for_code
+
+User = get_user_model()
+
+
+def link_count(user):
+    return User.objects.get(pk=user.pk).link_count
+
+
+@pytest.mark.django_db
+class TestLinkQuota:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='adminpass123',
+                                              role=User.ADMIN)
+
+    def create(self, user, number=0, **data):
+        self.client.force_authenticate(user=user)
+        return self.client.post('/api/links/', {'original_url': f'https://example.com/{number}', **data},
+                                format='json')
+
+    def test_creates_and_deletes_keep_the_counter(self):
+        links = [LinkService.create_link(f'https://example.com/{number}', user=self.user) for number in range(3)]
+        LinkService.create_link('https://example.com/guest')
+        assert link_count(self.user) == 3
+
+        LinkService.delete_link(links[0])
+        assert link_count(self.user) == 2
+
+    def test_bulk_delete_and_reassign_move_the_counts(self):
+        links = [LinkService.create_link(f'https://example.com/{number}', user=self.user) for number in range(4)]
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post('/api/links/bulk/', {
+            'action': 'reassign', 'ids': [link.pk for link in links[:3]], 'user_id': self.admin.pk
+        }, format='json')
+        assert response.data['affected'] == 3
+        assert (link_count(self.user), link_count(self.admin)) == (1, 3)
+
+        response = self.client.post('/api/links/bulk/', {'action': 'delete', 'ids': [link.pk for link in links]},
+                                    format='json')
+        assert response.data['affected'] == 4
+        assert (link_count(self.user), link_count(self.admin)) == (0, 0)
+
+    def test_role_quota_is_enforced(self, settings):
+        settings.LINK_QUOTAS = {**settings.LINK_QUOTAS, 'USER': 2, 'ADMIN': None}
+        assert self.create(self.user, 1).status_code == 201
+        assert self.create(self.user, 2).status_code == 201
+        response = self.create(self.user, 3)
+        assert response.status_code == 403
+        assert response.data['quota'] == 2
+        assert link_count(self.user) == 2
+        assert sum(Link.objects.using(alias).filter(user=self.user).count() for alias in get_shards()) == 2
+
+        # Reusing an existing link creates nothing, so it is allowed at the quota
+        assert self.create(self.user, 1, reuse_existing=True).status_code == 200
+        # No limit for admins
+        assert all(self.create(self.admin, number).status_code == 201 for number in range(3))
+
+    def test_user_quota_overrides_the_role(self, settings):
+        settings.LINK_QUOTAS = {**settings.LINK_QUOTAS, 'USER': 1}
+        self.user.link_quota = 3
+        self.user.save()
+        assert [self.create(self.user, number).status_code for number in range(4)] == [201, 201, 201, 403]
+
+    def test_stale_user_objects_cannot_exceed_the_quota(self, settings):
+        # Two concurrent requests, each with the user loaded before the other's create
+        settings.LINK_QUOTAS = {**settings.LINK_QUOTAS, 'USER': 1}
+        first, second = User.objects.get(pk=self.user.pk), User.objects.get(pk=self.user.pk)
+        LinkService.create_link('https://example.com/1', user=first)
+        with pytest.raises(LinkQuotaExceeded):
+            LinkService.create_link('https://example.com/2', user=second)
+        assert link_count(self.user) == 1
+
+        # Saving a stale copy does not write its link_count back
+        second.email = 'changed@example.com'
+        second.save()
+        assert link_count(self.user) == 1
+
+    def test_failed_create_releases_the_quota(self, settings):
+        settings.LINK_QUOTAS = {**settings.LINK_QUOTAS, 'USER': 1}
+        link = LinkService.create_link('https://example.com/1', user=self.user, custom_alias='taken')
+        LinkService.delete_link(link)
+        Link.objects.using(shard_for_code('taken')).create(short_code='zzzzzz', custom_alias='taken',
+                                                           original_url='https://example.com/other')
+        with pytest.raises(IntegrityError):
+            LinkService.create_link('https://example.com/2', user=self.user, custom_alias='taken')
+        assert link_count(self.user) == 0
+
+    def test_reconcile_command_repairs_drift(self):
+        for number in range(3):
+            LinkService.create_link(f'https://example.com/{number}', user=self.user)
+        # A link created behind LinkService's back, and a counter gone wrong
+        Link.objects.using(get_shards()[0]).create(short_code='manual', original_url='https://example.com/m',
+                                                   user=self.admin)
+        User.objects.filter(pk=self.user.pk).update(link_count=10)
+
+        out = StringIO()
+        call_command('reconcile_link_counts', '--dry-run', stdout=out)
+        assert 'Checked 2 user(s), would fix 2 link count(s)' in out.getvalue()
+        assert link_count(self.user) == 10
+        call_command('reconcile_link_counts', '--batch-size', '1', stdout=StringIO())
+        assert (link_count(self.user), link_count(self.admin)) == (3, 1)
+
+    def test_me_shows_quota_usage(self, settings):
+        settings.LINK_QUOTAS = {**settings.LINK_QUOTAS, 'USER': 5}
+        LinkService.create_link('https://example.com/1', user=self.user)
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        response = self.client.get('/api/auth/me/')
+        assert response.status_code == 200
+        assert response.data['link_usage'] == {'count': 1, 'quota': 5, 'remaining': 4}
+
+        self.client.force_authenticate(user=self.admin)
+        assert self.client.get('/api/auth/me/').data['link_usage']['quota'] is None
@@ -0,0 +1,69 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from analytics.services import AnalyticsService
+from links import resolver_cache
+from links.services import LinkService
+from utils.db_router import unpin
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestResolverCache:
+    @pytest.fixture(autouse=True)
+    def enabled(self, settings):
+        settings.LINK_CACHE_SECONDS = 30
+
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.link = LinkService.create_link('https://example.com', user=self.user, custom_alias='mine')
+
+    def test_resolved_links_are_served_from_the_cache(self, django_assert_num_queries):
+        unpin()
+        LinkService.get_link_by_code(self.link.short_code)
+        with django_assert_num_queries(0):
+            assert LinkService.get_link_by_code(self.link.short_code) == self.link
+            assert LinkService.get_link_by_code('mine') == self.link
+
+    def test_updates_invalidate(self):
+        LinkService.get_link_by_code('mine')
+        LinkService.update_link(self.link, is_active=False)
+        assert resolver_cache.get('mine') is None
+        unpin()
+        assert LinkService.get_link_by_code('mine').is_active is False
+
+    def test_off_by_default(self, settings):
+        settings.LINK_CACHE_SECONDS = 0
+        LinkService.get_link_by_code(self.link.short_code)
+        assert resolver_cache.get(self.link.short_code) is None
+        assert resolver_cache.prewarm()['links'] == 0
+
+    def test_links_with_a_click_limit_are_not_cached(self):
+        limited = LinkService.create_link('https://example.com/limited', user=self.user, max_clicks=5)
+        LinkService.get_link_by_code(limited.short_code)
+        assert resolver_cache.get(limited.short_code) is None
+
+    def test_prewarm_loads_hottest_links_first(self):
+        cold = LinkService.create_link('https://example.com/cold', user=self.user)
+        for _ in range(3):
+            AnalyticsService.track_click(self.link)
+        AnalyticsService.track_click(cold)
+
+        result = resolver_cache.prewarm(limit=1, max_seconds=10, max_bytes=10 ** 6)
+        assert result['links'] == 1
+        assert resolver_cache.get(self.link.short_code) == self.link
+        assert resolver_cache.get(cold.short_code) is None
+        unpin()
+        resolved = LinkService.get_link_by_code(cold.short_code)
+        assert resolver_cache.get(self.link.short_code).get_deferred_fields() == resolved.get_deferred_fields()
+
+    def test_prewarm_respects_memory_budget(self):
+        AnalyticsService.track_click(self.link)
+        result = resolver_cache.prewarm(limit=10, max_seconds=10, max_bytes=10)
+        assert result == {'links': 0, 'bytes': 0, 'seconds': result['seconds'], 'stopped': 'memory'}
+
+    def test_command_reports(self, capsys):
+        AnalyticsService.track_click(self.link)
+        call_command('prewarm_link_cache')
+        assert 'Loaded 1 link(s)' in capsys.readouterr().out
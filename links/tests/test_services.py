@@ -1,6 +1,10 @@
 import pytest
+from django.contrib.auth import get_user_model
+from analytics.services import AnalyticsService
 from links.services import LinkService
 
+User = get_user_model()
+
 
 @pytest.mark.django_db
 class TestLinkService:
@@ -52,3 +56,47 @@ class TestLinkService:
         # Test not found
         not_found = LinkService.get_link_by_code('nonexistent')
         assert not_found is None
+
+    def test_get_link_by_code_loads_only_the_redirect_columns(self, settings):
+        settings.CLICK_MILESTONES = []
+        link = LinkService.create_link(original_url='https://example.com')
+        found = LinkService.get_link_by_code(link.short_code)
+        assert found.get_deferred_fields() == {'url_hash', 'note', 'last_clicked_at', 'created_at', 'updated_at'}
+
+        assert found.get_unavailable_reason() is None
+        AnalyticsService.track_click(found)
+        assert found.get_deferred_fields() == {'url_hash', 'note', 'last_clicked_at', 'created_at', 'updated_at'}
+        link.refresh_from_db()
+        assert link.click_count == 1
+
+    def test_get_or_create_link_reuses_existing(self):
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        link, created = LinkService.get_or_create_link('https://example.com/page', user=user, reuse_existing=True)
+        assert created
+        again, created = LinkService.get_or_create_link('HTTPS://EXAMPLE.com/page', user=user, reuse_existing=True)
+        assert not created
+        assert again.pk == link.pk
+
+        # Other owners, explicit aliases and opted-out calls get a new link
+        assert LinkService.get_or_create_link('https://example.com/page', reuse_existing=True)[1]
+        assert LinkService.get_or_create_link('https://example.com/page', user=user, custom_alias='page',
+                                              reuse_existing=True)[1]
+        assert LinkService.get_or_create_link('https://example.com/page', user=user)[1]
+
+    def test_reuse_needs_an_owner_and_no_note(self):
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        anonymous, _ = LinkService.get_or_create_link('https://example.com/page', reuse_existing=True)
+        # Another anonymous caller never gets that link (nor its stats) back
+        other, created = LinkService.get_or_create_link('https://example.com/page', reuse_existing=True)
+        assert created and other.pk != anonymous.pk
+
+        own, _ = LinkService.get_or_create_link('https://example.com/page', user=user, reuse_existing=True)
+        # A note would be dropped by reusing: a new link carries it
+        noted, created = LinkService.get_or_create_link('https://example.com/page', user=user, note='campaign',
+                                                        reuse_existing=True)
+        assert created and noted.pk != own.pk and noted.note == 'campaign'
+
+    def test_inactive_links_are_not_reused(self):
+        link = LinkService.create_link(original_url='https://example.com')
+        LinkService.update_link(link, is_active=False)
+        assert LinkService.find_existing_link('https://example.com', link.user) is None
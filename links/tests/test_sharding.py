@@ -0,0 +1,154 @@
+import pytest
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from analytics.models import ClickStats
+from analytics.services import AnalyticsService
+from links.models import Link
+from links.services import LinkService
+from links.sharding import ShardedQuerySet, SHARD_ID_BITS, copy_rows, shard_for_code, shard_for_id
+
+User = get_user_model()
+
+THREE_SHARDS = ['default', 'shard_1', 'shard_2']
+requires_shards = pytest.mark.skipif(
+    len(settings.LINK_SHARDS) < 2, reason='set LINK_SHARD_URLS to run against several databases'
+)
+
+
+class TestShardRouting:
+    @pytest.fixture(autouse=True)
+    def three_shards(self, settings):
+        settings.LINK_SHARDS = THREE_SHARDS
+
+    def test_code_maps_to_a_stable_shard(self):
+        shards = {shard_for_code(f'code{i}') for i in range(100)}
+        assert shards == set(THREE_SHARDS)
+        assert shard_for_code('abc123') == shard_for_code('abc123')
+
+    def test_id_encodes_shard(self):
+        assert shard_for_id(42) == 'default'
+        assert shard_for_id((1 << SHARD_ID_BITS) + 42) == 'shard_1'
+        assert shard_for_id((2 << SHARD_ID_BITS) + 1) == 'shard_2'
+        # Ids beyond the configured shards fall back to the default database
+        assert shard_for_id(7 << SHARD_ID_BITS) == 'default'
+
+    def test_short_code_can_be_drawn_for_a_shard(self):
+        with mock.patch('links.services.using') as using:
+            using.return_value.filter.return_value.exists.return_value = False
+            for target in THREE_SHARDS:
+                code = LinkService.generate_short_code(shard=target)
+                assert shard_for_code(code) == target
+
+
+@pytest.mark.django_db
+class TestShardedQuerySet:
+    def test_merges_querysets_in_order(self):
+        for i, code in enumerate(['a1', 'b1', 'a2', 'b2', 'a3']):
+            Link.objects.create(short_code=code, original_url=f'https://example.com/{i}')
+        first = Link.objects.filter(short_code__startswith='a').order_by('short_code')
+        second = Link.objects.filter(short_code__startswith='b').order_by('short_code')
+
+        merged = ShardedQuerySet([first, second])
+        assert merged.count() == 5
+        assert [link.short_code for link in merged] == ['a1', 'a2', 'a3', 'b1', 'b2']
+        assert [link.short_code for link in merged[1:3]] == ['a2', 'a3']
+        assert merged[4].short_code == 'b2'
+
+    def test_descending_ordering(self):
+        for code in ['a1', 'b1', 'a2', 'b2']:
+            Link.objects.create(short_code=code, original_url='https://example.com')
+        first = Link.objects.filter(short_code__startswith='a').order_by('-short_code')
+        second = Link.objects.filter(short_code__startswith='b').order_by('-short_code')
+        assert [link.short_code for link in ShardedQuerySet([first, second])[:3]] == ['b2', 'b1', 'a2']
+
+
+@requires_shards
+@pytest.mark.django_db(databases='__all__')
+class TestShardedStorage:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+
+    def test_links_land_on_their_code_shard(self):
+        links = [LinkService.create_link(original_url=f'https://example.com/{i}', user=self.user) for i in range(20)]
+        for link in links:
+            assert link._state.db == shard_for_code(link.short_code)
+            assert shard_for_id(link.pk) == link._state.db
+        assert len({link._state.db for link in links}) > 1
+
+    def test_alias_and_short_code_share_a_shard(self):
+        link = LinkService.create_link(original_url='https://example.com', custom_alias='mylink')
+        assert link._state.db == shard_for_code('mylink') == shard_for_code(link.short_code)
+        assert LinkService.get_link_by_code('mylink').pk == link.pk
+        assert LinkService.get_link_by_code(link.short_code).pk == link.pk
+        assert LinkService.is_alias_taken('mylink')
+
+    def test_clicks_follow_their_link(self):
+        link = LinkService.create_link(original_url='https://example.com')
+        click = AnalyticsService.track_click(link)
+        assert click._state.db == link._state.db
+        assert AnalyticsService.get_link_stats(link)['total_clicks'] == 1
+
+    def test_list_and_global_stats_fan_out(self):
+        for i in range(12):
+            link = LinkService.create_link(original_url=f'https://example.com/{i}', user=self.user)
+            AnalyticsService.track_click(link)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/links/list/', {'page_size': 100})
+        assert response.status_code == 200
+        assert response.data['count'] == 12
+        created = [item['created_at'] for item in response.data['results']]
+        assert created == sorted(created, reverse=True)
+
+        stats = AnalyticsService.get_global_stats()
+        assert stats['total_links'] == 12
+        assert stats['total_clicks'] == 12
+
+    def test_detail_routes_by_id(self):
+        link = LinkService.create_link(original_url='https://example.com', user=self.user)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(f'/api/links/{link.pk}/')
+        assert response.status_code == 200
+        assert response.data['short_code'] == link.short_code
+
+    def test_rebalance_moves_misplaced_links(self):
+        link = LinkService.create_link(original_url='https://example.com')
+        AnalyticsService.track_click(link)
+        home = link._state.db
+        other = next(alias for alias in settings.LINK_SHARDS if alias != home)
+
+        # Simulate a link left behind on the wrong shard
+        clicks = list(ClickStats.objects.using(home).filter(link_id=link.pk))
+        copy_rows([link], other)
+        copy_rows(clicks, other)
+        Link.objects.using(home).filter(pk=link.pk).delete()
+
+        call_command('rebalance_link_shards')
+
+        assert not Link.objects.using(other).filter(pk=link.pk).exists()
+        moved = Link.objects.using(home).get(pk=link.pk)
+        assert moved.created_at == link.created_at
+        assert ClickStats.objects.using(home).filter(link_id=link.pk).count() == 1
+
+    def test_links_created_after_a_move_stay_in_their_shard_range(self):
+        link = LinkService.create_link(original_url='https://example.com')
+        while link._state.db == 'default':
+            link = LinkService.create_link(original_url='https://example.com')
+        home, target = link._state.db, 'default'
+
+        # A link moved onto target keeps its larger id from home's range
+        copy_rows([link], target)
+        Link.objects.using(home).filter(pk=link.pk).delete()
+
+        created = LinkService.create_link(original_url='https://example.org')
+        while created._state.db != target:
+            created = LinkService.create_link(original_url='https://example.org')
+
+        assert shard_for_id(created.pk) == target
+        assert created.pk != link.pk
+        assert LinkService.get_link_by_id(created.pk).short_code == created.short_code
+        assert LinkService.get_link_by_id(link.pk).short_code == link.short_code
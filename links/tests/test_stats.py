@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from analytics.models import ClickStats
+from analytics.services import bucket_starts
+from links.services import LinkService
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestLinkStatsSeries:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.link = LinkService.create_link('https://example.com', user=self.user)
+
+    def click_at(self, *moments):
+        for moment in moments:
+            click = self.link.clicks.create()
+            ClickStats.objects.using(self.link._state.db).filter(pk=click.pk).update(clicked_at=moment)
+
+    def get(self, **params):
+        return self.client.get(f'/api/links/{self.link.pk}/stats/', params)
+
+    def test_daily_series_is_gap_filled(self):
+        self.click_at(datetime(2024, 1, 1, 10, tzinfo=timezone.utc), datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+                      datetime(2024, 1, 3, 9, tzinfo=timezone.utc))
+        response = self.get(start='2024-01-01', end='2024-01-05')
+        assert response.status_code == 200
+        assert [bucket['clicks'] for bucket in response.data['series']] == [2, 0, 1, 0]
+        assert response.data['series'][0]['start'] == '2024-01-01T00:00:00+00:00'
+        # The existing summary is still returned
+        assert response.data['total_clicks'] == 3
+
+    def test_buckets_follow_timezone(self):
+        # 23:30 UTC on Jan 1st is already Jan 2nd in Berlin
+        self.click_at(datetime(2024, 1, 1, 23, 30, tzinfo=timezone.utc))
+        response = self.get(start='2024-01-01', end='2024-01-03', tz='Europe/Berlin')
+        assert response.data['range']['tz'] == 'Europe/Berlin'
+        assert [(bucket['start'], bucket['clicks']) for bucket in response.data['series']] == [
+            ('2024-01-01T00:00:00+01:00', 0),
+            ('2024-01-02T00:00:00+01:00', 1),
+        ]
+
+    def test_hourly_and_monthly(self):
+        self.click_at(datetime(2024, 1, 1, 10, 15, tzinfo=timezone.utc), datetime(2024, 3, 5, tzinfo=timezone.utc))
+        hourly = self.get(start='2024-01-01T09:00:00Z', end='2024-01-01T12:00:00Z', granularity='hour')
+        assert [bucket['clicks'] for bucket in hourly.data['series']] == [0, 1, 0]
+        monthly = self.get(start='2024-01-01', end='2024-04-01', granularity='month')
+        assert [bucket['clicks'] for bucket in monthly.data['series']] == [1, 0, 1]
+
+    def test_bucket_cap_and_validation(self, settings):
+        settings.STATS_MAX_BUCKETS = 10
+        assert self.get(start='2024-01-01', end='2024-02-01').status_code == 400
+        assert self.get(start='2024-01-01', end='2024-02-01', granularity='week').status_code == 200
+        assert self.get(tz='Mars/Olympus').status_code == 400
+        assert self.get(start='2024-02-01', end='2024-01-01', granularity='week').status_code == 400
+        assert self.get(start='yesterday').status_code == 400
+
+
+class TestBucketStarts:
+    def test_dst_transitions(self):
+        zone = ZoneInfo('Europe/Berlin')
+        # The night clocks go forward has 23 local hours, and days stay aligned to local midnight
+        start = datetime(2024, 3, 31, tzinfo=zone)
+        end = datetime(2024, 4, 1, tzinfo=zone)
+        assert len(list(bucket_starts(start, end, 'hour', zone))) == 23
+        days = list(bucket_starts(start, datetime(2024, 4, 2, tzinfo=zone), 'day', zone))
+        assert [day.hour for day in days] == [0, 0]
+
+    def test_week_starts_on_monday(self):
+        zone = ZoneInfo('UTC')
+        weeks = list(bucket_starts(datetime(2024, 1, 3, tzinfo=zone), datetime(2024, 1, 10, tzinfo=zone), 'week', zone))
+        assert [week.date().isoformat() for week in weeks] == ['2024-01-01', '2024-01-08']
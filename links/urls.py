@@ -1,13 +1,17 @@
 from django.urls import path
 from .views import (
     LinkCreateView, LinkListView, LinkUpdateView,
-    LinkStatsView, LinkToggleActiveView, LinkCheckStatusView, RedirectLinkView,
-    UserLinksView
+    LinkStatsView, LinkToggleActiveView, LinkCheckStatusView, UserLinksView, LinkLookupView,
+    LinkBulkView, LinkBatchStatsView
 )
+from .redirect_views import RedirectLinkView
 
 api_urlpatterns = [
     path('', LinkCreateView.as_view(), name='link-create'),
     path('list/', LinkListView.as_view(), name='link-list'),
+    path('bulk/', LinkBulkView.as_view(), name='link-bulk'),
+    path('stats/batch/', LinkBatchStatsView.as_view(), name='link-batch-stats'),
+    path('lookup/', LinkLookupView.as_view(), name='link-lookup'),
     path('user/<int:user_id>/', UserLinksView.as_view(), name='user-links'),
     path('<int:pk>/', LinkUpdateView.as_view(), name='link-detail-update'),
     path('<int:pk>/stats/', LinkStatsView.as_view(), name='link-stats'),
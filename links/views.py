@@ -1,3 +1,8 @@
+import json
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
@@ -6,22 +11,29 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
 from .models import Link
-from .serializers import LinkSerializer, LinkCreateSerializer, LinkUpdateSerializer
-from .services import LinkService
+from .serializers import (
+    SCHEDULE_FIELDS, LinkSerializer, LinkCreateSerializer, LinkUpdateSerializer, LinkBulkSerializer,
+    LinkBatchStatsSerializer
+)
+from .services import LinkQuotaExceeded, LinkService
 from .filters import LinkFilter
+from .projections import LinkProjection
+from .sharding import ShardedListMixin, ShardedQuerySet, shard_querysets
+from analytics.serializers import LinkStatsQuerySerializer
 from analytics.services import AnalyticsService
-from .schemas import (
-    link_create_schema, link_list_schema, link_detail_schema,
-    link_update_schema, link_delete_schema, link_stats_schema,
-    link_toggle_active_schema, link_check_status_schema, user_links_schema, redirect_schema
-)
+from utils.conditional import make_etag, not_modified, with_validators
+from utils.projection import ProjectionListMixin, requested_fields
+from utils.renderers import NDJSONRenderer
+from utils.schema import LazySchemas
+
+schemas = LazySchemas('links.schemas')
 
 
 # Create a new short link (Guest, User, Admin)
 class LinkCreateView(APIView):
     permission_classes = [AllowAny]
 
-    @link_create_schema
+    @schemas.link_create_schema
     def post(self, request):
         serializer = LinkCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -33,18 +45,31 @@ class LinkCreateView(APIView):
         if note and (not user or user.role == 'Guest'):
             return Response({'error': 'You do not have permission to add notes'}, status=status.HTTP_403_FORBIDDEN)
 
-        link = LinkService.create_link(
-            original_url=serializer.validated_data['original_url'],
-            user=user,
-            custom_alias=serializer.validated_data.get('custom_alias'),
-            note=note
-        )
-        return Response(LinkSerializer(link).data, status=status.HTTP_201_CREATED)
+        reuse_existing = serializer.validated_data.get('reuse_existing')
+        if reuse_existing is None:
+            reuse_existing = bool(user and user.reuse_existing_links)
+        try:
+            link, created = LinkService.get_or_create_link(
+                original_url=serializer.validated_data['original_url'],
+                user=user,
+                custom_alias=serializer.validated_data.get('custom_alias'),
+                note=note,
+                reuse_existing=reuse_existing,
+                **{field: serializer.validated_data.get(field) for field in SCHEDULE_FIELDS}
+            )
+        except LinkQuotaExceeded as error:
+            return Response(
+                {'error': f'Link quota reached ({error.quota} links)', 'quota': error.quota},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        response_status = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response(LinkSerializer(link).data, status=response_status)
 
 
 # List links for the logged-in user (User, Admin)
-class LinkListView(ListAPIView):
+class LinkListView(ProjectionListMixin, ShardedListMixin, ListAPIView):
     serializer_class = LinkSerializer
+    projection_class = LinkProjection
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = LinkFilter
@@ -52,9 +77,15 @@ class LinkListView(ListAPIView):
     ordering_fields = ['created_at', 'updated_at', 'is_active']
     ordering = ['-created_at']
 
-    @link_list_schema
+    @schemas.link_list_schema
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        # Validated by aggregates over the filtered links instead of the page itself
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = make_etag(
+            request.user.pk, request.get_full_path(), request.accepted_renderer.format,
+            *LinkService.get_watermark(queryset)
+        )
+        return not_modified(request, etag) or with_validators(super().get(request, *args, **kwargs), etag)
 
     def get_queryset(self):
         user = self.request.user
@@ -66,15 +97,16 @@ class LinkListView(ListAPIView):
 
 
 # List links for a specific user (Admin only)
-class UserLinksView(ListAPIView):
+class UserLinksView(ProjectionListMixin, ShardedListMixin, ListAPIView):
     serializer_class = LinkSerializer
+    projection_class = LinkProjection
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = LinkFilter
     ordering_fields = ['created_at', 'updated_at', 'is_active']
     ordering = ['-created_at']
 
-    @user_links_schema
+    @schemas.user_links_schema
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
@@ -83,26 +115,91 @@ class UserLinksView(ListAPIView):
         return Link.objects.filter(user_id=user_id)
 
 
+# Short links pointing to a URL (User, Admin)
+class LinkLookupView(ProjectionListMixin, ShardedListMixin, ListAPIView):
+    serializer_class = LinkSerializer
+    projection_class = LinkProjection
+    permission_classes = [IsAuthenticated]
+    ordering = ['-created_at']
+
+    @schemas.link_lookup_schema
+    def get(self, request, *args, **kwargs):
+        if not request.query_params.get('url'):
+            return Response({'error': 'The url query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        links = LinkService.links_to_url(self.request.query_params['url']).order_by(*self.ordering)
+        # Admin sees every link to the URL, users only their own
+        if self.request.user.is_admin:
+            return links
+        return links.filter(user=self.request.user)
+
+
+# Bulk activate / deactivate / delete / reassign links (Admin only)
+class LinkBulkView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+    @schemas.link_bulk_schema
+    def post(self, request):
+        if not request.user.is_admin:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = LinkBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if 'ids' in data:
+            queryset = Link.objects.filter(pk__in=data['ids'])
+        elif data['all']:
+            queryset = Link.objects.all()
+        else:
+            link_filter = LinkFilter(data=data['filter'], queryset=Link.objects.all())
+            if not link_filter.is_valid():
+                return Response({'filter': link_filter.errors}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = link_filter.qs
+
+        progress = LinkService.bulk_update_links(
+            queryset, data['action'], owner=data.get('owner'),
+            chunk_size=settings.LINK_BULK_CHUNK_SIZE, dry_run=data['dry_run']
+        )
+
+        # Large jobs: one JSON line per chunk so clients can show progress
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            lines = (json.dumps(step) + '\n' for step in progress)
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+        *_, result = progress
+        return Response(result)
+
+
 # Retrieve, update, or delete a link (Owner or Admin)
 class LinkUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @link_detail_schema
+    @schemas.link_detail_schema
     def get(self, request, pk):
+        fields = requested_fields(request, LinkProjection.field_names())
+        # Only the columns of the requested fields, plus the ones the permission check and the ETag read
+        columns = fields and [*LinkProjection(fields).columns(), 'id', 'user', 'updated_at', 'click_count']
         try:
-            link = Link.objects.get(pk=pk)
+            link = LinkService.get_link_by_id(pk, fields=columns)
         except Link.DoesNotExist:
             return Response({'error': 'Link not found'}, status=status.HTTP_404_NOT_FOUND)
 
         if link.user != request.user and not request.user.is_admin:
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
-        return Response(LinkSerializer(link).data)
+        # Every field of the response changes updated_at or click_count, or is the owner's username
+        etag = make_etag(link.pk, link.updated_at, link.click_count, link.user and link.user.username,
+                         fields, request.accepted_renderer.format)
+        return not_modified(request, etag) or with_validators(Response(LinkSerializer(link, fields=fields).data), etag)
 
-    @link_update_schema
+    @schemas.link_update_schema
     def patch(self, request, pk):
         try:
-            link = Link.objects.get(pk=pk)
+            link = LinkService.get_link_by_id(pk)
         except Link.DoesNotExist:
             return Response({'error': 'Link not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -122,21 +219,22 @@ class LinkUpdateView(APIView):
             link=link,
             original_url=serializer.validated_data.get('original_url'),
             note=serializer.validated_data.get('note'),
-            is_active=serializer.validated_data.get('is_active')
+            is_active=serializer.validated_data.get('is_active'),
+            **{field: value for field, value in serializer.validated_data.items() if field in SCHEDULE_FIELDS}
         )
         return Response(LinkSerializer(link).data)
 
-    @link_delete_schema
+    @schemas.link_delete_schema
     def delete(self, request, pk):
         if not request.user.is_admin:
             return Response({'error': 'Only Admin can delete links'}, status=status.HTTP_403_FORBIDDEN)
 
         try:
-            link = Link.objects.get(pk=pk)
+            link = LinkService.get_link_by_id(pk)
         except Link.DoesNotExist:
             return Response({'error': 'Link not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        link.delete()
+        LinkService.delete_link(link)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -144,36 +242,108 @@ class LinkUpdateView(APIView):
 class LinkStatsView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @link_stats_schema
+    @schemas.link_stats_schema
     def get(self, request, pk):
         try:
-            link = Link.objects.get(pk=pk)
+            link = LinkService.get_link_by_id(pk)
         except Link.DoesNotExist:
             return Response({'error': 'Link not found'}, status=status.HTTP_404_NOT_FOUND)
 
         if link.user != request.user and not request.user.is_admin:
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
+        query = LinkStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        # The stats only change with new clicks, a new bucket in the range or a new day (last 30 days)
+        buckets = params['buckets']
+        etag = make_etag(
+            link.pk, link.click_count, buckets[0] if buckets else None, buckets[-1] if buckets else None,
+            params['granularity'], params['tz'].key, timezone.localdate(), request.accepted_renderer.format
+        )
+        response = not_modified(request, etag)
+        if response:
+            return response
+
         stats = AnalyticsService.get_link_stats(link)
-        return Response(stats)
+        stats['range'] = {
+            'start': params['start'].isoformat(),
+            'end': params['end'].isoformat(),
+            'granularity': params['granularity'],
+            'tz': params['tz'].key,
+        }
+        stats['series'] = AnalyticsService.get_link_series(
+            link, params['start'], params['end'], params['granularity'], params['tz'], buckets=params['buckets']
+        )
+        return with_validators(Response(stats), etag)
+
+
+# Statistics for many links at once (Owner or Admin)
+class LinkBatchStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @schemas.link_batch_stats_schema
+    def post(self, request):
+        serializer = LinkBatchStatsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        query = LinkStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        # Ownership is part of the query: links of other users are reported as missing
+        links = Link.objects.all() if request.user.is_admin else Link.objects.filter(user=request.user)
+        ids = serializer.validated_data.get('ids')
+        limit = settings.STATS_BATCH_MAX_LINKS
+        if ids is not None:
+            links = links.filter(pk__in=ids)
+        else:
+            link_filter = LinkFilter(data=serializer.validated_data['filter'], queryset=links)
+            if not link_filter.is_valid():
+                return Response({'filter': link_filter.errors}, status=status.HTTP_400_BAD_REQUEST)
+            links = link_filter.qs.order_by('-created_at')
+        # created_at is loaded because the per-shard results are merged on it
+        links = links.only('id', 'short_code', 'click_count', 'created_at')
+        links = list(ShardedQuerySet(shard_querysets(links))[:limit + 1])
+        truncated = len(links) > limit
+        links = links[:limit]
+
+        counts = AnalyticsService.get_series_counts(
+            links, params['start'], params['end'], params['granularity'], params['tz'], params['buckets']
+        )
+        found = {link.pk for link in links}
+        return Response({
+            'range': {
+                'start': params['start'].isoformat(),
+                'end': params['end'].isoformat(),
+                'granularity': params['granularity'],
+                'tz': params['tz'].key,
+            },
+            'buckets': [bucket.isoformat() for bucket in params['buckets']],
+            'links': {
+                str(link.pk): {'short_code': link.short_code, 'total_clicks': link.click_count, 'series': counts[link.pk]}
+                for link in links
+            },
+            'missing': [pk for pk in ids if pk not in found] if ids is not None else [],
+            'truncated': truncated,
+        })
 
 
 # Toggle link active status (Admin only)
 class LinkToggleActiveView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @link_toggle_active_schema
+    @schemas.link_toggle_active_schema
     def post(self, request, pk):
         if not request.user.is_admin:
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
         try:
-            link = Link.objects.get(pk=pk)
+            link = LinkService.get_link_by_id(pk)
         except Link.DoesNotExist:
             return Response({'error': 'Link not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        link.is_active = not link.is_active
-        link.save()
+        link = LinkService.update_link(link, is_active=not link.is_active)
         return Response(LinkSerializer(link).data)
 
 
@@ -181,29 +351,17 @@ class LinkToggleActiveView(APIView):
 class LinkCheckStatusView(APIView):
     permission_classes = [AllowAny]
 
-    @link_check_status_schema
+    @schemas.link_check_status_schema
     def get(self, request, pk):
         try:
-            link = Link.objects.get(pk=pk)
+            link = LinkService.get_link_by_id(pk)
         except Link.DoesNotExist:
             return Response({'error': 'Link not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        return Response({'short_code': link.short_url, 'is_active': link.is_active})
-
-
-# Redirect / get original URL for short code
-class RedirectLinkView(APIView):
-    permission_classes = [AllowAny]
-
-    @redirect_schema
-    def get(self, request, code):
-        link = LinkService.get_link_by_code(code)
-
-        if not link:
-            return Response({'error': 'Link not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        if not link.is_active:
-            return Response({'error': 'Link is inactive'}, status=status.HTTP_410_GONE)
-
-        AnalyticsService.track_click(link=link)
-        return Response({'short_code': link.short_url, 'original_url': link.original_url, 'is_active': link.is_active})
+        # Public and derived from the link row only: updated_at is an exact Last-Modified
+        etag = make_etag(link.pk, link.short_url, link.is_active, request.accepted_renderer.format)
+        response = not_modified(request, etag, link.updated_at)
+        if response:
+            return response
+        response = Response({'short_code': link.short_url, 'is_active': link.is_active})
+        return with_validators(response, etag, link.updated_at)
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import JobLease, JobRun
+
+
+@admin.register(JobLease)
+class JobLeaseAdmin(admin.ModelAdmin):
+    list_display = ['name', 'next_run_at', 'holder', 'lease_expires_at']
+    readonly_fields = ['name', 'holder', 'lease_expires_at']
+
+
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = ['job', 'status', 'started_at', 'duration', 'node']
+    list_filter = ['status', 'job']
+    readonly_fields = ['job', 'node', 'status', 'started_at', 'finished_at', 'duration', 'output', 'error']
+    list_per_page = 50
+    ordering = ['-started_at']
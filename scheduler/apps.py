@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class SchedulerConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'scheduler'
+
+    def ready(self):
+        # Every app registers its periodic jobs in a jobs.py module, like admin.py for the admin
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('jobs')
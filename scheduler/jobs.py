@@ -0,0 +1,8 @@
+from datetime import timedelta
+from scheduler.registry import job
+from scheduler.services import SchedulerService
+
+
+@job(every=timedelta(days=1))
+def prune_job_runs():
+    return f'Deleted {SchedulerService.prune_runs()} run(s)'
@@ -0,0 +1,64 @@
+import random
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from scheduler.registry import JOBS
+from scheduler.services import SchedulerService, node_name
+
+
+class Command(BaseCommand):
+    help = 'Run the periodic jobs registered in the apps\' jobs.py; any number of nodes can run it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.SCHEDULER_TICK_SECONDS,
+                            help='Seconds between checks for due jobs')
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due now, then exit')
+        parser.add_argument('--run', action='append', choices=sorted(JOBS),
+                            help='Run this job now, due or not, unless another node is running it (repeatable)')
+        parser.add_argument('--list', action='store_true', help='Show the jobs, their schedule and run history')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            return self.list_jobs()
+        node = node_name()
+        if options['run']:
+            return self.run_now(options['run'], node)
+
+        self.stdout.write(f"Scheduler {node}: {len(JOBS)} job(s) registered")
+        # Nodes started together (a deploy) check at different moments
+        time.sleep(random.uniform(0, options['interval']))
+        while True:
+            # Long-lived process: drop connections the database closed or that outlived CONN_MAX_AGE
+            close_old_connections()
+            for run in SchedulerService.run_due_jobs(node):
+                self.report(run)
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def run_now(self, names, node):
+        SchedulerService.sync_leases([JOBS[name] for name in names])
+        for name in names:
+            if not SchedulerService.claim(JOBS[name], node, force=True):
+                raise CommandError(f'{name} is running on another node')
+            self.report(SchedulerService.run(JOBS[name], node))
+
+    def report(self, run):
+        if run.status == run.SUCCEEDED:
+            self.stdout.write(self.style.SUCCESS(f'{run.job}: {run.duration:.2f}s {run.output}'.rstrip()))
+        else:
+            self.stderr.write(f'{run.job}: failed after {run.duration:.2f}s\n{run.error}')
+
+    def list_jobs(self):
+        for stats in SchedulerService.job_stats():
+            mean, peak = stats['mean_duration'], stats['max_duration']
+            durations = f'mean {mean:.2f}s, max {peak:.2f}s' if mean is not None else 'no runs'
+            state = f"running on {stats['holder']}" if stats['holder'] else f"next {stats['next_run_at'] or 'on start'}"
+            self.stdout.write(self.style.MIGRATE_HEADING(stats['name']) + (
+                '' if stats['enabled'] else ' (disabled)'
+            ))
+            self.stdout.write(
+                f"  every {stats['every']}, {state}; {stats['runs']} run(s), {stats['failures']} failed, "
+                f"last {stats['last_status'] or '-'}; {durations}"
+            )
@@ -0,0 +1,53 @@
+from django.db import models
+
+
+class JobLease(models.Model):
+    """
+    One row per registered job, shared by every run_scheduler node: when the
+    job is next due and which node holds it until when. A node runs a job only
+    after taking the lease with a conditional UPDATE, so one node runs it at a time.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    next_run_at = models.DateTimeField()
+    holder = models.CharField(max_length=255, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        db_table = 'scheduler_leases'
+        ordering = ['name']
+
+
+class JobRun(models.Model):
+    """One run of a job: RUNNING until it returns, or for good if its node died."""
+    RUNNING = 'RUNNING'
+    SUCCEEDED = 'SUCCEEDED'
+    FAILED = 'FAILED'
+
+    STATUS_CHOICES = [
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    job = models.CharField(max_length=100)
+    node = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=RUNNING)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Seconds, measured with a monotonic clock
+    duration = models.FloatField(null=True, blank=True)
+    output = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.job} at {self.started_at}"
+
+    class Meta:
+        db_table = 'scheduler_runs'
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['job', '-started_at']),
+        ]
@@ -0,0 +1,31 @@
+"""
+Periodic jobs, registered from each app's jobs.py:
+
+    @job(every=timedelta(minutes=5))
+    def sweep_expired_links():
+        ...
+
+A job is named `<app>.<function>`. It runs every `every`, plus a random delay
+of up to `jitter` seconds (default a tenth of the interval, at most a minute)
+so jobs with the same interval do not all start together. `timeout` is how
+long a node holds the job's lease (default SCHEDULER_LEASE_SECONDS): a job
+still running after that may be started again by another node. `enabled`, a
+callable, skips the job while it returns False. The job's return value, if
+any, is kept as the run's output.
+"""
+JOBS = {}
+
+
+def job(every, name=None, jitter=None, timeout=None, enabled=None):
+    def register(func):
+        job_name = name or f"{func.__module__.split('.')[0]}.{func.__name__}"
+        JOBS[job_name] = {
+            'name': job_name,
+            'func': func,
+            'every': every,
+            'jitter': min(every.total_seconds() / 10, 60) if jitter is None else jitter,
+            'timeout': timeout,
+            'enabled': enabled,
+        }
+        return func
+    return register
@@ -0,0 +1,147 @@
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+from .models import JobLease, JobRun
+from .registry import JOBS
+
+
+def node_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def active_jobs():
+    """Registered jobs that are not disabled (SCHEDULER_DISABLED_JOBS or their `enabled` callable)."""
+    return [
+        spec for name, spec in sorted(JOBS.items())
+        if name not in settings.SCHEDULER_DISABLED_JOBS and (spec['enabled'] is None or spec['enabled']())
+    ]
+
+
+class SchedulerService:
+    @staticmethod
+    def leases():
+        # Explicit alias: leases are read and taken on the primary, never a replica
+        return JobLease.objects.using(DEFAULT_DB_ALIAS)
+
+    @staticmethod
+    def sync_leases(jobs, now=None):
+        """Create the lease row of jobs seen for the first time, due within their jitter."""
+        now = now or timezone.now()
+        SchedulerService.leases().bulk_create(
+            [JobLease(name=spec['name'], next_run_at=now + timedelta(seconds=random.uniform(0, spec['jitter'])))
+             for spec in jobs],
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def claim(spec, node, now=None, force=False):
+        """
+        Take the job's lease if it is due (or `force`) and no other node holds
+        it. One UPDATE checks and takes it, so concurrent nodes cannot both win.
+        """
+        now = now or timezone.now()
+        timeout = spec['timeout'] or settings.SCHEDULER_LEASE_SECONDS
+        free = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+        leases = SchedulerService.leases().filter(free, name=spec['name'])
+        if not force:
+            leases = leases.filter(next_run_at__lte=now)
+        return leases.update(holder=node, lease_expires_at=now + timedelta(seconds=timeout)) == 1
+
+    @staticmethod
+    def hold(name, node, seconds, now=None):
+        """
+        Take or renew the lease `name` for a long-running process that must run
+        once in the cluster (not a registered job). Returns False while another
+        node holds it; a holder that stops renewing loses it after `seconds`.
+        """
+        now = now or timezone.now()
+        SchedulerService.leases().bulk_create([JobLease(name=name, next_run_at=now)], ignore_conflicts=True)
+        free = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now) | Q(holder=node)
+        return SchedulerService.leases().filter(free, name=name).update(
+            holder=node, lease_expires_at=now + timedelta(seconds=seconds)
+        ) == 1
+
+    @staticmethod
+    def release(name, node):
+        SchedulerService.leases().filter(name=name, holder=node).update(holder='', lease_expires_at=None)
+
+    @staticmethod
+    def run(spec, node):
+        """Run a job whose lease `node` holds, record the run, release the lease and schedule the next run."""
+        run = JobRun.objects.using(DEFAULT_DB_ALIAS).create(job=spec['name'], node=node, started_at=timezone.now())
+        started = time.monotonic()
+        try:
+            output = spec['func']()
+        except Exception:
+            run.status, run.error = JobRun.FAILED, traceback.format_exc()
+        else:
+            run.status, run.output = JobRun.SUCCEEDED, '' if output is None else str(output)
+        run.duration = time.monotonic() - started
+        run.finished_at = timezone.now()
+        run.save(update_fields=['status', 'output', 'error', 'duration', 'finished_at'])
+
+        # Fixed rate from the start of this run, but never due again before it finished
+        next_run_at = max(run.started_at + spec['every'], run.finished_at)
+        next_run_at += timedelta(seconds=random.uniform(0, spec['jitter']))
+        SchedulerService.leases().filter(name=spec['name'], holder=node).update(
+            holder='', lease_expires_at=None, next_run_at=next_run_at
+        )
+        return run
+
+    @staticmethod
+    def run_due_jobs(node, now=None):
+        """Run every due job this node can take, one after the other. Returns their JobRuns."""
+        jobs = active_jobs()
+        SchedulerService.sync_leases(jobs, now)
+        return [SchedulerService.run(spec, node) for spec in jobs if SchedulerService.claim(spec, node, now)]
+
+    @staticmethod
+    def job_stats():
+        """Per registered job: lease state, run and failure counts, and durations over the kept history."""
+        runs = {
+            row['job']: row
+            for row in JobRun.objects.using(DEFAULT_DB_ALIAS).order_by().values('job').annotate(
+                runs=Count('id'),
+                failures=Count('id', filter=Q(status=JobRun.FAILED)),
+                mean_duration=Avg('duration'),
+                max_duration=Max('duration'),
+                last_started_at=Max('started_at'),
+            )
+        }
+        leases = {lease.name: lease for lease in SchedulerService.leases()}
+        enabled = {spec['name'] for spec in active_jobs()}
+        stats = []
+        for name in sorted(JOBS):
+            row = runs.get(name, {})
+            lease = leases.get(name)
+            last = JobRun.objects.using(DEFAULT_DB_ALIAS).filter(job=name).first()
+            stats.append({
+                'name': name,
+                'every': JOBS[name]['every'],
+                'enabled': name in enabled,
+                'next_run_at': lease.next_run_at if lease else None,
+                'holder': lease.holder if lease else '',
+                'runs': row.get('runs', 0),
+                'failures': row.get('failures', 0),
+                'mean_duration': row.get('mean_duration'),
+                'max_duration': row.get('max_duration'),
+                'last_status': last.status if last else None,
+                'last_duration': last.duration if last else None,
+                'last_started_at': row.get('last_started_at'),
+            })
+        return stats
+
+    @staticmethod
+    def prune_runs(days=None):
+        """Delete the run history older than `days` (default SCHEDULER_HISTORY_DAYS). Returns the rows deleted."""
+        days = settings.SCHEDULER_HISTORY_DAYS if days is None else days
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = JobRun.objects.using(DEFAULT_DB_ALIAS).filter(started_at__lt=cutoff).delete()
+        return deleted
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from io import StringIO
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from scheduler import registry, services
+from scheduler.models import JobLease, JobRun
+from scheduler.registry import JOBS
+from scheduler.services import SchedulerService
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    """Replace the registered jobs with test jobs that record their calls in `jobs.calls`."""
+    registered = {}
+    monkeypatch.setattr(registry, 'JOBS', registered)
+    monkeypatch.setattr(services, 'JOBS', registered)
+    calls = []
+
+    def register(name, every=timedelta(minutes=1), fail=False, **options):
+        def func():
+            calls.append(name)
+            if fail:
+                raise RuntimeError('boom')
+            return f'{name} done'
+        registry.job(every, name=name, jitter=0, **options)(func)
+        return registered[name]
+
+    register.calls = calls
+    return register
+
+
+@pytest.mark.django_db
+class TestScheduler:
+    def test_jobs_are_discovered_in_every_app(self):
+        assert {'links.sweep_expired_links', 'scheduler.prune_job_runs'} <= set(JOBS)
+        assert JOBS['links.sweep_expired_links']['jitter'] == 30
+
+    def test_due_job_runs_once_and_is_rescheduled(self, jobs):
+        spec = jobs('app.cleanup', every=timedelta(minutes=10))
+        now = timezone.now()
+        SchedulerService.sync_leases([spec], now)
+
+        runs = SchedulerService.run_due_jobs('node-a')
+        assert jobs.calls == ['app.cleanup']
+        run = JobRun.objects.get()
+        assert runs == [run]
+        assert run.status == JobRun.SUCCEEDED and run.output == 'app.cleanup done' and run.node == 'node-a'
+        assert run.duration >= 0 and run.finished_at >= run.started_at
+        lease = JobLease.objects.get(name='app.cleanup')
+        assert lease.holder == '' and lease.lease_expires_at is None
+        assert lease.next_run_at == run.started_at + timedelta(minutes=10)
+
+        # Not due again on this node or another one
+        assert SchedulerService.run_due_jobs('node-a') == []
+        assert SchedulerService.run_due_jobs('node-b') == []
+        assert jobs.calls == ['app.cleanup']
+
+    def test_only_one_node_holds_a_lease_until_it_expires(self, jobs):
+        spec = jobs('app.cleanup', timeout=60)
+        now = timezone.now()
+        SchedulerService.sync_leases([spec], now)
+
+        assert SchedulerService.claim(spec, 'node-a', now)
+        assert not SchedulerService.claim(spec, 'node-b', now)
+        assert not SchedulerService.claim(spec, 'node-b', now, force=True)
+        # A node that died while holding the lease loses it when it expires
+        assert SchedulerService.claim(spec, 'node-b', now + timedelta(seconds=61))
+        assert JobLease.objects.get().holder == 'node-b'
+
+    def test_failed_run_is_recorded_and_rescheduled(self, jobs):
+        spec = jobs('app.broken', fail=True)
+        SchedulerService.sync_leases([spec])
+
+        [run] = SchedulerService.run_due_jobs('node-a')
+        assert run.status == JobRun.FAILED and 'RuntimeError: boom' in run.error
+        assert JobLease.objects.get().next_run_at > timezone.now()
+
+    def test_disabled_jobs_do_not_run(self, jobs, settings):
+        jobs('app.off')
+        jobs('app.conditional', enabled=lambda: False)
+        jobs('app.on')
+        settings.SCHEDULER_DISABLED_JOBS = ['app.off']
+        SchedulerService.run_due_jobs('node-a', timezone.now() + timedelta(minutes=1))
+
+        assert jobs.calls == ['app.on']
+        assert list(JobLease.objects.values_list('name', flat=True)) == ['app.on']
+
+    def test_stats_and_pruning(self, jobs):
+        spec = jobs('app.cleanup')
+        SchedulerService.sync_leases([spec])
+        for _ in range(3):
+            SchedulerService.claim(spec, 'node-a', force=True)
+            SchedulerService.run(spec, 'node-a')
+        JobRun.objects.filter(pk=JobRun.objects.order_by('id').first().pk).update(
+            started_at=timezone.now() - timedelta(days=31)
+        )
+
+        [stats] = SchedulerService.job_stats()
+        assert stats['runs'] == 3 and stats['failures'] == 0 and stats['last_status'] == JobRun.SUCCEEDED
+        assert stats['max_duration'] >= stats['mean_duration'] >= 0
+        assert SchedulerService.prune_runs(30) == 1
+        assert JobRun.objects.count() == 2
+
+    def test_run_scheduler_command(self):
+        out = StringIO()
+        call_command('run_scheduler', '--run', 'links.sweep_expired_links', stdout=out)
+        assert 'links.sweep_expired_links' in out.getvalue() and 'Deactivated 0 link(s)' in out.getvalue()
+        assert JobRun.objects.get().status == JobRun.SUCCEEDED
+
+        out = StringIO()
+        call_command('run_scheduler', '--list', stdout=out)
+        assert '1 run(s), 0 failed, last SUCCEEDED' in out.getvalue()
+        assert 'scheduler.prune_job_runs' in out.getvalue()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Compare worker boot time and memory of the settings profiles.
+
+Each profile is booted in a fresh interpreter the way a gunicorn worker boots:
+import the WSGI application (django.setup() + middleware) and load the URLconf
+by resolving a redirect URL. Reported figures are the median of --runs boots.
+
+    python scripts/measure_boot.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PROFILES = ['config.settings', 'config.settings_redirect']
+
+BOOT = '''
+import json, resource, sys, time
+start = time.perf_counter()
+from config.wsgi import application
+from django.urls import get_resolver
+get_resolver().resolve('/api/links/abc123/')
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'boot_ms': elapsed * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+def boot(profile):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+    output = subprocess.run(
+        [sys.executable, '-c', BOOT], cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'profile':<28}{'boot (ms)':>12}{'max RSS (MB)':>15}{'modules':>10}")
+    for profile in PROFILES:
+        runs = [boot(profile) for _ in range(args.runs)]
+        print('{:<28}{:>12.0f}{:>15.1f}{:>10}'.format(
+            profile,
+            statistics.median(run['boot_ms'] for run in runs),
+            statistics.median(run['rss_mb'] for run in runs),
+            int(statistics.median(run['modules'] for run in runs)),
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,30 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from utils.admin import ScalableAdminMixin
 from .models import User
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ScalableAdminMixin, BaseUserAdmin):
     # Displayed fields in list view
-    list_display = ['username', 'email', 'role', 'is_active', 'link_count', 'created_at']
+    list_display = [
+        'username', 'email', 'role', 'is_active', 'link_count', 'click_count', 'last_clicked_at', 'created_at'
+    ]
     list_filter = ['role', 'is_active', 'is_staff', 'created_at']
     search_fields = ['username', 'email', 'first_name', 'last_name']
-    ordering = ['-created_at']
+    ordering = ['-id']
     list_per_page = 25
 
     # Customize field layout
     fieldsets = BaseUserAdmin.fieldsets + (
         ('Role & Permissions', {'fields': ('role',)}),
+        ('Links', {'fields': ('link_count', 'link_quota', 'active_link_count', 'click_count', 'last_clicked_at')}),
         ('Important Dates', {'fields': ('created_at',)}),
     )
     add_fieldsets = BaseUserAdmin.add_fieldsets + (
         ('Role & Permissions', {'fields': ('role',)}),
     )
 
-    readonly_fields = ['created_at']
-
-    # Count number of links created by user
-    def link_count(self, obj):
-        from links.models import Link
-        return Link.objects.filter(user=obj).count()
-
-    link_count.short_description = 'Links'
+    # link_count is the maintained counter (reconcile_link_counts repairs it), not a count per row; the
+    # other metrics are rolled up by refresh_user_link_metrics
+    readonly_fields = ['link_count', 'active_link_count', 'click_count', 'last_clicked_at', 'created_at']
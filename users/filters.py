@@ -0,0 +1,41 @@
+import django_filters
+from django.db.models import F
+from rest_framework.filters import OrderingFilter
+from .models import User
+
+
+class UserFilter(django_filters.FilterSet):
+    # Ranges over the link metrics, each served by its column's index
+    min_links = django_filters.NumberFilter(field_name='link_count', lookup_expr='gte')
+    max_links = django_filters.NumberFilter(field_name='link_count', lookup_expr='lte')
+    min_active_links = django_filters.NumberFilter(field_name='active_link_count', lookup_expr='gte')
+    min_clicks = django_filters.NumberFilter(field_name='click_count', lookup_expr='gte')
+    max_clicks = django_filters.NumberFilter(field_name='click_count', lookup_expr='lte')
+    clicked_after = django_filters.DateTimeFilter(field_name='last_clicked_at', lookup_expr='gte')
+    clicked_before = django_filters.DateTimeFilter(field_name='last_clicked_at', lookup_expr='lte')
+
+    class Meta:
+        model = User
+        fields = ['is_active', 'role']
+
+
+class UserOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that sorts users who never had a click (no
+    last_clicked_at) as the least recent on every database, the order of the
+    users_last_clicked_at index.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering:
+            return queryset.order_by(*[self.order_by(term) for term in ordering])
+        return queryset
+
+    @staticmethod
+    def order_by(term):
+        if term.lstrip('-') != 'last_clicked_at':
+            return term
+        if term.startswith('-'):
+            return F('last_clicked_at').desc(nulls_last=True)
+        return F('last_clicked_at').asc(nulls_first=True)
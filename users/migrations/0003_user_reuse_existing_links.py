@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_remove_role_permissions_alter_user_role_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='reuse_existing_links',
+            field=models.BooleanField(default=False, help_text='Return an existing link to the same URL instead of creating a new one'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:59
+
+from collections import Counter
+from django.db import connections, migrations, models
+
+
+def backfill_link_count(apps, schema_editor):
+    from links.sharding import get_shards
+
+    Link = apps.get_model('links', 'Link')
+    User = apps.get_model('users', 'User')
+    counts = Counter()
+    for alias in get_shards():
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            # A shard not migrated yet holds no links
+            if Link._meta.db_table not in connection.introspection.table_names(cursor):
+                continue
+        counts.update(dict(
+            Link.objects.using(alias).filter(user__isnull=False)
+            .order_by().values_list('user_id').annotate(count=models.Count('id'))
+        ))
+    users = User.objects.using(schema_editor.connection.alias)
+    users.bulk_update([User(pk=pk, link_count=count) for pk, count in counts.items()], ['link_count'],
+                      batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_reuse_existing_links'),
+        ('links', '0002_link_user_without_db_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='link_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='link_quota',
+            field=models.PositiveIntegerField(blank=True, help_text='Most links this user may own (empty: the default of the role)', null=True),
+        ),
+        migrations.RunPython(backfill_link_count, migrations.RunPython.noop),
+    ]
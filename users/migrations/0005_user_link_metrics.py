@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:22
+
+import users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0004_user_link_quota'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='active_link_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='click_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_clicked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['link_count'], name='users_link_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['active_link_count'], name='users_active_link_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['click_count'], name='users_click_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=users.models.NullsFirstIndex(fields=['last_clicked_at'], name='users_last_clicked_at_idx'),
+        ),
+    ]
@@ -1,5 +1,22 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import F
+
+
+class NullsFirstIndex(models.Index):
+    """
+    Index on one nullable column that sorts NULLs first on every database.
+    SQLite always does (and refuses NULLS FIRST in an index); PostgreSQL puts
+    them last unless told, and could then not serve an ORDER BY that treats
+    NULL as the smallest value in both directions.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor == 'postgresql':
+            index = models.Index(F(self.fields[0]).asc(nulls_first=True), name=self.name, condition=self.condition)
+            return index.create_sql(model, schema_editor, using, **kwargs)
+        return super().create_sql(model, schema_editor, using, **kwargs)
 
 
 class User(AbstractUser):
@@ -15,18 +32,48 @@ class User(AbstractUser):
         (ADMIN, 'Admin'),
     ]
 
+    LINK_METRICS = ('link_count', 'active_link_count', 'click_count', 'last_clicked_at')
+
     role = models.CharField(
         max_length=10,
         choices=ROLE_CHOICES,
         default=USER,
         help_text='Defines access level for the user'
     )
+    reuse_existing_links = models.BooleanField(
+        default=False,
+        help_text='Return an existing link to the same URL instead of creating a new one'
+    )
+    # Most links this user may own; None uses the role's LINK_QUOTAS entry
+    link_quota = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text='Most links this user may own (empty: the default of the role)'
+    )
+    # Denormalized number of links owned, maintained by LinkService; reconcile_link_counts repairs it
+    link_count = models.PositiveIntegerField(default=0, editable=False)
+    # Rolled up from the links by refresh_user_link_metrics every USER_METRICS_REFRESH_MINUTES, for the user list
+    active_link_count = models.PositiveIntegerField(default=0, editable=False)
+    click_count = models.PositiveBigIntegerField(default=0, editable=False)
+    last_clicked_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            # The link counters and metrics are only written by their services; never write back a stale copy
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.LINK_METRICS]
+        super().save(*args, **kwargs)
+
+    def get_link_quota(self):
+        """Most links this user may own, or None for no limit."""
+        if self.link_quota is not None:
+            return self.link_quota
+        return settings.LINK_QUOTAS.get(self.role)
+
     @property
     def is_admin(self):
         return self.role == self.ADMIN
@@ -53,3 +100,10 @@ class User(AbstractUser):
     class Meta:
         db_table = 'users'
         ordering = ['-created_at']
+        # The user list sorts and filters on the link metrics
+        indexes = [
+            models.Index(fields=['link_count'], name='users_link_count_idx'),
+            models.Index(fields=['active_link_count'], name='users_active_link_count_idx'),
+            models.Index(fields=['click_count'], name='users_click_count_idx'),
+            NullsFirstIndex(fields=['last_clicked_at'], name='users_last_clicked_at_idx'),
+        ]
@@ -0,0 +1,10 @@
+from utils.projection import Projection
+from .serializers import UserMetricsSerializer, UserSerializer
+
+
+class UserProjection(Projection):
+    serializer_class = UserSerializer
+
+
+class UserMetricsProjection(Projection):
+    serializer_class = UserMetricsSerializer
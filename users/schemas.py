@@ -1,7 +1,7 @@
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 from .serializers import (
-    UserSerializer, UserRegistrationSerializer, UserLoginSerializer,
+    UserSerializer, UserMeSerializer, UserMetricsSerializer, UserRegistrationSerializer, UserLoginSerializer,
     UserUpdateSerializer
 )
 
@@ -84,9 +84,10 @@ user_login_schema = extend_schema(
 user_me_schema = extend_schema(
     tags=['Users'],
     summary='Get current user',
-    description='Retrieve the currently authenticated user\'s information.',
+    description='Retrieve the currently authenticated user\'s information, with their link quota usage '
+                '(`link_usage`: links owned, quota and remaining; a null quota means no limit).',
     responses={
-        200: OpenApiResponse(response=UserSerializer, description='Current user information'),
+        200: OpenApiResponse(response=UserMeSerializer, description='Current user information'),
         401: OpenApiResponse(description='Authentication required')
     }
 )
@@ -94,7 +95,11 @@ user_me_schema = extend_schema(
 user_list_schema = extend_schema(
     tags=['Users'],
     summary='List all users',
-    description='Retrieve a list of all users. Admin permission required.',
+    description=(
+        'Retrieve a list of all users. Admin permission required. With metrics=true each user also has '
+        'link_count, active_link_count, click_count and last_clicked_at. link_count is live; the others are '
+        'rolled up from the links every USER_METRICS_REFRESH_MINUTES. All four can be sorted and filtered on.'
+    ),
     parameters=[
         OpenApiParameter(
             name='is_active',
@@ -108,6 +113,54 @@ user_list_schema = extend_schema(
             location=OpenApiParameter.QUERY,
             description='Filter by role (GUEST, USER, ADMIN)'
         ),
+        OpenApiParameter(
+            name='metrics',
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY,
+            description='Include the link metrics of each user'
+        ),
+        OpenApiParameter(
+            name='min_links',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description='Users owning at least this many links'
+        ),
+        OpenApiParameter(
+            name='max_links',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description='Users owning at most this many links'
+        ),
+        OpenApiParameter(
+            name='min_active_links',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description='Users with at least this many active links'
+        ),
+        OpenApiParameter(
+            name='min_clicks',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description='Users whose links have at least this many clicks in total'
+        ),
+        OpenApiParameter(
+            name='max_clicks',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description='Users whose links have at most this many clicks in total'
+        ),
+        OpenApiParameter(
+            name='clicked_after',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Users whose last click is at or after this time'
+        ),
+        OpenApiParameter(
+            name='clicked_before',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Users whose last click is at or before this time'
+        ),
         OpenApiParameter(
             name='search',
             type=OpenApiTypes.STR,
@@ -118,7 +171,10 @@ user_list_schema = extend_schema(
             name='ordering',
             type=OpenApiTypes.STR,
             location=OpenApiParameter.QUERY,
-            description='Order by field (username, email, created_at). Use - for descending.'
+            description=(
+                'Order by field (username, email, created_at, link_count, active_link_count, click_count, '
+                'last_clicked_at). Use - for descending. Users without clicks sort as the least recent.'
+            )
         ),
         OpenApiParameter(
             name='page',
@@ -134,7 +190,10 @@ user_list_schema = extend_schema(
         )
     ],
     responses={
-        200: OpenApiResponse(response=UserSerializer(many=True), description='List of users'),
+        200: OpenApiResponse(
+            response=UserMetricsSerializer(many=True),
+            description='List of users (the link metrics only with metrics=true)'
+        ),
         403: OpenApiResponse(description='Permission denied')
     }
 )
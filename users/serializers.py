@@ -6,10 +6,36 @@ from .models import User
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'role', 'created_at', 'updated_at']
+        fields = ['id', 'username', 'email', 'role', 'reuse_existing_links', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+# Serializer for the current user, with their link quota usage
+class UserMeSerializer(UserSerializer):
+    link_usage = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['link_usage']
+
+    def get_link_usage(self, obj):
+        # From the maintained counter: no count of the user's links
+        quota = obj.get_link_quota()
+        return {
+            'count': obj.link_count,
+            'quota': quota,
+            'remaining': None if quota is None else max(quota - obj.link_count, 0),
+        }
+
+
+# Serializer for the user list with the link metrics (?metrics=true)
+class UserMetricsSerializer(UserSerializer):
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['link_count', 'active_link_count', 'click_count', 'last_clicked_at']
+        read_only_fields = UserSerializer.Meta.read_only_fields + [
+            'link_count', 'active_link_count', 'click_count', 'last_clicked_at'
+        ]
+
+
 # Serializer for registering a new user
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
@@ -49,7 +75,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ['username', 'email', 'role', 'is_active']
+        fields = ['username', 'email', 'role', 'is_active', 'reuse_existing_links']
 
     def validate_role(self, value):
         # ensure role is valid
@@ -0,0 +1,133 @@
+from datetime import timedelta
+from io import StringIO
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from analytics.services import AnalyticsService
+from links.models import Link
+from links.services import LinkService, UserLinkMetricsService
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestUserLinkMetrics:
+    def setup_method(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='adminpass123',
+                                              role=User.ADMIN)
+        self.heavy = User.objects.create_user(username='heavy', email='heavy@example.com', password='testpass123')
+        self.light = User.objects.create_user(username='light', email='light@example.com', password='testpass123')
+        self.idle = User.objects.create_user(username='idle', email='idle@example.com', password='testpass123')
+        self.client.force_authenticate(user=self.admin)
+
+    def click(self, link, times=1):
+        for _ in range(times):
+            AnalyticsService.track_click(link)
+
+    def populate(self):
+        heavy_links = [LinkService.create_link(f'https://example.com/h{number}', user=self.heavy) for number in range(3)]
+        LinkService.update_link(heavy_links[2], is_active=False)
+        self.click(heavy_links[0], 4)
+        self.click(heavy_links[1], 2)
+        light_link = LinkService.create_link('https://example.com/l', user=self.light)
+        self.click(light_link)
+        LinkService.create_link('https://example.com/idle', user=self.idle)
+        UserLinkMetricsService.refresh(batch_size=2)
+        return heavy_links, light_link
+
+    def names(self, response):
+        assert response.status_code == 200
+        return [user['username'] for user in response.data['results']]
+
+    def test_clicks_set_the_link_last_click(self):
+        link = LinkService.create_link('https://example.com', user=self.heavy)
+        assert link.last_clicked_at is None
+        self.click(link)
+        link.refresh_from_db()
+        assert link.click_count == 1 and timezone.now() - link.last_clicked_at < timedelta(minutes=1)
+
+        # A spool segment loaded late never moves the last click back
+        latest = link.last_clicked_at
+        AnalyticsService.count_clicks(link, 3, link._state.db, latest - timedelta(hours=1))
+        link.refresh_from_db()
+        assert link.click_count == 4 and link.last_clicked_at == latest
+
+    def test_refresh_rolls_the_links_up(self):
+        heavy_links, light_link = self.populate()
+        heavy = User.objects.get(pk=self.heavy.pk)
+        assert (heavy.link_count, heavy.active_link_count, heavy.click_count) == (3, 2, 6)
+        assert heavy.last_clicked_at == Link.objects.using(heavy_links[1]._state.db).get(
+            pk=heavy_links[1].pk
+        ).last_clicked_at
+        idle = User.objects.get(pk=self.idle.pk)
+        assert (idle.link_count, idle.active_link_count, idle.click_count, idle.last_clicked_at) == (1, 1, 0, None)
+
+        # Nothing changed: nothing is written
+        assert UserLinkMetricsService.refresh() == {'users': 4, 'updated': 0}
+        LinkService.delete_link(light_link)
+        out = StringIO()
+        call_command('refresh_user_link_metrics', stdout=out)
+        assert 'Refreshed 4 user(s), 1 changed' in out.getvalue()
+        light = User.objects.get(pk=self.light.pk)
+        assert (light.link_count, light.click_count, light.last_clicked_at) == (0, 0, None)
+
+    def test_saving_a_stale_user_keeps_the_metrics(self):
+        stale = User.objects.get(pk=self.heavy.pk)
+        self.populate()
+        stale.email = 'changed@example.com'
+        stale.save()
+        assert User.objects.get(pk=self.heavy.pk).click_count == 6
+
+    def test_list_includes_metrics_on_request(self):
+        self.populate()
+        response = self.client.get('/api/auth/users/', {'ordering': 'username'})
+        assert 'click_count' not in response.data['results'][0]
+
+        response = self.client.get('/api/auth/users/', {'ordering': 'username', 'metrics': 'true'})
+        heavy = next(user for user in response.data['results'] if user['username'] == 'heavy')
+        assert heavy['link_count'] == 3 and heavy['active_link_count'] == 2 and heavy['click_count'] == 6
+        assert heavy['last_clicked_at']
+        response = self.client.get('/api/auth/users/', {'metrics': 'true', 'fields': 'username,click_count'})
+        assert set(response.data['results'][0]) == {'username', 'click_count'}
+
+    def test_list_sorts_on_metrics(self):
+        self.populate()
+        assert self.names(self.client.get('/api/auth/users/', {'ordering': '-click_count,username'})) == [
+            'heavy', 'light', 'admin', 'idle'
+        ]
+        assert self.names(self.client.get('/api/auth/users/', {'ordering': '-link_count,username'}))[:2] == [
+            'heavy', 'idle'
+        ]
+        # Users who never had a click sort as the least recent, in both directions
+        assert self.names(self.client.get('/api/auth/users/', {'ordering': '-last_clicked_at,username'})) == [
+            'light', 'heavy', 'admin', 'idle'
+        ]
+        assert self.names(self.client.get('/api/auth/users/', {'ordering': 'last_clicked_at,username'})) == [
+            'admin', 'idle', 'heavy', 'light'
+        ]
+
+    def test_list_filters_on_metrics(self):
+        self.populate()
+        params = {'ordering': 'username'}
+        assert self.names(self.client.get('/api/auth/users/', {**params, 'min_clicks': 2})) == ['heavy']
+        assert self.names(self.client.get('/api/auth/users/', {**params, 'min_links': 1, 'max_clicks': 1})) == [
+            'idle', 'light'
+        ]
+        assert self.names(self.client.get('/api/auth/users/', {**params, 'min_active_links': 2})) == ['heavy']
+        since = (timezone.now() - timedelta(hours=1)).isoformat()
+        assert self.names(self.client.get('/api/auth/users/', {**params, 'clicked_after': since})) == [
+            'heavy', 'light'
+        ]
+        assert self.client.get('/api/auth/users/', {'min_clicks': 'many'}).status_code == 400
+
+    def test_list_queries_do_not_grow_with_the_page(self, django_assert_max_num_queries):
+        self.populate()
+        # Count and page, whatever the metrics, filters and ordering
+        with django_assert_max_num_queries(2):
+            response = self.client.get('/api/auth/users/', {
+                'metrics': 'true', 'min_links': 1, 'ordering': '-click_count'
+            })
+        assert response.status_code == 200 and len(response.data['results']) == 3
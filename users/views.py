@@ -3,26 +3,28 @@ from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import User
 from .serializers import (
-    UserSerializer, UserRegistrationSerializer, UserLoginSerializer, UserUpdateSerializer
+    UserSerializer, UserMeSerializer, UserMetricsSerializer, UserRegistrationSerializer, UserLoginSerializer,
+    UserUpdateSerializer
 )
+from .filters import UserFilter, UserOrderingFilter
 from .services import UserService
 from .permissions import IsAdmin, CanManageUsers
-from .schemas import (
-    user_register_schema, user_login_schema, user_me_schema,
-    user_list_schema, user_detail_schema, user_update_put_schema,
-    user_update_patch_schema, user_delete_schema
-)
+from .projections import UserMetricsProjection, UserProjection
+from utils.projection import ProjectionListMixin
+from utils.schema import LazySchemas
+
+schemas = LazySchemas('users.schemas')
 
 
 # Register a new user
 class UserRegisterView(APIView):
     permission_classes = [AllowAny]
 
-    @user_register_schema
+    @schemas.user_register_schema
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -49,7 +51,7 @@ class UserRegisterView(APIView):
 class UserLoginView(APIView):
     permission_classes = [AllowAny]
 
-    @user_login_schema
+    @schemas.user_login_schema
     def post(self, request):
         serializer = UserLoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -73,24 +75,37 @@ class UserLoginView(APIView):
 class UserMeView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @user_me_schema
+    @schemas.user_me_schema
     def get(self, request):
-        serializer = UserSerializer(request.user)
+        serializer = UserMeSerializer(request.user)
         return Response(serializer.data)
 
 
-# List all users (Admin only)
-class UserListView(ListAPIView):
+# List all users (Admin only), with their link metrics on ?metrics=true
+class UserListView(ProjectionListMixin, ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    projection_class = UserProjection
     permission_classes = [IsAuthenticated, CanManageUsers]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['is_active', 'role']
+    filter_backends = [DjangoFilterBackend, SearchFilter, UserOrderingFilter]
+    filterset_class = UserFilter
     search_fields = ['username', 'email']
-    ordering_fields = ['username', 'email', 'created_at']
+    # The metrics are columns of users (see UserLinkMetricsService): sorting on them is an index scan
+    ordering_fields = [
+        'username', 'email', 'created_at', 'link_count', 'active_link_count', 'click_count', 'last_clicked_at'
+    ]
     ordering = ['-created_at']
 
-    @user_list_schema
+    def with_metrics(self):
+        return self.request.query_params.get('metrics', '').lower() in ('true', '1')
+
+    def get_serializer_class(self):
+        return UserMetricsSerializer if self.with_metrics() else UserSerializer
+
+    def get_projection_class(self):
+        return UserMetricsProjection if self.with_metrics() else UserProjection
+
+    @schemas.user_list_schema
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
@@ -99,7 +114,7 @@ class UserListView(ListAPIView):
 class UserDetailView(APIView):
     permission_classes = [IsAuthenticated, CanManageUsers]
 
-    @user_detail_schema
+    @schemas.user_detail_schema
     def get(self, request, pk):
         try:
             user = User.objects.get(pk=pk)
@@ -108,7 +123,7 @@ class UserDetailView(APIView):
 
         return Response(UserSerializer(user).data)
 
-    @user_update_patch_schema
+    @schemas.user_update_patch_schema
     def patch(self, request, pk):
         try:
             user = User.objects.get(pk=pk)
@@ -121,7 +136,7 @@ class UserDetailView(APIView):
         user = UserService.update_user(user, **serializer.validated_data)
         return Response(UserSerializer(user).data)
 
-    @user_update_put_schema
+    @schemas.user_update_put_schema
     def put(self, request, pk):
         try:
             user = User.objects.get(pk=pk)
@@ -134,7 +149,7 @@ class UserDetailView(APIView):
         user = UserService.update_user(user, **serializer.validated_data)
         return Response(UserSerializer(user).data)
 
-    @user_delete_schema
+    @schemas.user_delete_schema
     def delete(self, request, pk):
         try:
             user = User.objects.get(pk=pk)
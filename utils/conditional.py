@@ -0,0 +1,41 @@
+"""
+HTTP conditional requests for API views.
+
+A view computes its validators from data it has at hand (or a cheap aggregate)
+before building the response body, returns `not_modified(...)` if that is not
+None, and passes its response through `with_validators(...)` otherwise:
+
+    etag = make_etag(link.pk, link.updated_at, link.click_count)
+    return not_modified(request, etag) or with_validators(Response(data), etag)
+
+ETags are weak: they change whenever the data behind the response does, but a
+response may differ in details that do not matter (e.g. the exact `now`).
+"""
+import hashlib
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    return 'W/"{}"'.format(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """A 304 (or 412) response when the request's validators match, else None."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def with_validators(response, etag=None, last_modified=None):
+    if response.status_code != 200:
+        return response
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Per-user data: caches may keep it but must revalidate each time
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
@@ -0,0 +1,99 @@
+import random
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from links.sharding import SHARDED_MODELS, get_shards, is_sharded, is_sharded_model
+
+# Set while the current request (or thread) must read from the primary.
+_pinned = ContextVar('db_pinned', default=False)
+
+# Replica alias -> monotonic time until which it is skipped after a failure.
+_replica_down_until = {}
+
+
+def pin_to_primary():
+    """Route every following read of this context to the primary."""
+    return _pinned.set(True)
+
+
+def unpin(token=None):
+    if token is not None:
+        _pinned.reset(token)
+    else:
+        _pinned.set(False)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def mark_replica_down(alias):
+    _replica_down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+
+def get_replica_alias():
+    """
+    Pick a reachable read replica, or the primary when none is available.
+    A replica that fails to connect is skipped for REPLICA_RETRY_SECONDS.
+    """
+    replicas = list(getattr(settings, 'DATABASE_REPLICAS', []))
+    random.shuffle(replicas)
+    now = time.monotonic()
+
+    for alias in replicas:
+        if _replica_down_until.get(alias, 0) > now:
+            continue
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            mark_replica_down(alias)
+            continue
+        _replica_down_until.pop(alias, None)
+        return alias
+
+    return DEFAULT_DB_ALIAS
+
+
+class PrimaryReplicaRouter:
+    """
+    Send writes to the primary and reads to a read replica.
+
+    Reads stay on the primary once the current context has written (or was
+    pinned by ReplicaPinningMiddleware) so a client always sees its own writes.
+    When LINK_SHARDS lists several databases, links and their clicks stay on
+    the shard of the instance they are accessed through.
+    """
+
+    def _shard_for(self, model, hints):
+        if not is_sharded() or not is_sharded_model(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in get_shards():
+            return instance._state.db
+        return None
+
+    def db_for_read(self, model, **hints):
+        shard = self._shard_for(model, hints)
+        if shard:
+            return shard
+        if is_pinned():
+            return DEFAULT_DB_ALIAS
+        return get_replica_alias()
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return self._shard_for(model, hints) or DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', []):
+            return False
+        if db != DEFAULT_DB_ALIAS and db in get_shards():
+            # Shards only hold the partitioned tables
+            if model_name is None:
+                return any(label.startswith(f'{app_label}.') for label in SHARDED_MODELS)
+            return f'{app_label}.{model_name}' in SHARDED_MODELS
+        return True
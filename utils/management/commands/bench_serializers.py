@@ -0,0 +1,62 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from analytics.models import ClickStats
+from analytics.projections import ClickStatsProjection
+from analytics.serializers import ClickStatsSerializer
+from links.models import Link
+from links.projections import LinkProjection
+from links.serializers import LinkSerializer
+from links.sharding import ShardedQuerySet, is_sharded, shard_querysets
+from users.projections import UserProjection
+from users.serializers import UserSerializer
+
+
+def ordered(queryset):
+    queryset = queryset.order_by('-id')
+    if not is_sharded() or queryset.model is get_user_model():
+        return queryset
+    return ShardedQuerySet(list(shard_querysets(queryset)))
+
+
+class Command(BaseCommand):
+    help = 'Compare rows/s of the list serializers and their projections on the current data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per run (the newest ones)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the best one is reported')
+
+    def handle(self, *args, **options):
+        targets = [
+            ('links', Link.objects.all(), LinkSerializer, LinkProjection),
+            ('clicks', ClickStats.objects.all(), ClickStatsSerializer, ClickStatsProjection),
+            ('users', get_user_model().objects.all(), UserSerializer, UserProjection),
+        ]
+        rows = options['rows']
+        self.stdout.write(
+            f"{'endpoint':<8} {'rows':>6} {'serializer rows/s':>18} {'projection rows/s':>18} {'speedup':>8}"
+        )
+        for name, queryset, serializer_class, projection_class in targets:
+            # Both paths include their queries: the serializer's per-row ones are part of its cost
+            before = self.best(
+                options['repeat'], lambda: serializer_class(list(ordered(queryset)[:rows]), many=True).data
+            )
+            projection = projection_class()
+            after = self.best(
+                options['repeat'], lambda: projection.serialize(projection.values(ordered(queryset))[:rows])
+            )
+            count = len(ordered(queryset)[:rows])
+            if not count:
+                self.stdout.write(f'{name:<8} {0:>6} (no rows)')
+                continue
+            self.stdout.write(
+                f'{name:<8} {count:>6} {count / before:>18.0f} {count / after:>18.0f} {before / after:>7.1f}x'
+            )
+
+    def best(self, repeat, run):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
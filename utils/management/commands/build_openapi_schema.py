@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from utils.openapi import build_schema, get_artifact_path, get_code_version, write_artifact
+
+
+class Command(BaseCommand):
+    help = 'Pre-build the OpenAPI schema artifact served at api/doc/ (run while building the image)'
+    # Runs at image build time, without environment-specific settings
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild even if the artifact exists')
+
+    def handle(self, *args, **options):
+        path = get_artifact_path()
+        if path.exists() and not options['force']:
+            self.stdout.write(f'Schema for code version {get_code_version()} already built: {path}')
+            return
+        write_artifact(build_schema(), path)
+        for stale in path.parent.glob('openapi-*.json'):
+            if stale != path:
+                stale.unlink()
+        self.stdout.write(self.style.SUCCESS(f'Built schema for code version {get_code_version()}: {path}'))
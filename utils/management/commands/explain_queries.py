@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from links.models import Link
+from links.sharding import get_shards
+from utils.query_plans import CRITICAL_QUERIES, check
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the critical queries on the current data and report full scans of indexed tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--query', action='append', choices=sorted(CRITICAL_QUERIES),
+                            help='Only this query (repeatable); default: all')
+        parser.add_argument('--analyze', action='store_true',
+                            help='EXPLAIN ANALYZE (PostgreSQL only): runs the queries and reports their time')
+        parser.add_argument('--sql', action='store_true', help='Print each statement above its plan')
+
+    def handle(self, *args, **options):
+        context = self.get_context()
+        problems = []
+        for name in options['query'] or CRITICAL_QUERIES:
+            result = check(name, context, analyze=options['analyze'])
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for plan in result['plans']:
+                if options['sql']:
+                    self.stdout.write(plan['sql'])
+                figures = [f"cost {plan['cost']}" if plan['cost'] is not None else None,
+                           f"{plan['time']:.2f} ms" if plan['time'] is not None else None]
+                for line in plan['lines']:
+                    self.stdout.write(f'  {line}')
+                if any(figures):
+                    self.stdout.write(f"  ({', '.join(filter(None, figures))})")
+                self.stdout.write('')
+            problems.extend(result['problems'])
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('No full scans of indexed tables and no cost over its bound'))
+
+    def get_context(self):
+        # The most clicked owned link stands in for a busy user's data
+        links = [
+            link
+            for alias in get_shards()
+            for link in Link.objects.using(alias).filter(user__isnull=False).order_by('-click_count')[:1]
+        ]
+        if not links:
+            raise CommandError('No links with an owner: generate some with generate_synthetic_data first')
+        link = max(links, key=lambda link: link.click_count)
+        return {'code': link.short_code, 'link': link, 'user': link.user}
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
-from django.shortcuts import redirect
-from links.models import Link
-from analytics.services import AnalyticsService
+from utils.db_router import pin_to_primary, unpin
+
+PRIMARY_PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
 
 
 class ClickTrackingMiddleware(MiddlewareMixin):
@@ -9,4 +11,31 @@ class ClickTrackingMiddleware(MiddlewareMixin):
     Middleware to track clicks on shortened links.
     DISABLED: API now returns JSON for mobile apps instead of server-side redirects.
     """
-    pass
\ No newline at end of file
+    pass
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keep a client on the primary database right after it writes.
+
+    Unsafe requests and requests carrying the pin cookie read from the primary.
+    A successful unsafe request sets the cookie for REPLICA_PIN_SECONDS, so e.g.
+    a link created by LinkCreateView resolves immediately on the next redirect
+    even if the replicas are lagging. Clicks tracked by GET requests do not pin.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unsafe = request.method not in SAFE_METHODS
+        token = pin_to_primary() if unsafe or PRIMARY_PIN_COOKIE in request.COOKIES else None
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin(token)
+        if unsafe and response.status_code < 400:
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
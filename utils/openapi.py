@@ -0,0 +1,112 @@
+import hashlib
+import json
+import threading
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+from utils.schema_generator import SchemaGenerator
+
+# Directories that never affect the generated document
+IGNORED_DIRS = {'static', 'media', 'build', 'venv', '.venv', 'node_modules', 'tests', 'migrations'}
+
+_lock = threading.Lock()
+_code_version = None
+_schema = None
+
+
+def get_code_version():
+    """
+    APP_VERSION when set (e.g. the git commit baked into the image), otherwise
+    a digest of the project's Python sources, so any code change yields a new version.
+    """
+    global _code_version
+    if _code_version is None:
+        if settings.APP_VERSION:
+            _code_version = settings.APP_VERSION
+        else:
+            digest = hashlib.sha256()
+            for path in sorted(settings.BASE_DIR.rglob('*.py')):
+                relative = path.relative_to(settings.BASE_DIR)
+                if IGNORED_DIRS.intersection(relative.parts[:-1]) or relative.parts[0].startswith('.'):
+                    continue
+                digest.update(str(relative).encode())
+                digest.update(path.read_bytes())
+            _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def get_artifact_path(version=None):
+    return settings.OPENAPI_SCHEMA_DIR / f'openapi-{version or get_code_version()}.json'
+
+
+def build_schema():
+    generator = SchemaGenerator(urlconf=spectacular_settings.SERVE_URLCONF)
+    return generator.get_schema(request=None, public=True)
+
+
+def write_artifact(schema, path=None):
+    path = path or get_artifact_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(schema))
+    tmp.replace(path)
+    return path
+
+
+def get_schema():
+    """
+    The OpenAPI document for the running code version: from memory, else from
+    the prebuilt artifact, else generated once and written as the artifact.
+    """
+    global _schema
+    if _schema is not None:
+        return _schema
+    with _lock:
+        if _schema is None:
+            path = get_artifact_path()
+            if path.exists():
+                _schema = json.loads(path.read_text())
+            else:
+                _schema = build_schema()
+                try:
+                    write_artifact(_schema, path)
+                except OSError:
+                    # Read-only filesystem: serve from memory only
+                    pass
+    return _schema
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    SpectacularAPIView serving the precomputed schema.
+
+    Each format (YAML/JSON) is rendered once per process and served with an ETag
+    derived from the code version and long-lived Cache-Control headers; matching
+    If-None-Match requests get a 304. Requests for a specific API version or
+    language fall back to live generation.
+    """
+    _rendered = {}
+
+    def _get_schema_response(self, request):
+        if request.GET.get('version') or request.GET.get('lang'):
+            return super()._get_schema_response(request)
+
+        renderer, media_type = self.perform_content_negotiation(request)
+        etag = f'"{get_code_version()}-{renderer.format}"'
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f'public, max-age={settings.OPENAPI_SCHEMA_MAX_AGE}',
+        }
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return HttpResponse(status=304, headers=headers)
+
+        key = (media_type, etag)
+        if key not in self._rendered:
+            self._rendered[key] = renderer.render(get_schema(), media_type, self.get_renderer_context())
+
+        response = HttpResponse(self._rendered[key], content_type=media_type, headers=headers)
+        response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        return response
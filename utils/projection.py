@@ -0,0 +1,138 @@
+"""
+Fast read path for list endpoints: serializer output built from `.values()` rows.
+
+A Projection mirrors a DRF serializer: it reads the serializer's fields once
+(per class) to build a plan of (output name, column, converter) and then
+builds each item from a plain dict row, with no model instances and no
+per-field dispatch. Columns come from the field sources ('user.username'
+becomes 'user__username'); converters are only kept for fields whose output
+differs from the database value (dates and times). Like the serializer, a
+field whose source crosses a null relation is left out of the item. Fields
+that are not columns (properties, SerializerMethodFields) are listed in
+`computed` and filled by `compute()`, which sees the whole page so it can
+batch its queries. A projection can be limited to some fields: it then only
+selects their columns and only computes those among them.
+
+The output equals `serializer_class(instances, many=True).data`; the tests of
+each projection check that.
+"""
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+
+# Fields whose to_representation returns database values unchanged
+IDENTITY_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+# A computed value that leaves the field out of the item
+SKIP = object()
+
+
+class Projection:
+    serializer_class = None
+    # Output names filled by compute() instead of read from a column -> the columns compute() needs
+    computed = {}
+
+    _plans = {}
+
+    def __init__(self, fields=None):
+        # `fields` limits the output (and the columns and computations) to those names
+        self.plan = [entry for entry in self.full_plan() if fields is None or entry[0] in fields]
+        self.fields = [name for name, *_ in self.plan]
+
+    @classmethod
+    def full_plan(cls):
+        """[(output name, column, converter, guard column)]; computed fields have no column."""
+        if cls not in Projection._plans:
+            plan = []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                if name in cls.computed:
+                    plan.append((name, None, None, None))
+                    continue
+                convert = None if isinstance(field, IDENTITY_FIELDS) else field.to_representation
+                guard = None
+                if len(field.source_attrs) > 1 and field.default is empty and not field.allow_null:
+                    # The serializer skips the field when the relation is null (SkipField)
+                    guard = field.source_attrs[0]
+                plan.append((name, '__'.join(field.source_attrs), convert, guard))
+            Projection._plans[cls] = plan
+        return Projection._plans[cls]
+
+    @classmethod
+    def field_names(cls):
+        return [name for name, *_ in cls.full_plan()]
+
+    def columns(self):
+        columns = []
+        for name, column, _, guard in self.plan:
+            needed = self.computed[name] if column is None else (column, guard)
+            columns.extend(column for column in needed if column and column not in columns)
+        return columns
+
+    def values(self, queryset):
+        return queryset.values(*self.columns())
+
+    def compute(self, rows):
+        """{output name: [value or SKIP per row]} for the requested `computed` fields of a page of rows."""
+        return {}
+
+    def serialize(self, rows):
+        rows = list(rows)
+        computed = self.compute(rows)
+        items = []
+        for index, row in enumerate(rows):
+            item = {}
+            for name, column, convert, guard in self.plan:
+                if column is None:
+                    value = computed[name][index]
+                    if value is not SKIP:
+                        item[name] = value
+                    continue
+                if guard is not None and row[guard] is None:
+                    continue
+                value = row[column]
+                item[name] = convert(value) if convert is not None and value is not None else value
+            items.append(item)
+        return items
+
+
+def requested_fields(request, available):
+    """
+    The fields selected by the `fields` and `omit` query parameters (comma
+    separated), in `available` order, or None when neither is given.
+    """
+    fields, omit = request.query_params.get('fields'), request.query_params.get('omit')
+    if not fields and not omit:
+        return None
+    selected = {name.strip() for name in fields.split(',') if name.strip()} if fields else set(available)
+    omitted = {name.strip() for name in (omit or '').split(',') if name.strip()}
+    unknown = (selected | omitted) - set(available)
+    if unknown:
+        raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+    return [name for name in available if name in selected and name not in omitted]
+
+
+class ProjectionListMixin:
+    """
+    ListAPIView mixin: serve the list through `projection_class` instead of the
+    serializer. `?fields=a,b` / `?omit=c` select the fields; the others are
+    neither read from the database nor computed.
+    """
+    projection_class = None
+
+    def get_projection_class(self):
+        return self.projection_class
+
+    def list(self, request, *args, **kwargs):
+        projection_class = self.get_projection_class()
+        projection = projection_class(requested_fields(request, projection_class.field_names()))
+        rows = projection.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.serialize(page))
+        return Response(projection.serialize(rows))
@@ -0,0 +1,241 @@
+"""
+Query plan checks for the critical read paths.
+
+Each entry of CRITICAL_QUERIES runs a read path the way the application does
+(the service call, or the list view's filtered queryset and page) while every
+connection's queries are captured, and each captured SELECT is then run
+through EXPLAIN on the database it went to:
+
+- `indexed` tables must only be read through an index: a full scan of one of
+  them (SQLite `SCAN <table>`, PostgreSQL `Seq Scan`) is a problem;
+- on PostgreSQL the estimated total cost of each statement must stay under
+  `max_cost`. Sequential scans are disabled while explaining, so the plans
+  show which index the planner can use rather than what is cheapest on a
+  small test table; a query with no usable index keeps its Seq Scan at a
+  prohibitive cost.
+
+The normalized plans (no costs, no literal values) are compared to the
+snapshots in utils/tests/query_plans/<vendor>/ by the tests, for the vendors
+in SNAPSHOT_VENDORS; run them with UPDATE_QUERY_PLANS=1 to rewrite the
+snapshots after an intended change.
+`python manage.py explain_queries [--analyze]` prints the plans, costs and
+(with --analyze, PostgreSQL only) timings on the current data, e.g. after
+generate_synthetic_data.
+"""
+import json
+import re
+from contextlib import ExitStack
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from utils.db_router import pin_to_primary, unpin
+
+SNAPSHOT_DIR = settings.BASE_DIR / 'utils' / 'tests' / 'query_plans'
+# Databases with committed snapshots. PostgreSQL has none yet: its plans are still checked for full scans
+# and cost, but not compared until snapshots are generated there (UPDATE_QUERY_PLANS=1) and added here
+SNAPSHOT_VENDORS = ('sqlite',)
+
+SQLITE_ACCESS = re.compile(
+    r'^(SCAN|SEARCH) (\S+)(?: AS \S+)?(?: USING (?:(?:COVERING )?INDEX (\S+)|(INTEGER PRIMARY KEY)))?'
+)
+
+
+def _link_by_code(context):
+    from links.services import LinkService
+
+    LinkService.get_link_by_code(context['code'])
+
+
+def _link_list(context, **filters):
+    from links.filters import LinkFilter
+    from links.models import Link
+    from links.projections import LinkProjection
+    from links.sharding import shard_querysets
+
+    # LinkListView for a regular user: LinkFilter, default ordering, first page and count
+    queryset = LinkFilter(filters, queryset=Link.objects.filter(user=context['user'])).qs.order_by('-created_at')
+    projection = LinkProjection()
+    for shard_queryset in shard_querysets(queryset):
+        shard_queryset.count()
+        projection.serialize(projection.values(shard_queryset)[:settings.REST_FRAMEWORK['PAGE_SIZE']])
+
+
+def _link_stats(context):
+    from analytics.services import AnalyticsService
+
+    AnalyticsService.get_link_stats(context['link'])
+
+
+def _global_stats(context):
+    from analytics.services import AnalyticsService
+
+    AnalyticsService.get_global_stats()
+
+
+def _click_list(context):
+    from analytics.models import ClickStats
+    from analytics.projections import ClickStatsProjection
+    from links.sharding import shard_querysets
+
+    # ClickStatsListView: every click, newest first
+    projection = ClickStatsProjection()
+    for shard_queryset in shard_querysets(ClickStats.objects.all()):
+        projection.serialize(projection.values(shard_queryset)[:settings.REST_FRAMEWORK['PAGE_SIZE']])
+
+
+def _user_list(context, ordering, **filters):
+    from users.filters import UserFilter, UserOrderingFilter
+    from users.models import User
+    from users.projections import UserMetricsProjection
+
+    # UserListView with ?metrics=true: UserFilter, the ordering, count and first page
+    queryset = UserFilter(filters, queryset=User.objects.all()).qs.order_by(UserOrderingFilter.order_by(ordering))
+    projection = UserMetricsProjection()
+    queryset.count()
+    projection.serialize(projection.values(queryset)[:settings.REST_FRAMEWORK['PAGE_SIZE']])
+
+
+# name -> run(context), tables that must be read through an index, PostgreSQL cost bound.
+# The whole-table aggregates of the global stats, the top links by click_count and the newest clicks
+# of every link have no index to use; they are kept for their snapshots.
+CRITICAL_QUERIES = {
+    'link_by_code': {'run': _link_by_code, 'indexed': ('links',), 'max_cost': 100},
+    'link_list': {'run': _link_list, 'indexed': ('links', 'click_stats'), 'max_cost': 1000},
+    'link_list_active_recent': {
+        'run': lambda context: _link_list(
+            context, is_active='true', created_after=(timezone.now() - timedelta(days=30)).isoformat()
+        ),
+        'indexed': ('links', 'click_stats'),
+        'max_cost': 1000,
+    },
+    'link_list_with_alias': {
+        'run': lambda context: _link_list(context, has_custom_alias='true'),
+        'indexed': ('links', 'click_stats'),
+        'max_cost': 1000,
+    },
+    'link_stats': {'run': _link_stats, 'indexed': ('click_stats',), 'max_cost': 1000},
+    'global_stats': {'run': _global_stats, 'indexed': (), 'max_cost': None},
+    'click_list': {'run': _click_list, 'indexed': (), 'max_cost': None},
+    'user_list_by_clicks': {
+        'run': lambda context: _user_list(context, '-click_count', min_clicks=1),
+        'indexed': ('users',),
+        'max_cost': 1000,
+    },
+    'user_list_by_last_click': {
+        'run': lambda context: _user_list(context, '-last_clicked_at'),
+        'indexed': ('users',),
+        'max_cost': 1000,
+    },
+}
+
+
+def capture(run, context):
+    """[(alias, sql)] of the SELECTs `run(context)` sends, on every connection, read from the primary."""
+    with ExitStack() as stack:
+        contexts = [
+            (connection.alias, stack.enter_context(CaptureQueriesContext(connection)))
+            for connection in connections.all()
+        ]
+        token = pin_to_primary()
+        try:
+            run(context)
+        finally:
+            unpin(token)
+    return [
+        (alias, query['sql'])
+        for alias, captured in contexts
+        for query in captured.captured_queries
+        if query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+
+
+def explain(alias, sql, analyze=False):
+    """
+    {'lines', 'accesses', 'cost', 'time'} of `sql` on `alias`. `accesses` are
+    (table, index or None, full scan) tuples; `cost` and `time` (ms, with
+    `analyze`) are None where the database does not report them.
+    """
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        return _explain_postgresql(connection, sql, analyze)
+    if connection.vendor == 'sqlite':
+        return _explain_sqlite(connection, sql)
+    raise NotImplementedError(f'No query plan support for {connection.vendor}')
+
+
+def _explain_sqlite(connection, sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        rows = cursor.fetchall()
+    depths, lines, accesses = {0: -1}, [], []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+        match = SQLITE_ACCESS.match(detail)
+        if match:
+            kind, table, index, primary_key = match.groups()
+            index = index or primary_key
+            # SCAN ... USING INDEX walks an index in order (e.g. for ORDER BY ... LIMIT), not the table
+            accesses.append((table, index, kind == 'SCAN' and index is None))
+    return {'lines': lines, 'accesses': accesses, 'cost': None, 'time': None}
+
+
+def _explain_postgresql(connection, sql, analyze):
+    options = 'ANALYZE, FORMAT JSON' if analyze else 'FORMAT JSON'
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN ({options}) {sql}')
+        result = cursor.fetchone()[0]
+    result = (json.loads(result) if isinstance(result, str) else result)[0]
+    lines, accesses = [], []
+    _walk_postgresql(result['Plan'], 0, lines, accesses)
+    return {
+        'lines': lines,
+        'accesses': accesses,
+        'cost': result['Plan']['Total Cost'],
+        'time': result.get('Execution Time'),
+    }
+
+
+def _walk_postgresql(node, depth, lines, accesses):
+    text = node['Node Type']
+    if 'Index Name' in node:
+        text += f" using {node['Index Name']}"
+    if 'Relation Name' in node:
+        text += f" on {node['Relation Name']}"
+        accesses.append((node['Relation Name'], node.get('Index Name'), node['Node Type'] == 'Seq Scan'))
+    lines.append('  ' * depth + text)
+    for child in node.get('Plans', []):
+        _walk_postgresql(child, depth + 1, lines, accesses)
+
+
+def check(name, context, analyze=False):
+    """
+    {'name', 'plans', 'problems'} for CRITICAL_QUERIES[name]: one plan per
+    distinct captured statement (the same statement on several shards counts once).
+    """
+    query = CRITICAL_QUERIES[name]
+    plans, seen, problems = [], set(), []
+    for alias, sql in capture(query['run'], context):
+        plan = explain(alias, sql, analyze=analyze)
+        plan['sql'] = sql
+        for table, _, full in plan['accesses']:
+            if full and table in query['indexed']:
+                problems.append(f'{name}: full scan of {table} in {sql}')
+        if query['max_cost'] is not None and plan['cost'] is not None and plan['cost'] > query['max_cost']:
+            problems.append(f"{name}: estimated cost {plan['cost']} over {query['max_cost']} in {sql}")
+        key = tuple(plan['lines'])
+        if key not in seen:
+            seen.add(key)
+            plans.append(plan)
+    return {'name': name, 'plans': plans, 'problems': problems}
+
+
+def snapshot_text(result):
+    return '\n\n'.join('\n'.join(plan['lines']) for plan in result['plans']) + '\n'
+
+
+def snapshot_path(name, vendor):
+    return SNAPSHOT_DIR / vendor / f'{name}.txt'
@@ -0,0 +1,38 @@
+import threading
+from importlib import import_module
+from django.apps import apps
+
+# (view method, schemas module, decorator name) marked by LazySchemas and not applied yet
+_pending = []
+_lock = threading.Lock()
+
+
+class LazySchemas:
+    """
+    Stand-in for an app's schemas module: `@schemas.link_create_schema` marks
+    the view method for that drf-spectacular decorator without importing the
+    schemas module. apply_schemas() imports the modules and applies the
+    decorators; utils.openapi.SchemaGenerator calls it before it builds the
+    document, so only a process that generates the OpenAPI schema imports
+    them. Without drf_spectacular installed the methods are left alone.
+    """
+
+    def __init__(self, module):
+        self.module = module
+
+    def __getattr__(self, name):
+        def decorator(func):
+            if apps.is_installed('drf_spectacular'):
+                with _lock:
+                    _pending.append((func, self.module, name))
+            return func
+        return decorator
+
+
+def apply_schemas():
+    """Apply the drf-spectacular decorators marked so far; each is applied once."""
+    with _lock:
+        while _pending:
+            func, module, name = _pending.pop(0)
+            # extend_schema annotates the method in place, as the class already holds it
+            getattr(import_module(module), name)(func)
@@ -0,0 +1,17 @@
+from django.urls import get_resolver
+from drf_spectacular import generators
+from utils.schema import apply_schemas
+
+
+class SchemaGenerator(generators.SchemaGenerator):
+    """
+    SPECTACULAR_SETTINGS['DEFAULT_GENERATOR_CLASS']: applies the views'
+    LazySchemas decorators before generating. Its own module, since
+    drf_spectacular.views reads that setting when it is imported.
+    """
+
+    def get_schema(self, request=None, public=False):
+        # Loading the URLconf imports every view module, and so marks all of their schemas
+        get_resolver(self.urlconf).url_patterns
+        apply_schemas()
+        return super().get_schema(request=request, public=public)
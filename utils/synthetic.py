@@ -0,0 +1,273 @@
+"""
+Synthetic users, links and clicks for scale testing (generate_synthetic_data).
+
+The data is a pure function of the seed and the options: every chunk draws
+from its own `random.Random(f'{seed}:{kind}:{chunk}')`, so chunks can be
+generated in any order by any number of processes and still come out the
+same. Rows are written verbatim (links.sharding.copy_rows, and COPY for clicks
+on PostgreSQL) with ids allocated from the highest existing id, so a run on
+the same database state produces the same rows, ids included. Usernames,
+short codes and aliases are numbered after the rows already there, so runs
+can be stacked.
+
+Distributions:
+
+- link popularity is Zipfian: the link of rank r gets clicks / r**zipf / H
+  clicks (H normalizes the total), ranks being a seeded permutation of the
+  links so the popular ones are spread over time and shards;
+- users own links with the same Zipfian skew, and `guest_ratio` of the links
+  have no owner;
+- `alias_ratio` of the links have a custom alias; short codes are 7
+  characters (the service draws 6), a bijection of the link number, so they
+  never collide with each other or with links created through the API;
+- links are created uniformly over the last `days` days before `until`, and
+  each click falls on a day after its link was created, at an hour drawn from
+  DIURNAL_WEIGHTS.
+
+Links get their final click_count and last_clicked_at. Nothing else is maintained: no outbox
+events, and the code filter and link cache of running workers do not know
+the new links until they rebuild.
+"""
+import math
+import random
+import string
+from bisect import bisect
+from datetime import timedelta
+from itertools import accumulate
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models import Count, Max
+from analytics.spool import copy_clicks
+from links.models import Link, hash_url
+from links.sharding import copy_rows, get_shards, id_base, shard_for_link
+
+CODE_ALPHABET = string.ascii_letters + string.digits
+CODE_LENGTH = 7
+CODE_SPACE = len(CODE_ALPHABET) ** CODE_LENGTH
+
+# Relative click volume per hour of the day (UTC): low at night, peak in the evening
+DIURNAL_WEIGHTS = [2, 1, 1, 1, 1, 2, 4, 6, 8, 9, 9, 9, 10, 10, 9, 9, 10, 11, 12, 12, 11, 9, 6, 4]
+HOUR_CUM_WEIGHTS = list(accumulate(DIURNAL_WEIGHTS))
+
+DOMAINS = [
+    'example.com', 'news.example.org', 'shop.example.net', 'blog.example.io', 'docs.example.dev',
+    'video.example.tv', 'example.co.uk', 'static.example.com',
+]
+ALIAS_WORDS = ['promo', 'launch', 'docs', 'sale', 'event', 'news', 'report', 'invite', 'signup', 'webinar']
+# Used by every synthetic user: hashing a password per user is most of create_user's cost
+PASSWORD = 'synthetic-password'
+
+# Clicks written per COPY / executemany call
+CLICK_BATCH = 10000
+
+
+def coprime_step(n, start):
+    """The first number >= start that is coprime with n: i -> (i * step) % n is then a permutation."""
+    step = start
+    while math.gcd(step, n) != 1:
+        step += 1
+    return step
+
+
+def zipf_norm(n, exponent):
+    return math.fsum(rank ** -exponent for rank in range(1, n + 1))
+
+
+def zipf_rank(rng, n, exponent):
+    """A rank in [0, n) drawn with probability ~ (rank + 1) ** -exponent (continuous inverse CDF)."""
+    u, top = rng.random(), n + 1
+    if abs(exponent - 1) < 1e-9:
+        rank = top ** u
+    else:
+        rank = ((top ** (1 - exponent) - 1) * u + 1) ** (1 / (1 - exponent))
+    return min(int(rank), n) - 1
+
+
+def make_plan(users, links, clicks, seed=0, alias_ratio=0.1, guest_ratio=0.2, zipf=1.1, days=90, until=None,
+              chunk_size=10000):
+    """
+    Everything a chunk needs, as a picklable dict. Reads the highest existing
+    ids, so it must be built once per run, before any chunk is written.
+    """
+    rng = random.Random(f'{seed}:plan')
+    User = get_user_model()
+    link_starts, existing_links = {}, 0
+    for alias in get_shards():
+        row = Link.objects.using(alias).aggregate(highest=Max('id'), count=Count('id'))
+        link_starts[alias] = max((row['highest'] or 0) + 1, id_base(alias) or 1)
+        existing_links += row['count']
+    return {
+        'seed': seed,
+        'users': users,
+        'links': links,
+        'clicks': clicks,
+        'alias_ratio': alias_ratio,
+        'guest_ratio': guest_ratio,
+        'zipf': zipf,
+        'days': days,
+        'until': until,
+        'chunk_size': chunk_size,
+        'user_start': (User.objects.using(DEFAULT_DB_ALIAS).aggregate(highest=Max('id'))['highest'] or 0) + 1,
+        'link_starts': link_starts,
+        # Codes and aliases continue after the links already there, so a second run does not collide
+        'code_start': existing_links,
+        'click_norm': zipf_norm(links, zipf) if links else 1.0,
+        'link_rank_step': coprime_step(max(links, 1), 2654435761 % max(links, 1) or 1),
+        'link_rank_offset': rng.randrange(max(links, 1)),
+        'user_rank_step': coprime_step(max(users, 1), 40503 % max(users, 1) or 1),
+        'code_step': coprime_step(CODE_SPACE, int(CODE_SPACE * 0.618034)),
+        'code_offset': rng.randrange(CODE_SPACE),
+        'password': make_password(PASSWORD, salt=f'synthetic{seed}'),
+    }
+
+
+def chunks(plan):
+    """[(kind, index)] of the run: users first, links (with their clicks) after."""
+    size = plan['chunk_size']
+    return (
+        [('users', index) for index in range(math.ceil(plan['users'] / size))]
+        + [('links', index) for index in range(math.ceil(plan['links'] / size))]
+    )
+
+
+def generate_chunk(plan, kind, index):
+    """Write one chunk; returns {'users', 'links', 'clicks'} row counts."""
+    rng = random.Random(f"{plan['seed']}:{kind}:{index}")
+    first = index * plan['chunk_size']
+    if kind == 'users':
+        last = min(first + plan['chunk_size'], plan['users'])
+        return {'users': write_users(plan, rng, first, last), 'links': 0, 'clicks': 0}
+    last = min(first + plan['chunk_size'], plan['links'])
+    return write_links(plan, rng, index, first, last)
+
+
+def write_users(plan, rng, first, last):
+    User = get_user_model()
+    until = plan['until']
+    users = []
+    for number in range(first, last):
+        # Before the first link
+        joined = until - timedelta(days=plan['days'] * (1 + rng.random()))
+        users.append(User(
+            id=plan['user_start'] + number,
+            username=f"synthetic{plan['user_start'] + number}",
+            email=f"synthetic{plan['user_start'] + number}@example.com",
+            password=plan['password'],
+            role=User.ADMIN if number == 0 else User.USER,
+            reuse_existing_links=rng.random() < 0.1,
+            date_joined=joined,
+            created_at=joined,
+            updated_at=joined,
+        ))
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        copy_rows(users, DEFAULT_DB_ALIAS)
+    return len(users)
+
+
+def short_code(plan, number):
+    value = (number * plan['code_step'] + plan['code_offset']) % CODE_SPACE
+    characters = []
+    for _ in range(CODE_LENGTH):
+        value, digit = divmod(value, len(CODE_ALPHABET))
+        characters.append(CODE_ALPHABET[digit])
+    return ''.join(characters)
+
+
+def click_total(plan, rng, number):
+    """Clicks of link `number`: its Zipfian share, rounded up or down at random so the totals add up."""
+    rank = (number * plan['link_rank_step'] + plan['link_rank_offset']) % plan['links'] + 1
+    expected = plan['clicks'] * rank ** -plan['zipf'] / plan['click_norm']
+    whole = int(expected)
+    return whole + (rng.random() < expected - whole)
+
+
+def start_of_day(moment):
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def click_time(rng, created_at, until):
+    # A random day after the link was created, at a diurnal hour; the first and last days are cut
+    last_day = start_of_day(until - timedelta(microseconds=1))
+    span_days = (last_day - start_of_day(created_at)).days + 1
+    for _ in range(10):
+        day = last_day - timedelta(days=rng.randrange(span_days))
+        hour = bisect(HOUR_CUM_WEIGHTS, rng.random() * HOUR_CUM_WEIGHTS[-1])
+        clicked_at = day + timedelta(hours=hour, seconds=rng.random() * 3600)
+        if created_at <= clicked_at < until:
+            return clicked_at
+    return created_at + (until - created_at) * rng.random()
+
+
+def write_links(plan, rng, index, first, last):
+    until = plan['until']
+    per_shard = {alias: [] for alias in plan['link_starts']}
+    clicks = {}
+    for number in range(first, last):
+        created_at = until - timedelta(days=plan['days'] * rng.random())
+        user_id = None
+        if plan['users'] and rng.random() >= plan['guest_ratio']:
+            # Zipfian owners too: a few users own most links
+            rank = zipf_rank(rng, plan['users'], plan['zipf'])
+            user_id = plan['user_start'] + rank * plan['user_rank_step'] % plan['users']
+        custom_alias = None
+        if rng.random() < plan['alias_ratio']:
+            custom_alias = f"{rng.choice(ALIAS_WORDS)}-{plan['code_start'] + number}"
+        original_url = f'https://{rng.choice(DOMAINS)}/{rng.choice(ALIAS_WORDS)}/{rng.randrange(max(plan["links"] // 2, 1))}'
+        count = click_total(plan, rng, number)
+        link = Link(
+            short_code=short_code(plan, plan['code_start'] + number),
+            custom_alias=custom_alias,
+            original_url=original_url,
+            url_hash=hash_url(original_url),
+            user_id=user_id,
+            note='' if rng.random() < 0.8 else f'Synthetic link {number}',
+            is_active=rng.random() < 0.95,
+            expires_at=created_at + timedelta(days=rng.randrange(1, 2 * plan['days'])) if rng.random() < 0.1 else None,
+            max_clicks=count + rng.randrange(100) if rng.random() < 0.02 else None,
+            click_count=count,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+        alias = shard_for_link(link)
+        shard_links = per_shard[alias]
+        # Each chunk owns a block of chunk_size ids on every shard
+        link.id = plan['link_starts'][alias] + index * plan['chunk_size'] + len(shard_links)
+        shard_links.append(link)
+        clicks[link.id] = count
+
+    written = 0
+    for alias, links in per_shard.items():
+        if not links:
+            continue
+        with transaction.atomic(using=alias):
+            # Clicks first: a link's last_clicked_at is only known once its clicks are drawn
+            # (click_stats' foreign key is checked at commit)
+            batch = []
+            for link in links:
+                for _ in range(clicks[link.id]):
+                    clicked_at = click_time(rng, link.created_at, until)
+                    if link.last_clicked_at is None or clicked_at > link.last_clicked_at:
+                        link.last_clicked_at = clicked_at
+                    batch.append((link.id, clicked_at))
+                    if len(batch) >= CLICK_BATCH:
+                        copy_clicks(alias, batch)
+                        written += len(batch)
+                        batch = []
+            copy_clicks(alias, batch)
+            written += len(batch)
+            copy_rows(links, alias)
+    return {'users': 0, 'links': last - first, 'clicks': written}
+
+
+def reset_sequences():
+    """Move the id sequences past the explicit ids (PostgreSQL; SQLite's AUTOINCREMENT follows on its own)."""
+    targets = [(DEFAULT_DB_ALIAS, get_user_model())] + [(alias, Link) for alias in get_shards()]
+    for alias, model in targets:
+        statements = connections[alias].ops.sequence_reset_sql(no_style(), [model])
+        if statements:
+            with connections[alias].cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
@@ -0,0 +1,64 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from analytics.models import ClickStats
+from links.models import Link
+from utils.admin import ApproximateCountPaginator
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestScalableAdmin:
+    def setup_method(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(username='root', email='root@example.com', password='rootpass123')
+        self.client.force_login(self.admin)
+
+    def create_links(self, count):
+        users = [User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='x')
+                 for i in range(count)]
+        links = [Link.objects.create(short_code=f'code{i}', original_url='https://example.com', user=users[i])
+                 for i in range(count)]
+        for link in links:
+            ClickStats.objects.create(link=link)
+            ClickStats.objects.create(link=link)
+        return links
+
+    @pytest.mark.parametrize('url', ['/admin/links/link/', '/admin/users/user/', '/admin/analytics/clickstats/'])
+    def test_changelist_queries_do_not_grow_with_rows(self, url, django_assert_max_num_queries):
+        self.create_links(3)
+        with django_assert_max_num_queries(10) as few:
+            assert self.client.get(url).status_code == 200
+        User.objects.filter(username__startswith='user').delete()
+        self.create_links(15)
+        with django_assert_max_num_queries(len(few.captured_queries)):
+            assert self.client.get(url).status_code == 200
+
+    def test_link_changelist_shows_click_counter(self):
+        link = self.create_links(1)[0]
+        Link.objects.filter(pk=link.pk).update(click_count=2)
+        response = self.client.get('/admin/links/link/')
+        assert response.context['cl'].result_list[0].click_count == 2
+
+    def test_fk_filters_use_autocomplete(self):
+        links = self.create_links(2)
+        response = self.client.get('/admin/links/link/', {'user__id__exact': links[0].user_id})
+        assert response.status_code == 200
+        assert list(response.context['cl'].result_list) == [links[0]]
+        assert 'admin-autocomplete' in response.content.decode()
+
+
+@pytest.mark.django_db
+class TestApproximateCountPaginator:
+    def test_exact_count_below_limit(self, settings):
+        settings.ADMIN_EXACT_COUNT_LIMIT = 10
+        for i in range(5):
+            Link.objects.create(short_code=f'code{i}', original_url='https://example.com')
+        assert ApproximateCountPaginator(Link.objects.all(), 2).count == 5
+
+    def test_count_is_bounded_above_limit(self, settings):
+        settings.ADMIN_EXACT_COUNT_LIMIT = 3
+        for i in range(5):
+            Link.objects.create(short_code=f'code{i}', original_url='https://example.com')
+        assert ApproximateCountPaginator(Link.objects.all(), 2).count == 4
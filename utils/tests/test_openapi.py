@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from utils import openapi
+
+
+@pytest.fixture(autouse=True)
+def schema_dir(settings, tmp_path):
+    settings.OPENAPI_SCHEMA_DIR = tmp_path
+    openapi._schema = None
+    openapi.CachedSpectacularAPIView._rendered.clear()
+    yield tmp_path
+    openapi._schema = None
+    openapi.CachedSpectacularAPIView._rendered.clear()
+
+
+class TestCachedSchema:
+    def setup_method(self):
+        self.client = APIClient()
+
+    def test_schema_is_served_with_validators(self):
+        response = self.client.get('/api/doc/', {'format': 'json'})
+        assert response.status_code == 200
+        assert json.loads(response.content)['info']['title'] == 'Link Shortener API'
+        assert response['ETag'] == f'"{openapi.get_code_version()}-json"'
+        assert 'max-age' in response['Cache-Control']
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get('/api/doc/')['ETag']
+        response = self.client.get('/api/doc/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response.content == b''
+
+    def test_first_request_writes_artifact(self, schema_dir):
+        self.client.get('/api/doc/')
+        assert openapi.get_artifact_path().exists()
+
+    def test_artifact_is_reused(self, schema_dir):
+        openapi.write_artifact({'openapi': '3.0.3', 'info': {'title': 'prebuilt'}, 'paths': {}})
+        response = self.client.get('/api/doc/', {'format': 'json'})
+        assert json.loads(response.content)['info']['title'] == 'prebuilt'
+
+    def test_build_command_replaces_stale_artifacts(self, schema_dir):
+        stale = schema_dir / 'openapi-oldversion.json'
+        stale.write_text('{}')
+        call_command('build_openapi_schema')
+        assert openapi.get_artifact_path().exists()
+        assert not stale.exists()
+
+
+class TestLazySchemas:
+    def test_schema_modules_are_imported_with_the_document(self):
+        code = (
+            'import sys, django; django.setup(); import config.urls; '
+            'loaded = [name for name in ("links.schemas", "users.schemas", "analytics.schemas") if name in sys.modules]; '
+            'from utils.openapi import build_schema; build_schema(); '
+            'print(loaded, "links.schemas" in sys.modules)'
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=settings.BASE_DIR, env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings'})
+        assert result.stdout.strip().splitlines()[-1] == '[] True'
+
+    def test_document_has_the_lazy_schemas(self):
+        schema = openapi.build_schema()
+        assert schema['paths']['/api/links/']['post']['summary']
+        assert schema['paths']['/api/auth/users/']['get']['summary'] == 'List all users'
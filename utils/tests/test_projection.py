@@ -0,0 +1,70 @@
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from analytics.models import ClickStats
+from analytics.projections import ClickStatsProjection
+from analytics.serializers import ClickStatsSerializer
+from analytics.services import AnalyticsService
+from links.models import Link
+from links.projections import LinkProjection
+from links.serializers import LinkSerializer
+from links.services import LinkService, UserLinkMetricsService
+from links.sharding import ShardedQuerySet, shard_querysets
+from users.projections import UserMetricsProjection, UserProjection
+from users.serializers import UserMetricsSerializer, UserSerializer
+
+User = get_user_model()
+
+
+def merged(queryset):
+    return ShardedQuerySet([qs.order_by('id') for qs in shard_querysets(queryset)])
+
+
+@pytest.mark.django_db
+class TestProjections:
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='adminpass123',
+                                              role=User.ADMIN)
+        self.links = [
+            LinkService.create_link('https://example.com/a', user=self.user, custom_alias='alias', note='note'),
+            LinkService.create_link('https://example.com/b', user=self.user, max_clicks=50),
+            LinkService.create_link('https://example.com/c'),
+        ]
+        for _ in range(12):
+            AnalyticsService.track_click(self.links[0])
+        AnalyticsService.track_click(self.links[1])
+
+    def assert_same(self, projection_class, serializer_class, queryset):
+        projection = projection_class()
+        expected = [dict(item) for item in serializer_class(list(merged(queryset)), many=True).data]
+        assert projection.serialize(merged(queryset).values(*projection.columns())) == expected
+
+    def test_links_match_serializer(self):
+        self.assert_same(LinkProjection, LinkSerializer, Link.objects.all())
+
+    def test_clicks_match_serializer(self):
+        self.assert_same(ClickStatsProjection, ClickStatsSerializer, ClickStats.objects.all())
+
+    def test_users_match_serializer(self):
+        projection = UserProjection()
+        users = User.objects.order_by('id')
+        expected = [dict(item) for item in UserSerializer(users, many=True).data]
+        assert projection.serialize(projection.values(users)) == expected
+
+    def test_user_metrics_match_serializer(self):
+        UserLinkMetricsService.refresh()
+        projection = UserMetricsProjection()
+        users = User.objects.order_by('id')
+        expected = [dict(item) for item in UserMetricsSerializer(users, many=True).data]
+        assert projection.serialize(projection.values(users)) == expected
+        assert expected[0]['click_count'] == 13 and expected[0]['last_clicked_at']
+
+    def test_link_list_queries_do_not_grow_with_the_page(self, django_assert_max_num_queries):
+        client = APIClient()
+        client.force_authenticate(user=self.admin)
+        # ETag aggregate, count, page, usernames, click totals and latest clicks (all but usernames per shard)
+        with django_assert_max_num_queries(6):
+            response = client.get('/api/links/list/')
+        assert response.status_code == 200
+        assert {item['id'] for item in response.data['results']} == {link.pk for link in self.links}
@@ -0,0 +1,52 @@
+import os
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from analytics.services import AnalyticsService
+from links.models import Link
+from links.services import LinkService
+from utils.query_plans import CRITICAL_QUERIES, SNAPSHOT_VENDORS, check, snapshot_path, snapshot_text
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        links = [
+            LinkService.create_link(f'https://example.com/{number}', user=self.user,
+                                    custom_alias=f'alias-{number}' if number % 3 == 0 else None)
+            for number in range(6)
+        ]
+        for link in links[:3]:
+            AnalyticsService.track_click(link)
+        self.context = {'code': links[1].short_code, 'link': links[0], 'user': self.user}
+
+    @pytest.mark.parametrize('name', sorted(CRITICAL_QUERIES))
+    def test_plan_uses_indexes_and_matches_snapshot(self, name):
+        result = check(name, self.context)
+        assert result['plans']
+        assert result['problems'] == []
+
+        path = snapshot_path(name, connection.vendor)
+        if os.getenv('UPDATE_QUERY_PLANS'):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(snapshot_text(result))
+        elif connection.vendor not in SNAPSHOT_VENDORS:
+            pytest.skip(f'No {connection.vendor} plan snapshots are committed (SNAPSHOT_VENDORS); '
+                        'the index and cost checks above still ran')
+        assert path.exists(), f'No {connection.vendor} snapshot for {name}: run with UPDATE_QUERY_PLANS=1 and commit it'
+        assert snapshot_text(result) == path.read_text(), (
+            f'The plan of {name} changed; run with UPDATE_QUERY_PLANS=1 if that is intended'
+        )
+
+    def test_full_scan_of_an_indexed_table_is_reported(self, monkeypatch):
+        # note has no index: reading links by note must scan the table
+        def by_note(context):
+            list(Link.objects.filter(note='nothing'))
+
+        monkeypatch.setitem(CRITICAL_QUERIES, 'by_note', {'run': by_note, 'indexed': ('links',), 'max_cost': None})
+        result = check('by_note', self.context)
+        assert len(result['problems']) >= 1
+        assert 'full scan of links' in result['problems'][0]
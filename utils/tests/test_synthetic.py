@@ -0,0 +1,79 @@
+from io import StringIO
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from analytics.models import ClickStats
+from links.models import Link
+from links.services import LinkService
+from links.sharding import get_shards, shard_for_link
+
+User = get_user_model()
+
+
+def generate(seed=3, **options):
+    arguments = ['--users', '20', '--links', '200', '--clicks', '2000', '--chunk-size', '64', '--workers', '1',
+                 '--seed', str(seed), '--until', '2026-01-01']
+    for name, value in options.items():
+        arguments += [f"--{name.replace('_', '-')}", str(value)]
+    call_command('generate_synthetic_data', *arguments, stdout=StringIO())
+
+
+def snapshot():
+    links = sorted(
+        (link.pk, link.short_code, link.custom_alias, link.original_url, link.user_id, link.click_count,
+         link.created_at, link.is_active, link.expires_at)
+        for alias in get_shards() for link in Link.objects.using(alias).all()
+    )
+    clicks = sorted(
+        row for alias in get_shards() for row in ClickStats.objects.using(alias).values_list('link_id', 'clicked_at')
+    )
+    users = list(User.objects.order_by('id').values_list('id', 'username', 'password', 'created_at'))
+    return links, clicks, users
+
+
+@pytest.mark.django_db
+class TestSyntheticData:
+    def test_volumes_and_counters(self):
+        generate()
+        links = [link for alias in get_shards() for link in Link.objects.using(alias).all()]
+        assert User.objects.count() == 20
+        assert len(links) == 200
+        assert all(shard_for_link(link) == link._state.db for link in links)
+        clicks = {}
+        for alias in get_shards():
+            clicks.update(ClickStats.objects.using(alias).values_list('link_id').annotate(total=Count('id')))
+        # click_count matches the click rows, and the total is close to --clicks
+        assert all(clicks.get(link.pk, 0) == link.click_count for link in links)
+        assert abs(sum(clicks.values()) - 2000) < 100
+        # Zipfian: the most clicked link alone has a large share
+        assert max(clicks.values()) > 200
+        assert all(
+            link.created_at <= clicked_at
+            for link in links for clicked_at in link.clicks.using(link._state.db).values_list('clicked_at', flat=True)
+        )
+
+    def test_same_seed_same_data(self):
+        generate()
+        first = snapshot()
+        for alias in get_shards():
+            ClickStats.objects.using(alias).all().delete()
+            Link.objects.using(alias).all().delete()
+        User.objects.all().delete()
+
+        generate()
+        assert snapshot() == first
+        generate(seed=4, users=0, links=0)  # nothing to write, nothing changes
+        assert snapshot() == first
+
+    def test_other_seed_other_data_and_links_can_still_be_created(self):
+        generate()
+        first = snapshot()
+        generate(seed=4)
+        links, clicks, users = snapshot()
+        assert len(links) == 400 and len(users) == 40
+        assert {link[1] for link in links} > {link[1] for link in first[0]}
+        # The id sequences moved past the generated rows
+        link = LinkService.create_link('https://example.com/after')
+        shard = link._state.db
+        assert link.pk > max(Link.objects.using(shard).exclude(pk=link.pk).values_list('pk', flat=True))
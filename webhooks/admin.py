@@ -0,0 +1,30 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import WebhookDelivery, WebhookEndpoint
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ['url', 'event_types', 'is_active', 'created_at']
+    list_filter = ['is_active']
+    search_fields = ['url']
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['event_type', 'event_id', 'endpoint', 'status', 'attempts', 'next_attempt_at', 'delivered_at']
+    list_filter = ['status', 'event_type']
+    list_select_related = ['endpoint']
+    readonly_fields = ['endpoint', 'event_id', 'event_type', 'payload', 'occurred_at', 'attempts', 'last_error',
+                       'delivered_at']
+    ordering = ['-id']
+    actions = ['retry_deliveries']
+
+    def retry_deliveries(self, request, queryset):
+        """Send failed deliveries again on the next deliver_webhooks round"""
+        updated = queryset.filter(status=WebhookDelivery.FAILED).update(
+            status=WebhookDelivery.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} delivery(ies) queued for retry.')
+
+    retry_deliveries.short_description = 'Retry selected failed deliveries'
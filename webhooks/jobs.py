@@ -0,0 +1,9 @@
+from datetime import timedelta
+from django.conf import settings
+from scheduler.registry import job
+from .services import WebhookService
+
+
+@job(every=timedelta(days=1), enabled=lambda: settings.WEBHOOK_DELIVERED_RETENTION_DAYS > 0)
+def prune_delivered_webhooks():
+    return f'Deleted {WebhookService.prune_delivered()} delivery(ies)'
@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from scheduler.services import SchedulerService, node_name
+from webhooks.models import WebhookDelivery
+from webhooks.services import WebhookService, post_events
+
+
+# Lease row held by the running sender (scheduler_leases)
+LEASE = 'webhooks.deliver_webhooks'
+
+
+class Command(BaseCommand):
+    help = 'Move outbox events into webhook deliveries and POST them to their endpoints in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.WEBHOOK_BATCH_SIZE,
+                            help='Events per outbox read and per webhook request')
+        parser.add_argument('--concurrency', type=int, default=settings.WEBHOOK_CONCURRENCY,
+                            help='Endpoints delivered to in parallel')
+        parser.add_argument('--max-attempts', type=int, default=settings.WEBHOOK_MAX_ATTEMPTS,
+                            help='Attempts before a batch is marked failed')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when nothing is due')
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is left to send right now')
+
+    def handle(self, *args, **options):
+        # Per-endpoint event order relies on one sender: a lease keeps other instances on standby
+        node = node_name()
+        if not self.acquire(node, options):
+            return
+        totals = {'events': 0, 'requests': 0, WebhookDelivery.DELIVERED: 0, WebhookDelivery.FAILED: 0, 'retries': 0}
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                while True:
+                    if not SchedulerService.hold(LEASE, node, settings.WEBHOOK_LEASE_SECONDS):
+                        raise CommandError('Lost the sender lease to another deliver_webhooks instance')
+                    totals['events'] += WebhookService.dispatch_events(options['batch_size'])
+                    batches = WebhookService.get_due_batches(options['batch_size'])
+                    if batches:
+                        self.deliver(pool, batches, options['max_attempts'], totals)
+                        continue
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        finally:
+            SchedulerService.release(LEASE, node)
+
+        elapsed = time.monotonic() - started
+        delivered = totals[WebhookDelivery.DELIVERED]
+        self.stdout.write(self.style.SUCCESS(
+            f"Dispatched {totals['events']} event(s); delivered {delivered} in {totals['requests']} request(s), "
+            f"{totals['retries']} batch(es) to retry, {totals[WebhookDelivery.FAILED]} event(s) failed; "
+            f"{delivered / elapsed if elapsed else 0:.1f} events/s"
+        ))
+
+    def acquire(self, node, options):
+        """Take the sender lease, waiting while another instance holds it (or giving up with --once)."""
+        while not SchedulerService.hold(LEASE, node, settings.WEBHOOK_LEASE_SECONDS):
+            if options['once']:
+                self.stdout.write('Another deliver_webhooks instance is running')
+                return False
+            time.sleep(options['interval'])
+        return True
+
+    def deliver(self, pool, batches, max_attempts, totals):
+        # Worker threads only do HTTP; results are recorded from this thread's connection
+        timeout = settings.WEBHOOK_TIMEOUT_SECONDS
+        errors = pool.map(lambda item: post_events(*item, timeout), batches.items())
+        for (endpoint, deliveries), error in zip(batches.items(), errors):
+            totals['requests'] += 1
+            status = WebhookService.record_result(deliveries, error, max_attempts)
+            if status == WebhookDelivery.PENDING:
+                totals['retries'] += 1
+                self.stderr.write(f'{endpoint.url}: {error}, will retry')
+            else:
+                totals[status] += len(deliveries)
@@ -0,0 +1,92 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """
+    An event written in the same transaction as the change it describes.
+    Lives on the shard of the link it is about. deliver_webhooks copies each
+    event into one WebhookDelivery per interested endpoint, then deletes it.
+    """
+    LINK_CREATED = 'link.created'
+    LINK_UPDATED = 'link.updated'
+    LINK_DELETED = 'link.deleted'
+    LINK_CLICK_MILESTONE = 'link.click_milestone'
+
+    EVENT_TYPES = [
+        (LINK_CREATED, 'Link created'),
+        (LINK_UPDATED, 'Link updated'),
+        (LINK_DELETED, 'Link deleted'),
+        (LINK_CLICK_MILESTONE, 'Link click milestone'),
+    ]
+
+    event_type = models.CharField(max_length=50, choices=EVENT_TYPES)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk}"
+
+    class Meta:
+        db_table = 'outbox_events'
+        ordering = ['id']
+
+
+class WebhookEndpoint(models.Model):
+    url = models.URLField(max_length=2048)
+    # HMAC-SHA256 key for the X-Webhook-Signature header
+    secret = models.CharField(max_length=255, blank=True)
+    # Event types to receive; empty means all
+    event_types = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.url
+
+    def wants(self, event_type):
+        return not self.event_types or event_type in self.event_types
+
+    class Meta:
+        db_table = 'webhook_endpoints'
+        ordering = ['id']
+
+
+class WebhookDelivery(models.Model):
+    """One event for one endpoint, delivered in event order per endpoint."""
+    PENDING = 'PENDING'
+    DELIVERED = 'DELIVERED'
+    FAILED = 'FAILED'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (DELIVERED, 'Delivered'),
+        (FAILED, 'Failed'),
+    ]
+
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name='deliveries')
+    # Copied from the OutboxEvent, which may live on another database
+    event_id = models.BigIntegerField()
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    occurred_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event_type} #{self.event_id} -> {self.endpoint_id}"
+
+    class Meta:
+        db_table = 'webhook_deliveries'
+        ordering = ['endpoint', 'occurred_at', 'event_id']
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'event_id'], name='unique_delivery_per_endpoint'),
+        ]
+        indexes = [
+            models.Index(fields=['endpoint', 'occurred_at', 'event_id'], name='webhook_pending_idx',
+                         condition=models.Q(status='PENDING')),
+        ]
+        verbose_name_plural = 'Webhook deliveries'
@@ -0,0 +1,145 @@
+import hashlib
+import hmac
+import json
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from django.utils import timezone
+from datetime import timedelta
+from links.sharding import get_shards, using
+from .models import OutboxEvent, WebhookDelivery, WebhookEndpoint
+
+LINK_PAYLOAD_FIELDS = [
+    'id', 'short_code', 'custom_alias', 'original_url', 'user_id', 'is_active',
+    'active_from', 'expires_at', 'max_clicks', 'click_count', 'created_at', 'updated_at',
+]
+
+
+def link_payload(link):
+    return {field: getattr(link, field) for field in LINK_PAYLOAD_FIELDS}
+
+
+def sign(secret, body):
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def post_events(endpoint, deliveries, timeout):
+    """POST a batch of deliveries to their endpoint. Returns None on a 2xx answer, else the error."""
+    body = json.dumps({
+        'events': [
+            {'id': delivery.event_id, 'type': delivery.event_type, 'occurred_at': delivery.occurred_at,
+             'data': delivery.payload}
+            for delivery in deliveries
+        ]
+    }, cls=DjangoJSONEncoder).encode()
+    headers = {'Content-Type': 'application/json', 'User-Agent': 'link-shortener-webhooks'}
+    if endpoint.secret:
+        headers['X-Webhook-Signature'] = sign(endpoint.secret, body)
+    try:
+        with urlopen(Request(endpoint.url, data=body, headers=headers, method='POST'), timeout=timeout) as response:
+            response.read()
+    except HTTPError as error:
+        return f'HTTP {error.code}'
+    except (URLError, OSError) as error:
+        return str(getattr(error, 'reason', error))
+    return None
+
+
+class OutboxService:
+    @staticmethod
+    def emit(event_type, payload, alias):
+        # Call inside the transaction (on `alias`) that makes the change
+        return using(OutboxEvent, alias).create(event_type=event_type, payload=payload)
+
+    @staticmethod
+    def emit_many(event_type, payloads, alias):
+        using(OutboxEvent, alias).bulk_create(
+            [OutboxEvent(event_type=event_type, payload=payload) for payload in payloads]
+        )
+
+
+class WebhookService:
+    @staticmethod
+    def dispatch_events(batch_size):
+        """
+        Move outbox events from every shard into one pending delivery per
+        interested endpoint. Returns the number of events taken from the outbox.
+        """
+        endpoints = list(WebhookEndpoint.objects.using(DEFAULT_DB_ALIAS).filter(is_active=True))
+        now = timezone.now()
+        total = 0
+        for alias in get_shards():
+            # Explicit alias: the outbox is drained on the primary, never a replica
+            events = OutboxEvent.objects.using(alias)
+            while True:
+                batch = list(events.order_by('id')[:batch_size])
+                if not batch:
+                    break
+                # A crash between the two statements re-copies the batch; the unique
+                # (endpoint, event_id) constraint turns that into a no-op
+                WebhookDelivery.objects.using(DEFAULT_DB_ALIAS).bulk_create([
+                    WebhookDelivery(endpoint=endpoint, event_id=event.pk, event_type=event.event_type,
+                                    payload=event.payload, occurred_at=event.created_at, next_attempt_at=now)
+                    for event in batch
+                    for endpoint in endpoints
+                    if endpoint.wants(event.event_type)
+                ], ignore_conflicts=True)
+                events.filter(pk__in=[event.pk for event in batch]).delete()
+                total += len(batch)
+        return total
+
+    @staticmethod
+    def get_due_batches(batch_size):
+        """
+        {endpoint: deliveries} holding the oldest pending deliveries of every
+        endpoint whose head delivery is due. A later event is never sent before
+        an earlier one to the same endpoint.
+        """
+        now = timezone.now()
+        deliveries = WebhookDelivery.objects.using(DEFAULT_DB_ALIAS)
+        endpoint_ids = deliveries.filter(status=WebhookDelivery.PENDING).values_list('endpoint_id', flat=True)
+        batches = {}
+        for endpoint in WebhookEndpoint.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=endpoint_ids.distinct(),
+                                                                               is_active=True):
+            pending = list(
+                deliveries.filter(endpoint=endpoint, status=WebhookDelivery.PENDING)
+                .order_by('occurred_at', 'event_id')[:batch_size]
+            )
+            if pending and pending[0].next_attempt_at <= now:
+                batches[endpoint] = pending
+        return batches
+
+    @staticmethod
+    def record_result(deliveries, error, max_attempts):
+        """Mark a sent batch delivered, or schedule its retry with exponential backoff."""
+        now = timezone.now()
+        rows = WebhookDelivery.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=[d.pk for d in deliveries])
+        if error is None:
+            rows.update(status=WebhookDelivery.DELIVERED, delivered_at=now, attempts=F('attempts') + 1,
+                        last_error='')
+            return WebhookDelivery.DELIVERED
+        # The whole batch shares one attempt count: it was sent as one request
+        attempts = deliveries[0].attempts + 1
+        if attempts >= max_attempts:
+            rows.update(status=WebhookDelivery.FAILED, attempts=F('attempts') + 1, last_error=error)
+            return WebhookDelivery.FAILED
+        delay = min(settings.WEBHOOK_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.WEBHOOK_MAX_BACKOFF_SECONDS)
+        rows.update(attempts=F('attempts') + 1, last_error=error, next_attempt_at=now + timedelta(seconds=delay))
+        return WebhookDelivery.PENDING
+
+    @staticmethod
+    def prune_delivered(days=None):
+        """
+        Delete the deliveries delivered more than `days` ago (default
+        WEBHOOK_DELIVERED_RETENTION_DAYS). Pending and failed ones are kept.
+        Returns the rows deleted.
+        """
+        days = settings.WEBHOOK_DELIVERED_RETENTION_DAYS if days is None else days
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = WebhookDelivery.objects.using(DEFAULT_DB_ALIAS).filter(
+            status=WebhookDelivery.DELIVERED, delivered_at__lt=cutoff
+        ).delete()
+        return deleted
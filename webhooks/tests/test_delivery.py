@@ -0,0 +1,179 @@
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from analytics.services import AnalyticsService
+from links.models import Link
+from links.services import LinkService
+from links.sharding import get_shards
+from scheduler.services import SchedulerService
+from webhooks.management.commands.deliver_webhooks import LEASE
+from webhooks.models import OutboxEvent, WebhookDelivery, WebhookEndpoint
+from webhooks.services import WebhookService, sign
+
+User = get_user_model()
+
+
+def outbox_events():
+    return [event for alias in get_shards() for event in OutboxEvent.objects.using(alias).order_by('id')]
+
+
+@pytest.fixture
+def receiver():
+    """A local webhook endpoint recording each request; set `.status` to make it fail."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            server.requests.append((dict(self.headers), body))
+            self.send_response(server.status)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    server.requests, server.status = [], 200
+    server.url = f'http://127.0.0.1:{server.server_port}/hook'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+class TestOutbox:
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+
+    def test_link_changes_emit_events(self):
+        link = LinkService.create_link('https://example.com', user=self.user)
+        LinkService.update_link(link, note='changed')
+        pk = link.pk
+        LinkService.delete_link(link)
+        events = outbox_events()
+        assert [event.event_type for event in events] == [
+            OutboxEvent.LINK_CREATED, OutboxEvent.LINK_UPDATED, OutboxEvent.LINK_DELETED
+        ]
+        assert events[0].payload['short_code'] == link.short_code
+        assert events[2].payload['id'] == pk
+
+    def test_bulk_actions_emit_one_event_per_affected_link(self):
+        links = [LinkService.create_link(f'https://example.com/{i}', user=self.user) for i in range(3)]
+        LinkService.update_link(links[0], is_active=False)
+        before = {event.pk for event in outbox_events()}
+        *_, progress = LinkService.bulk_update_links(Link.objects.all(), 'deactivate', chunk_size=2)
+        events = [event for event in outbox_events() if event.pk not in before]
+        assert progress['affected'] == 2
+        assert sorted(event.payload['id'] for event in events) == sorted(link.pk for link in links[1:])
+        assert all(event.payload['is_active'] is False for event in events)
+
+    def test_click_milestone(self, settings):
+        settings.CLICK_MILESTONES = [2]
+        link = LinkService.create_link('https://example.com', user=self.user)
+        for _ in range(3):
+            AnalyticsService.track_click(link)
+        milestones = [event for event in outbox_events() if event.event_type == OutboxEvent.LINK_CLICK_MILESTONE]
+        assert [event.payload['milestone'] for event in milestones] == [2]
+        assert link.click_count == 3
+
+    def test_delete_view_emits_event(self):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='adminpass123',
+                                         role=User.ADMIN)
+        link = LinkService.create_link('https://example.com', user=self.user)
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        assert client.delete(f'/api/links/{link.pk}/').status_code == 204
+        assert outbox_events()[-1].event_type == OutboxEvent.LINK_DELETED
+
+
+@pytest.mark.django_db
+class TestDeliverWebhooks:
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+
+    def test_events_are_batched_in_order_and_signed(self, receiver):
+        WebhookEndpoint.objects.create(url=receiver.url, secret='s3cret')
+        links = [LinkService.create_link(f'https://example.com/{i}', user=self.user) for i in range(5)]
+        call_command('deliver_webhooks', '--once', '--batch-size', '2')
+
+        bodies = [json.loads(body) for _, body in receiver.requests]
+        assert [len(body['events']) for body in bodies] == [2, 2, 1]
+        ids = [event['data']['id'] for body in bodies for event in body['events']]
+        assert sorted(ids) == sorted(link.pk for link in links)
+        times = [event['occurred_at'] for body in bodies for event in body['events']]
+        assert times == sorted(times)
+
+        headers, body = receiver.requests[0]
+        assert headers['X-Webhook-Signature'] == sign('s3cret', body)
+        assert not outbox_events()
+        assert WebhookDelivery.objects.filter(status=WebhookDelivery.DELIVERED).count() == 5
+
+    def test_endpoint_event_type_filter(self, receiver):
+        WebhookEndpoint.objects.create(url=receiver.url, event_types=[OutboxEvent.LINK_DELETED])
+        link = LinkService.create_link('https://example.com', user=self.user)
+        LinkService.delete_link(link)
+        call_command('deliver_webhooks', '--once')
+        events = json.loads(receiver.requests[0][1])['events']
+        assert [event['type'] for event in events] == [OutboxEvent.LINK_DELETED]
+
+    def test_failures_back_off_then_give_up(self, receiver, settings):
+        settings.WEBHOOK_BACKOFF_SECONDS = 0
+        WebhookEndpoint.objects.create(url=receiver.url)
+        LinkService.create_link('https://example.com', user=self.user)
+        receiver.status = 500
+        call_command('deliver_webhooks', '--once', '--max-attempts', '3')
+
+        delivery = WebhookDelivery.objects.get()
+        assert len(receiver.requests) == 3
+        assert delivery.status == WebhookDelivery.FAILED
+        assert delivery.attempts == 3
+        assert delivery.last_error == 'HTTP 500'
+
+    def test_retry_waits_for_backoff(self, receiver, settings):
+        settings.WEBHOOK_BACKOFF_SECONDS = 60
+        WebhookEndpoint.objects.create(url=receiver.url)
+        LinkService.create_link('https://example.com', user=self.user)
+        receiver.status = 503
+        call_command('deliver_webhooks', '--once')
+
+        delivery = WebhookDelivery.objects.get()
+        assert len(receiver.requests) == 1
+        assert delivery.status == WebhookDelivery.PENDING
+        assert delivery.next_attempt_at > delivery.occurred_at
+
+    def test_single_sender(self, receiver):
+        WebhookEndpoint.objects.create(url=receiver.url)
+        LinkService.create_link('https://example.com', user=self.user)
+        assert SchedulerService.hold(LEASE, 'other-node:1', 60)
+        call_command('deliver_webhooks', '--once', stdout=StringIO())
+        assert not receiver.requests
+
+        # Once the other sender's lease has lapsed, this one takes over and releases it when done
+        SchedulerService.leases().filter(name=LEASE).update(lease_expires_at=timezone.now())
+        call_command('deliver_webhooks', '--once')
+        assert len(receiver.requests) == 1
+        assert SchedulerService.leases().get(name=LEASE).holder == ''
+
+    def test_delivered_deliveries_are_pruned_after_retention(self, receiver, settings):
+        settings.WEBHOOK_DELIVERED_RETENTION_DAYS = 7
+        WebhookEndpoint.objects.create(url=receiver.url)
+        for i in range(3):
+            LinkService.create_link(f'https://example.com/{i}', user=self.user)
+        call_command('deliver_webhooks', '--once')
+        old, recent, failed = WebhookDelivery.objects.order_by('event_id')
+        old.delivered_at = timezone.now() - timedelta(days=8)
+        old.save()
+        WebhookDelivery.objects.filter(pk=failed.pk).update(status=WebhookDelivery.FAILED, delivered_at=None)
+
+        assert WebhookService.prune_delivered() == 1
+        assert set(WebhookDelivery.objects.values_list('pk', flat=True)) == {recent.pk, failed.pk}
+        out = StringIO()
+        call_command('run_scheduler', '--run', 'webhooks.prune_delivered_webhooks', stdout=out)
+        assert 'Deleted 0 delivery(ies)' in out.getvalue()